@@ -1,27 +1,38 @@
 import logging, asyncio
+from datetime import datetime, timezone
+from config import settings
 from mcp_client import MCPClient
-from data_streamer import Streamer
 from sentiment_analyzer import quick_sentiment, clova_sentiment
-from storage.hot_db import HotDB
+from storage import StorageManager
+from storage.rolling_stats import RollingStats
 
 class StockSentimentAgent:
-    def __init__(self):
+    def __init__(self, storage: StorageManager | None = None):
         self.mcp: MCPClient | None = None
-        self.stream = Streamer()
-        self.db = HotDB()
-
-    async def start(self):
-        self.mcp = await MCPClient().__aenter__()
-        await self.db.startup()
+        self.storage = storage or StorageManager()
+        self.db = self.storage.hot               # 최신 점수 조회용
+        self.stats = RollingStats()
+        self.clova_sentiment = clova_sentiment   # replay 시 녹화/스텁 응답으로 교체
+        record_path = getattr(settings, 'CLOVA_RECORD_PATH', None)
+        if record_path:
+            # replay --recordings 용 응답 녹화
+            from replay import ClovaRecorder
+            self.clova_sentiment = ClovaRecorder(clova_sentiment, record_path)
+
+    async def start(self, mcp=None):
+        # mcp 주입 시(replay 등) 외부 MCP 서버에 연결하지 않음
+        self.mcp = mcp or await MCPClient().__aenter__()
+        await self.storage.startup()
         logging.info("Agent up")
 
     async def stop(self):
         if self.mcp:
             await self.mcp.__aexit__()
-        self.stream.producer.close()
+        await self.storage.shutdown()
 
     # ---------------- Core Logic ---------------- #
-    async def collect(self, symbol: str):
+    async def collect(self, symbol: str, ts: datetime | None = None):
+        """ts: 이벤트 시각 (replay 는 재생 중인 창의 시각, 생략 시 현재 UTC)"""
         # 1. 데이터 수집
         tweets = await self.mcp.call("twitter", "search_tweets", {"query": symbol})
         quote  = await self.mcp.call("alpha_vantage", "get_quote", {"symbol": symbol})
@@ -32,16 +43,20 @@ class StockSentimentAgent:
         avg  = sum(b["score"] for b in base)/len(base) if base else .5
 
         # 2-2. HyperCLOVA X 정밀 분석
-        detailed = await clova_sentiment(texts, quote)
+        detailed = await self.clova_sentiment(texts, quote)
         score = detailed.get("sentiment_score", avg)
         label = detailed.get("sentiment_label", "neutral")
         conf  = detailed.get("confidence", 0.5)
 
-        # 3. 저장 + 스트림
-        await self.db.put(symbol, score, label, conf)
-        await self.stream.send("stock-sentiment",
-                               key=symbol,
-                               value={"symbol": symbol, "score": score,
-                                      "label": label, "confidence": conf})
+        # 3. 저장 + 스트림: 티어별 큐에 적재만 하고 반환 (hot / warm / vector 임베딩 / kafka / 원본 archive)
+        self.storage.write_event(symbol, score, label, conf, ts=ts,
+                                 tweets=tweets.get("tweets", []), quote=quote)
+
+        # 4. 롤링 통계 갱신 + 스파이크 감지
+        snap = self.stats.update(symbol, score, conf, len(texts),
+                                 ts=ts.replace(tzinfo=timezone.utc).timestamp() if ts else None)
+        if snap["score_spike"] or snap["volume_spike"]:
+            logging.warning("%s spike score_z=%.2f volume_z=%.2f",
+                            symbol, snap["score_z"], snap["volume_z"])
 
         logging.info("%s %.2f %s", symbol, score, label)
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+Stock Sentiment Agent 벤치마크 스크립트 모음
+실행: python -m benchmarks.<module>
+"""
@@ -0,0 +1,418 @@
+"""
+엔드투엔드 벤치마크: 수집 경로 + 스토리지 티어 (외부 서비스는 benchmarks.fakes 의 in-process fake)
+- collect: StockSentimentAgent.collect 종목별 사이클 지연 p50/p95/p99, 모든 티어 반영까지의 tweets/min
+- scheduler: CollectorScheduler(interval=0) 를 --duration 초 동안 연속 실행한 처리량
+- hot / warm / cold / vector / kafka: 티어별 쓰기 처리량·조회 지연
+- 서비스별 지연·실패율 주입 (--latency clova=800:200 --fail kafka=0.05), 시나리오별 메모리(최대 RSS, tracemalloc peak)
+- 결과는 JSON 한 줄 (--out 파일에 누적) + README 기준치(분당 10,000 트윗, 캐시 100ms 등) 충족 여부
+
+실행: python -m benchmarks.bench_e2e [--symbols 50] [--rounds 5] [--duration 30] [--out bench_e2e.jsonl] [--check]
+"""
+import argparse, asyncio, json, logging, os, platform, resource, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+from benchmarks import fakes
+
+SCENARIOS = ("collect", "scheduler", "hot", "warm", "cold", "vector", "kafka")
+
+# README 성능 목표: (결과 경로, 비교, 기준값)
+CLAIMS = {
+    "tweets_per_min":    ("collect.tweets_per_min", ">=", 10_000),
+    "analysis_p50_ms":   ("collect.cycle_ms.p50", "<=", 5_000),
+    "hot_cache_p95_ms":  ("hot.cache_hit_ms.p95", "<=", 100),
+    "warm_trend_p95_ms": ("warm.trend_ms.p95", "<=", 2_000),
+}
+
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {"n": len(samples), "mean": round(float(np.mean(samples)), 3), "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3), "p99": round(float(p99), 3), "max": round(max(samples), 3)}
+
+def _memory() -> dict:
+    # Linux ru_maxrss 단위는 KB
+    mem = {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if tracemalloc.is_tracing():
+        mem["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.reset_peak()
+    return mem
+
+def _symbols(n: int) -> list[str]:
+    return [f"BM{i:04d}" for i in range(n)]
+
+def _rows(symbols: list[str], n: int, start: datetime, span: timedelta) -> list[dict]:
+    step = span / n
+    return [{"symbol": symbols[i % len(symbols)], "score": (i % 100) / 100, "label": "neutral",
+             "confidence": 0.8, "timestamp": start + step * i} for i in range(n)]
+
+async def _timed_read(samples: list, errors: dict, coro):
+    """조회 지연 기록 (주입된 실패 등 예외는 건수만 집계)"""
+    started = time.perf_counter()
+    try:
+        await coro
+    except Exception:
+        errors["read_errors"] += 1
+        return
+    samples.append((time.perf_counter() - started) * 1000)
+
+# ---------------------------------------------------------- #
+#                  COLLECT / SCHEDULER                       #
+# ---------------------------------------------------------- #
+async def _start_agent(args, faults, workdir: str):
+    from agent import StockSentimentAgent
+    from storage import StorageManager
+    storage = StorageManager(mover=False)   # 티어 이동은 수집 경로와 무관
+    storage.vector.index_dir = os.path.join(workdir, "vector")
+    if storage.embedder:
+        fakes.install_encoder(storage.embedder, faults["encoder"])
+    agent = StockSentimentAgent(storage)
+    agent.clova_sentiment = fakes.fake_clova(faults["clova"])
+    await agent.start(mcp=fakes.FakeMCP(faults["mcp"], args.tweets, args.dup_ratio, args.seed))
+    return agent
+
+def _timed_collect(agent, tweets: int, latencies: list, counts: dict):
+    """agent.collect 를 감싸 성공 사이클 지연·건수 기록"""
+    collect = agent.collect
+
+    async def timed(symbol: str):
+        started = time.perf_counter()
+        try:
+            await collect(symbol)
+        except Exception:
+            counts["errors"] += 1
+            raise
+        latencies.append((time.perf_counter() - started) * 1000)
+        counts["cycles"] += 1
+        counts["tweets"] += tweets
+    return timed
+
+async def bench_collect(args, faults, workdir: str) -> dict:
+    agent = await _start_agent(args, faults, workdir)
+    latencies, counts = [], {"cycles": 0, "errors": 0, "tweets": 0}
+    collect = _timed_collect(agent, args.tweets, latencies, counts)
+    symbols = _symbols(args.symbols)
+    try:
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            await asyncio.gather(*(collect(s) for s in symbols), return_exceptions=True)
+        collect_s = time.perf_counter() - started
+        await agent.storage.flush()   # 큐에 남은 이벤트까지 모든 티어에 반영된 시점 기준
+        total_s = time.perf_counter() - started
+        metrics = agent.storage.get_metrics()
+    finally:
+        await agent.stop()
+    return {**counts, "collect_s": round(collect_s, 3), "total_s": round(total_s, 3),
+            "tweets_per_min": round(counts["tweets"] / total_s * 60, 1),
+            "cycle_ms": _percentiles(latencies), "storage": metrics}
+
+async def bench_scheduler(args, faults, workdir: str) -> dict:
+    from scheduler import CollectorScheduler
+    agent = await _start_agent(args, faults, workdir)
+    latencies, counts = [], {"cycles": 0, "errors": 0, "tweets": 0}
+    agent.collect = _timed_collect(agent, args.tweets, latencies, counts)
+    try:
+        started = time.perf_counter()
+        task = asyncio.create_task(CollectorScheduler(agent, interval=0).run_forever(_symbols(args.symbols)))
+        await asyncio.sleep(args.duration)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await agent.storage.flush()
+        total_s = time.perf_counter() - started
+        metrics = agent.storage.get_metrics()
+    finally:
+        await agent.stop()
+    return {**counts, "total_s": round(total_s, 3),
+            "tweets_per_min": round(counts["tweets"] / total_s * 60, 1),
+            "cycle_ms": _percentiles(latencies), "storage": metrics}
+
+# ---------------------------------------------------------- #
+#                  STORAGE TIERS                             #
+# ---------------------------------------------------------- #
+async def bench_hot(args, faults, services) -> dict:
+    from storage import StorageManager
+    storage = StorageManager(sinks=("hot",), mover=False)
+    await storage.startup()
+    symbols = _symbols(args.symbols)
+    n = args.events
+    try:
+        started = time.perf_counter()
+        for row in _rows(symbols, n, datetime.utcnow() - timedelta(minutes=1), timedelta(minutes=1)):
+            storage.write_event(row["symbol"], row["score"], row["label"], row["confidence"], row["timestamp"])
+        offer_s = time.perf_counter() - started
+        await storage.flush()
+        write_s = time.perf_counter() - started
+
+        db = storage.hot
+        hits, misses, many, errors = [], [], [], {"read_errors": 0}
+        for _ in range(args.reads):
+            for symbol in symbols:
+                await _timed_read(hits, errors, db.get_latest(symbol))
+            await _timed_read(many, errors, db.get_latest_many(symbols))
+            services.redis.data.clear()            # 캐시 miss 경로 (Redis → PG)
+            for symbol in symbols:
+                await _timed_read(misses, errors, db.get_latest(symbol))
+            await _timed_read([], errors, db.get_latest_many(symbols))   # 다음 반복을 위해 캐시 backfill
+        metrics = {**storage.get_metrics()["hot"], "buffer": db.buffer_stats()}
+    finally:
+        await storage.shutdown()
+    return {"events": n, **errors, "offer_us": round(offer_s / n * 1e6, 3),
+            "write_events_per_s": round(n / write_s, 1), "cache_hit_ms": _percentiles(hits),
+            "cache_miss_ms": _percentiles(misses), "latest_many_ms": _percentiles(many),
+            "metrics": metrics}
+
+async def bench_warm(args, faults, services) -> dict:
+    from storage import WarmDB
+    db = WarmDB()
+    await db.startup()
+    symbols = _symbols(args.symbols)
+    try:
+        rows = _rows(symbols, args.events, datetime.utcnow() - timedelta(hours=1), timedelta(hours=1))
+        batches, failed, written = [], 0, 0
+        started = time.perf_counter()
+        for i in range(0, len(rows), 1000):
+            t = time.perf_counter()
+            try:
+                await db.store_sentiment_batch(rows[i:i + 1000])
+            except Exception:
+                failed += 1
+                continue
+            batches.append((time.perf_counter() - t) * 1000)
+            written += len(rows[i:i + 1000])
+        write_s = time.perf_counter() - started
+
+        trend = []
+        for symbol in symbols[:args.reads * 10]:   # 종목마다 TTL 캐시 miss → Influx 조회 경로
+            t = time.perf_counter()
+            await db.get_sentiment_trend(symbol, hours=24)
+            trend.append((time.perf_counter() - t) * 1000)
+        t = time.perf_counter()
+        await db.aggregate_range(symbols, datetime.utcnow() - timedelta(days=7), datetime.utcnow(), "1h")
+        range_ms = (time.perf_counter() - t) * 1000
+    finally:
+        await db.shutdown()
+    return {"rows": len(rows), "failed_batches": failed,
+            "write_rows_per_s": round(written / write_s, 1),
+            "batch_ms": _percentiles(batches), "trend_ms": _percentiles(trend),
+            "aggregate_range_ms": round(range_ms, 3)}
+
+async def bench_cold(args, faults, services, workdir: str) -> dict:
+    from storage import ColdStorage
+    cold = ColdStorage()
+    cold.cache_dir = os.path.join(workdir, "cold-cache")
+    await cold.startup()
+    symbols = _symbols(args.symbols)
+    day = (datetime.utcnow() - timedelta(days=60)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = ({"symbol": r["symbol"], "timestamp": r["timestamp"], "sentiment_score": r["score"],
+             "sentiment_label": r["label"], "confidence": r["confidence"]}
+            for r in _rows(symbols, args.cold_rows, day, timedelta(days=1)))
+    started = time.perf_counter()
+    path = await cold.archive_sentiment_data(rows, day, part_name="bench")
+    archive_s = time.perf_counter() - started
+
+    scans = []
+    for _ in range(args.reads):
+        t = time.perf_counter()
+        table = await cold.aggregate_range(symbols, day, day + timedelta(days=1), 3600)
+        scans.append((time.perf_counter() - t) * 1000)
+    return {"rows": args.cold_rows, "archived": bool(path),
+            "archive_rows_per_s": round(args.cold_rows / archive_s, 1),
+            "s3_bytes": services.stats()["s3_bytes"], "buckets": table.num_rows,
+            "aggregate_range_ms": _percentiles(scans),
+            "scan_rows_per_s": round(args.cold_rows / (min(scans) / 1000), 1)}
+
+async def bench_vector(args, faults, workdir: str) -> dict:
+    from embedder import TextEmbedder
+    from storage import VectorSearch
+    vector = VectorSearch()
+    vector.index_dir = os.path.join(workdir, "vector-tier")
+    await vector.startup()
+    embedder = TextEmbedder(vector)
+    fakes.install_encoder(embedder, faults["encoder"])
+    await embedder.start()
+    mcp = fakes.FakeMCP(faults["mcp"], args.tweets, args.dup_ratio, args.seed)
+    mcp.fault = fakes.Fault("mcp-local")   # 트윗 생성만 사용 (MCP 지연 제외)
+    try:
+        batches = [(await mcp.call("twitter", "search_tweets", {"query": s}))["tweets"]
+                   for s in _symbols(args.symbols)]
+        texts = sum(len(b) for b in batches)
+        started = time.perf_counter()
+        for symbol, tweets in zip(_symbols(args.symbols), batches):
+            embedder.submit(symbol, tweets)
+        await embedder.stop()       # 큐 drain + 마지막 적재까지
+        ingest_s = time.perf_counter() - started
+        stats = embedder.get_stats()
+
+        queries = await embedder.encode([b[0]["text"] for b in batches[:args.reads * 10]])
+        search = []
+        loop = asyncio.get_running_loop()
+        for q in queries:
+            t = time.perf_counter()
+            await loop.run_in_executor(None, vector.similar_many, q[None], 10)
+            search.append((time.perf_counter() - t) * 1000)
+    finally:
+        await vector.shutdown()
+    return {"texts": texts, "ingest_texts_per_s": round(texts / ingest_s, 1),
+            "search_ms": _percentiles(search), "embedder": stats}
+
+async def bench_kafka(args, faults) -> dict:
+    from data_streamer import Streamer
+    stream = Streamer()
+    events = _rows(_symbols(args.symbols), args.events, datetime.utcnow(), timedelta(minutes=1))
+    batches, failed, sent = [], 0, 0
+    started = time.perf_counter()
+    for i in range(0, len(events), 500):
+        chunk = events[i:i + 500]
+        t = time.perf_counter()
+        try:
+            await stream.send_many("stock-sentiment", [(e["symbol"], e) for e in chunk])
+        except Exception:
+            failed += 1
+            continue
+        batches.append((time.perf_counter() - t) * 1000)
+        sent += len(chunk)
+    send_s = time.perf_counter() - started
+    stream.producer.close()
+    return {"messages": len(events), "failed_batches": failed,
+            "messages_per_s": round(sent / send_s, 1),
+            "batch_ms": _percentiles(batches), "bytes": stream.producer.bytes}
+
+# ---------------------------------------------------------- #
+#                  RUNNER                                    #
+# ---------------------------------------------------------- #
+def _lookup(results: dict, path: str):
+    value = results
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def check_claims(results: dict) -> dict:
+    report = {}
+    for name, (path, op, target) in CLAIMS.items():
+        value = _lookup(results, path)
+        passed = None if value is None else (value >= target if op == ">=" else value <= target)
+        report[name] = {"path": path, "target": f"{op} {target}", "value": value, "pass": passed}
+    return report
+
+async def run(args, faults) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-e2e-") as workdir:
+        services = fakes.install(faults, os.path.join(workdir, "object-storage"))
+        for name in args.only:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            try:
+                if name == "collect":
+                    result = await bench_collect(args, faults, workdir)
+                elif name == "scheduler":
+                    result = await bench_scheduler(args, faults, workdir)
+                elif name == "hot":
+                    result = await bench_hot(args, faults, services)
+                elif name == "warm":
+                    result = await bench_warm(args, faults, services)
+                elif name == "cold":
+                    result = await bench_cold(args, faults, services, workdir)
+                elif name == "vector":
+                    result = await bench_vector(args, faults, workdir)
+                else:
+                    result = await bench_kafka(args, faults)
+            except Exception as e:
+                logging.exception(f"{name} benchmark failed")
+                result = {"error": repr(e)}
+            result["wall_s"] = round(time.perf_counter() - started, 3)
+            result["memory"] = _memory()
+            results[name] = result
+            print(f"{name:>9}: {_summary(name, result)}", file=sys.stderr)
+        stats = services.stats()
+    return {"services": stats, "results": results}
+
+def _summary(name: str, result: dict) -> str:
+    if "error" in result:
+        return f"ERROR {result['error']}"
+    keys = {"collect": ("tweets_per_min", "cycle_ms"), "scheduler": ("tweets_per_min", "cycle_ms"),
+            "hot": ("write_events_per_s", "cache_hit_ms"), "warm": ("write_rows_per_s", "trend_ms"),
+            "cold": ("archive_rows_per_s", "aggregate_range_ms"),
+            "vector": ("ingest_texts_per_s", "search_ms"), "kafka": ("messages_per_s", "batch_ms")}[name]
+    rate, latency = result[keys[0]], result[keys[1]]
+    return (f"{keys[0]}={rate:,.0f}  {keys[1]} p50={latency.get('p50', 0):.2f} "
+            f"p95={latency.get('p95', 0):.2f}  rss={result['memory']['max_rss_mb']}MB")
+
+def _parse_overrides(items: list[str]) -> tuple[dict, dict]:
+    """svc=ms[:jitter] / svc=rate 목록 → (값, jitter)"""
+    values, jitter = {}, {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in fakes.SERVICES:
+            raise SystemExit(f"unknown service '{name}' (choose from {', '.join(fakes.SERVICES)})")
+        value, _, spread = value.partition(":")
+        values[name] = float(value)
+        if spread:
+            jitter[name] = float(spread)
+    return values, jitter
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="comma separated scenarios")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--tweets", type=int, default=100, help="tweets per search_tweets call")
+    parser.add_argument("--dup-ratio", type=float, default=0.2, help="share of repeated tweet texts")
+    parser.add_argument("--rounds", type=int, default=5, help="collect rounds over all symbols")
+    parser.add_argument("--duration", type=float, default=30, help="scheduler run seconds")
+    parser.add_argument("--events", type=int, default=20_000, help="events per hot/warm/kafka write run")
+    parser.add_argument("--cold-rows", type=int, default=500_000)
+    parser.add_argument("--reads", type=int, default=5, help="read repetitions per tier (>= 1)")
+    parser.add_argument("--latency", action="append", default=[], metavar="SVC=MS[:JITTER]")
+    parser.add_argument("--fail", action="append", default=[], metavar="SVC=RATE")
+    parser.add_argument("--light-model", choices=("fake", "real"), default="fake",
+                        help="fake: skip the transformers quick_sentiment model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc peak per scenario (slower)")
+    parser.add_argument("--out", help="append the JSON result as one line (default: stdout)")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a README target is missed")
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+    args.reads = max(args.reads, 1)
+    args.only = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(args.only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    logging.basicConfig(level=args.log_level)
+
+    # config.Settings 필수 키 (fake 서비스라 실제 값 불필요)
+    for key in ("TWITTER_BEARER_TOKEN", "ALPHA_VANTAGE_KEY", "HYPERCLOVA_X_API_KEY"):
+        os.environ.setdefault(key, "bench")
+    if args.light_model == "fake":
+        sys.modules.setdefault("sentiment_analyzer", fakes.fake_light_model())
+
+    latency, jitter = _parse_overrides(args.latency)
+    failures, _ = _parse_overrides(args.fail)
+    faults = fakes.make_faults(latency, jitter, failures, args.seed)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    outcome = asyncio.run(run(args, faults))
+    record = {
+        "meta": {"timestamp": datetime.utcnow().isoformat() + "Z", "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("out", "check", "log_level")}},
+        **outcome,
+        "claims": check_claims(outcome["results"]),
+    }
+    line = json.dumps(record, default=str)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(line + "\n")
+    else:
+        print(line)
+
+    for name, claim in record["claims"].items():
+        status = {True: "PASS", False: "FAIL", None: "SKIP"}[claim["pass"]]
+        print(f"{status}  {name:<18} {claim['value']} (target {claim['target']})", file=sys.stderr)
+    if args.check and any(c["pass"] is False for c in record["claims"].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+HotDB 최신 점수 조회 벤치마크: get_latest 반복 vs get_latest_many
+- 10 / 100 / 1000 종목, 캐시 hit(warm) / miss(cold) 두 경우
+- settings.POSTGRES_URL / REDIS_URL 의 실제 서버 사용
+
+실행: python -m benchmarks.bench_hot_latest [--repeat 5]
+"""
+import argparse, asyncio, logging, statistics, time
+from storage.hot_db import HotDB
+
+SIZES = (10, 100, 1000)
+
+async def _timed(coro_fn, repeat: int, setup=None) -> float:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            await setup()
+        started = time.perf_counter()
+        await coro_fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+async def run(repeat: int):
+    db = HotDB(write_behind=True, batch_size=max(SIZES))
+    await db.startup()
+    try:
+        symbols = [f"BM{i:04d}" for i in range(max(SIZES))]
+        for i, symbol in enumerate(symbols):
+            await db.put(symbol, (i % 100) / 100, "neutral", 0.5)
+        await db.flush()
+
+        async def evict(batch):  # 캐시 miss 유도 (측정 구간 밖)
+            await db.cache.delete(*[f"sent:{s}" for s in batch])
+
+        print(f"{'symbols':>8} {'cache':>6} {'get_latest ms':>15} {'get_latest_many ms':>20} {'speedup':>8}")
+        for n in SIZES:
+            batch = symbols[:n]
+
+            async def loop_single():
+                for s in batch:
+                    await db.get_latest(s)
+
+            async def bulk():
+                await db.get_latest_many(batch)
+
+            for mode in ("warm", "cold"):
+                if mode == "warm":
+                    await bulk()
+                    single = await _timed(loop_single, repeat)
+                    many = await _timed(bulk, repeat)
+                else:
+                    single = await _timed(loop_single, repeat, setup=lambda: evict(batch))
+                    many = await _timed(bulk, repeat, setup=lambda: evict(batch))
+                print(f"{n:>8} {mode:>6} {single:>15.2f} {many:>20.2f} {single / many:>7.1f}x")
+    finally:
+        async with db.pg.acquire() as c:
+            await c.execute("DELETE FROM sentiment WHERE symbol LIKE 'BM%'")
+        await db.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(parser.parse_args().repeat))
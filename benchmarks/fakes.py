@@ -0,0 +1,595 @@
+"""
+벤치마크용 in-process 외부 서비스 fake (지연·실패 주입)
+- MCP(twitter / alpha_vantage), HyperCLOVA X, PostgreSQL, Redis, InfluxDB, OpenSearch,
+  S3(NAVER Object Storage), Kafka, 임베딩 인코더
+- 각 서비스는 Fault(latency_ms, jitter_ms, failure_rate) 하나를 공유, 호출·실패 횟수 집계
+- install() 은 클라이언트 생성 지점(모듈 속성)만 교체 → 티어 코드(batch, 재시도, 캐시)는 실제 경로 그대로 실행
+"""
+import asyncio, hashlib, os, random, time, types
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+import pyarrow.fs as pafs
+
+SERVICES = ("mcp", "clova", "postgres", "redis", "influx", "opensearch", "s3", "kafka", "encoder")
+
+# 서비스별 기본 지연 (ms, 같은 리전 관리형 서비스 수준 가정)
+DEFAULT_LATENCY_MS = {
+    "mcp": 50.0, "clova": 800.0, "postgres": 1.0, "redis": 0.3, "influx": 3.0,
+    "opensearch": 5.0, "s3": 20.0, "kafka": 2.0, "encoder": 0.0,
+}
+
+class InjectedFault(Exception):
+    """Fault 가 주입한 실패"""
+
+
+class Fault:
+    """호출당 지연(정규분포, 0 이상) + 확률적 실패"""
+
+    def __init__(self, name: str, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(f"{seed}:{name}")
+        self.calls = 0
+        self.failures = 0
+
+    def _delay(self) -> float:
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.failures += 1
+            raise InjectedFault(f"{self.name}: injected failure")
+
+    async def hit(self):
+        self.calls += 1
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self._maybe_fail()
+
+    def hit_sync(self):
+        self.calls += 1
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        self._maybe_fail()
+
+    def to_dict(self) -> dict:
+        return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms,
+                "failure_rate": self.failure_rate, "calls": self.calls, "failures": self.failures}
+
+
+def make_faults(latency: dict | None = None, jitter: dict | None = None,
+                failures: dict | None = None, seed: int = 0) -> dict[str, Fault]:
+    """지정하지 않은 서비스는 기본 지연, jitter 는 지연의 20%"""
+    latency = {**DEFAULT_LATENCY_MS, **(latency or {})}
+    jitter, failures = jitter or {}, failures or {}
+    return {name: Fault(name, latency[name], jitter.get(name, latency[name] * 0.2),
+                        failures.get(name, 0.0), seed)
+            for name in SERVICES}
+
+
+# ---------------------------------------------------------- #
+#                  MCP / HYPERCLOVA X                        #
+# ---------------------------------------------------------- #
+class FakeMCP:
+    """search_tweets / get_quote 응답 생성 (dup_ratio 비율은 이전 텍스트 재사용 → 임베딩 dedup 경로)"""
+
+    def __init__(self, fault: Fault, tweets_per_call: int = 100, dup_ratio: float = 0.2, seed: int = 0):
+        self.fault = fault
+        self.tweets_per_call = tweets_per_call
+        self.dup_ratio = dup_ratio
+        self._rng = random.Random(seed)
+        self._seq = 0
+
+    async def call(self, server: str, tool: str, params: dict) -> dict:
+        await self.fault.hit()
+        if tool == "search_tweets":
+            symbol = params["query"]
+            tweets = []
+            for _ in range(self.tweets_per_call):
+                if self._seq and self._rng.random() < self.dup_ratio:
+                    n = self._rng.randrange(self._seq)
+                else:
+                    n = self._seq = self._seq + 1
+                tweets.append({"id": str(n), "text": f"${symbol} tweet {n} outlook looks "
+                                                     f"{'bullish' if n % 3 else 'bearish'} today",
+                               "created_at": datetime.utcnow().isoformat() + "Z"})
+            return {"tweets": tweets}
+        if tool == "get_quote":
+            return {"symbol": params["symbol"], "price": 100 + self._rng.random(), "volume": 1_000_000}
+        return {}
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+def fake_clova(fault: Fault):
+    """clova_sentiment 대체 (agent.clova_sentiment 에 주입)"""
+    async def clova_sentiment(texts: list[str], meta: dict) -> dict:
+        await fault.hit()
+        score = (int(hashlib.md5("".join(texts[:10]).encode()).hexdigest()[:4], 16) % 1000) / 1000
+        return {"sentiment_score": score,
+                "sentiment_label": "positive" if score > .6 else "negative" if score < .4 else "neutral",
+                "confidence": 0.8}
+    return clova_sentiment
+
+
+def fake_light_model() -> types.ModuleType:
+    """sentiment_analyzer 대체 모듈 (경량 모델 로드 없이 I/O 경로만 측정할 때)"""
+    module = types.ModuleType("sentiment_analyzer")
+    module.quick_sentiment = lambda text: {"label": "neutral", "score": .5}
+
+    async def clova_sentiment(texts, meta):
+        return {}
+    module.clova_sentiment = clova_sentiment
+    return module
+
+
+# ---------------------------------------------------------- #
+#                  REDIS / POSTGRESQL                        #
+# ---------------------------------------------------------- #
+class FakeRedis:
+    def __init__(self, fault: Fault):
+        self.fault = fault
+        self.data: dict[str, bytes] = {}
+        self._subscribers: dict[str, list[asyncio.Queue]] = defaultdict(list)
+
+    async def get(self, key):
+        await self.fault.hit()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        await self.fault.hit()
+        return [self.data.get(k) for k in keys]
+
+    async def setex(self, key, ttl, value):
+        await self.fault.hit()
+        self._set(key, value)
+
+    async def publish(self, channel, message):
+        await self.fault.hit()
+        return self._publish(channel, message)
+
+    def _set(self, key, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def _publish(self, channel, message) -> int:
+        for queue in self._subscribers[channel]:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(self._subscribers[channel])
+
+    def pipeline(self, transaction: bool = False):
+        return FakeRedisPipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def close(self):
+        pass
+
+
+class FakeRedisPipeline:
+    """명령을 모아 execute() 한 번(round-trip 1회)으로 반영"""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.ops = []
+
+    def setex(self, key, ttl, value):
+        self.ops.append((self.redis._set, key, value))
+
+    def publish(self, channel, message):
+        self.ops.append((self.redis._publish, channel, message))
+
+    async def execute(self):
+        await self.redis.fault.hit()
+        return [fn(*args) for fn, *args in self.ops]
+
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.channels: list[str] = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+        self.redis._subscribers[channel].append(self.queue)
+
+    async def unsubscribe(self, channel):
+        self.redis._subscribers[channel].remove(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        pass
+
+
+class FakePostgres:
+    """asyncpg pool 대체: sentiment 쓰기는 종목별 최신 값만 유지 (메모리 일정), 나머지 DDL/쿼리는 no-op"""
+
+    def __init__(self, fault: Fault):
+        self.fault = fault
+        self.latest: dict[str, dict] = {}
+        self.rows_written = 0
+
+    def acquire(self):
+        return FakePGConnection(self)
+
+    async def close(self):
+        pass
+
+    def _insert(self, rows):
+        for symbol, score, label, confidence, ts in rows:
+            self.latest[symbol] = {"symbol": symbol, "score": score, "label": label,
+                                   "confidence": confidence, "ts": ts}
+        self.rows_written += len(rows)
+
+
+class FakePGConnection:
+    def __init__(self, pool: FakePostgres):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def transaction(self):
+        return self
+
+    async def execute(self, sql, *args):
+        await self.pool.fault.hit()
+        if sql.lstrip().startswith("INSERT INTO sentiment("):
+            self.pool._insert([args])
+        return "OK"
+
+    async def executemany(self, sql, rows):
+        await self.pool.fault.hit()
+        self.pool._insert(list(rows))
+
+    async def copy_records_to_table(self, table, records, columns):
+        await self.pool.fault.hit()
+        self.pool._insert(list(records))
+
+    async def fetchval(self, sql, *args):
+        await self.pool.fault.hit()
+        return None
+
+    async def fetchrow(self, sql, *args):
+        await self.pool.fault.hit()
+        if "FROM sentiment" in sql and args:
+            return self.pool.latest.get(args[0])
+        return None
+
+    async def fetch(self, sql, *args):
+        await self.pool.fault.hit()
+        if "DISTINCT ON (symbol)" in sql:
+            return [self.pool.latest[s] for s in args[0] if s in self.pool.latest]
+        return []
+
+    def cursor(self, *args, **kwargs):
+        return _EmptyCursor()
+
+
+class _EmptyCursor:
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+# ---------------------------------------------------------- #
+#                  INFLUXDB / OPENSEARCH                     #
+# ---------------------------------------------------------- #
+class FakeInfluxClient:
+    """InfluxDBClient 대체 (batching write_api 는 적재만, synchronous 는 호출마다 지연)"""
+
+    def __init__(self, fault: Fault, **kwargs):
+        self.fault = fault
+        self.points_written = 0
+
+    def write_api(self, write_options=None, **callbacks):
+        batching = str(getattr(write_options, "write_type", "")).endswith("batching")
+        return FakeWriteApi(self, blocking=not batching)
+
+    def query_api(self):
+        return FakeQueryApi(self.fault)
+
+    def tasks_api(self):
+        return types.SimpleNamespace(find_tasks=lambda name: [name])   # 롤업 task 가 이미 있는 것으로 처리
+
+    def organizations_api(self):
+        return types.SimpleNamespace(find_organizations=lambda org: [types.SimpleNamespace(id=org)])
+
+    def close(self):
+        pass
+
+
+class FakeWriteApi:
+    def __init__(self, client: FakeInfluxClient, blocking: bool):
+        self.client = client
+        self.blocking = blocking
+
+    def write(self, bucket, record, **kwargs):
+        if self.blocking:
+            self.client.fault.hit_sync()
+        self.client.points_written += len(record) if isinstance(record, list) else 1
+
+    def close(self):
+        pass
+
+
+class FakeQueryApi:
+    def __init__(self, fault: Fault):
+        self.fault = fault
+
+    def query(self, query):
+        self.fault.hit_sync()
+        return []
+
+    def query_stream(self, query):
+        self.fault.hit_sync()
+        return iter(())
+
+
+class FakeOpenSearch:
+    def __init__(self, fault: Fault, **kwargs):
+        self.fault = fault
+        self.docs_indexed = 0
+        self.indices = types.SimpleNamespace(
+            put_index_template=lambda **kw: None, exists=lambda *a, **kw: True,
+            create=lambda *a, **kw: None, get=lambda **kw: {}, delete=lambda *a, **kw: None)
+
+    def bulk_helper(self, client, actions, **kwargs):
+        """opensearchpy.helpers.bulk 대체 (요청 1회)"""
+        self.fault.hit_sync()
+        actions = list(actions)
+        self.docs_indexed += len(actions)
+        return len(actions), []
+
+    def search(self, **kwargs):
+        self.fault.hit_sync()
+        return {"hits": {"hits": []}, "aggregations": {}}
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------- #
+#                  S3 / KAFKA                                #
+# ---------------------------------------------------------- #
+class _NoSuchKey(Exception):
+    def __init__(self, key):
+        super().__init__(key)
+        self.response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class _PreconditionFailed(Exception):
+    def __init__(self, key):
+        super().__init__(key)
+        self.response = {"Error": {"Code": "PreconditionFailed"}}
+
+
+class FakeS3:
+    """
+    boto3 s3 client 대체 (root/<bucket>/<key> 로컬 파일, multipart 지원)
+    cold 스캔의 Arrow 파일시스템(arrow_filesystem)도 같은 디렉터리를 읽음 (이 경로는 지연 미적용)
+    """
+
+    def __init__(self, fault: Fault, root: str):
+        self.fault = fault
+        self.root = root
+        self.objects: dict[str, tuple] = {}     # key → (path, size, etag)
+        self._uploads: dict[str, list] = {}
+
+    def arrow_filesystem(self):
+        return pafs.SubTreeFileSystem(self.root, pafs.LocalFileSystem())
+
+    def _store(self, bucket: str, key: str, chunks) -> dict:
+        path = os.path.join(self.root, bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest, size = hashlib.md5(), 0
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        self.objects[key] = (path, size, f'"{digest.hexdigest()}"')
+        return {"ETag": self.objects[key][2]}
+
+    def _get(self, key: str) -> tuple:
+        if key not in self.objects:
+            raise _NoSuchKey(key)
+        return self.objects[key]
+
+    def head_bucket(self, Bucket):
+        self.fault.hit_sync()
+
+    def create_bucket(self, Bucket, **kwargs):
+        self.fault.hit_sync()
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        self.fault.hit_sync()
+        current = self.objects.get(Key)
+        if (IfNoneMatch == "*" and current) or (IfMatch and (not current or current[2] != IfMatch)):
+            raise _PreconditionFailed(Key)
+        body = bytes(Body) if isinstance(Body, (bytes, bytearray, memoryview)) else Body.read()
+        return self._store(Bucket, Key, [body])
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.fault.hit_sync()
+        path, size, etag = self._get(Key)
+        return {"Body": open(path, "rb"), "ContentLength": size, "ETag": etag}
+
+    def head_object(self, Bucket, Key):
+        self.fault.hit_sync()
+        _, size, etag = self._get(Key)
+        return {"ETag": etag, "ContentLength": size}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.fault.hit_sync()
+        upload_id = f"{Key}:{len(self._uploads)}"
+        self._uploads[upload_id] = []
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.fault.hit_sync()
+        part = bytes(Body)
+        self._uploads[UploadId].append(part)
+        return {"ETag": f'"{hashlib.md5(part).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.fault.hit_sync()
+        return self._store(Bucket, Key, self._uploads.pop(UploadId))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId, None)
+
+    def delete_objects(self, Bucket, Delete):
+        self.fault.hit_sync()
+        for obj in Delete["Objects"]:
+            entry = self.objects.pop(obj["Key"], None)
+            if entry:
+                os.remove(entry[0])
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+        self.fault.hit_sync()
+        contents = [{"Key": k, "Size": size, "ETag": etag, "LastModified": datetime.utcnow()}
+                    for k, (_, size, etag) in sorted(self.objects.items()) if k.startswith(Prefix)]
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def get_paginator(self, name):
+        s3 = self
+        return types.SimpleNamespace(
+            paginate=lambda Bucket, Prefix="", **kw: iter([s3.list_objects_v2(Bucket, Prefix)]))
+
+
+class FakeKafkaFuture:
+    def __init__(self, fault: Fault):
+        self.fault = fault
+
+    def get(self, timeout=None):
+        self.fault.hit_sync()
+
+
+class FakeKafkaProducer:
+    """KafkaProducer 대체 (ack 대기 시 지연, send 는 직렬화만 수행)"""
+
+    def __init__(self, fault: Fault, value_serializer=None, key_serializer=None, **kwargs):
+        self.fault = fault
+        self.value_serializer = value_serializer or (lambda v: v)
+        self.key_serializer = key_serializer or (lambda k: k)
+        self.messages = 0
+        self.bytes = 0
+        self._acked = Fault("kafka-ack")
+
+    def send(self, topic, key=None, value=None):
+        payload = self.value_serializer(value)
+        self.key_serializer(key)
+        self.messages += 1
+        self.bytes += len(payload)
+        # 같은 batch 의 ack 는 한 번의 round-trip 으로 도착한다고 보고 첫 future 만 지연
+        return FakeKafkaFuture(self.fault if self.messages % 500 == 1 else self._acked)
+
+    def flush(self, timeout=None):
+        self.fault.hit_sync()
+
+    def close(self, timeout=None):
+        pass
+
+
+# ---------------------------------------------------------- #
+#                  EMBEDDING ENCODER                         #
+# ---------------------------------------------------------- #
+class FakeEncoder:
+    """TextEmbedder._encode_sync 대체: 텍스트 해시 seed 의 결정적 단위 벡터 (batch 당 Fault 1회)"""
+
+    def __init__(self, embedder, fault: Fault):
+        self.embedder = embedder
+        self.fault = fault
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        started = time.perf_counter()
+        out = np.empty((len(texts), self.embedder.DIM), dtype=np.float32)
+        for i in range(0, len(texts), self.embedder.batch_size):
+            self.fault.hit_sync()
+            for j, text in enumerate(texts[i:i + self.embedder.batch_size], start=i):
+                seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+                out[j] = np.random.default_rng(seed).standard_normal(self.embedder.DIM)
+        out /= np.linalg.norm(out, axis=1, keepdims=True)
+        self.embedder.metrics["encoded"] += len(texts)
+        self.embedder.metrics["encode_seconds"] += time.perf_counter() - started
+        return out
+
+
+# ---------------------------------------------------------- #
+#                  INSTALL                                   #
+# ---------------------------------------------------------- #
+class FakeServices:
+    """fake 인스턴스 묶음 (벤치마크 결과에 서비스 측 카운터 포함)"""
+
+    def __init__(self, faults: dict[str, Fault], root: str):
+        self.faults = faults
+        self.redis = FakeRedis(faults["redis"])
+        self.postgres = FakePostgres(faults["postgres"])
+        self.influx = FakeInfluxClient(faults["influx"])
+        self.opensearch = FakeOpenSearch(faults["opensearch"])
+        self.s3 = FakeS3(faults["s3"], root)
+
+    def stats(self) -> dict:
+        return {
+            "faults": {name: f.to_dict() for name, f in self.faults.items()},
+            "postgres_rows": self.postgres.rows_written,
+            "influx_points": self.influx.points_written,
+            "opensearch_docs": self.opensearch.docs_indexed,
+            "s3_objects": len(self.s3.objects),
+            "s3_bytes": sum(size for _, size, _ in self.s3.objects.values()),
+        }
+
+
+def install(faults: dict[str, Fault], root: str) -> FakeServices:
+    """
+    스토리지·스트리밍 모듈의 클라이언트 생성 지점을 fake 로 교체
+    (StorageManager / Streamer 생성 전에 호출, 모든 인스턴스가 같은 fake 서비스를 공유)
+    root: fake Object Storage 파일 디렉터리
+    """
+    import data_streamer
+    from storage import cold_db, hot_db, warm_db
+
+    services = FakeServices(faults, root)
+
+    async def create_pool(*args, **kwargs):
+        return services.postgres
+
+    async def from_url(*args, **kwargs):
+        return services.redis
+
+    hot_db.asyncpg = types.SimpleNamespace(create_pool=create_pool, PostgresError=InjectedFault)
+    hot_db.aioredis = types.SimpleNamespace(from_url=from_url)
+    warm_db.InfluxDBClient = lambda **kwargs: services.influx
+    warm_db.OpenSearch = lambda **kwargs: services.opensearch
+    warm_db.helpers = types.SimpleNamespace(bulk=services.opensearch.bulk_helper)
+    cold_db.boto3 = types.SimpleNamespace(client=lambda *args, **kwargs: services.s3)
+    cold_db.pafs = types.SimpleNamespace(S3FileSystem=lambda **kwargs: services.s3.arrow_filesystem(),
+                                         LocalFileSystem=pafs.LocalFileSystem)
+    data_streamer.KafkaProducer = lambda **kwargs: FakeKafkaProducer(faults["kafka"], **kwargs)
+    return services
+
+
+def install_encoder(embedder, fault: Fault):
+    """TextEmbedder 의 모델 로드·인코딩을 FakeEncoder 로 교체 (torch / transformers 불필요)"""
+    embedder._load_model = lambda: None
+    embedder._encode_sync = FakeEncoder(embedder, fault)
@@ -22,6 +22,7 @@ class Settings(BaseSettings):
 
     # === CLOVA STUDIO ===
     CLOVA_ENDPOINT: str = "https://clovastudio.stream.ntruss.com"
+    CLOVA_RECORD_PATH: str | None = None   # 응답 녹화 JSONL (replay.py --recordings 입력)
 
     class Config:
         env_file = Path(__file__).parent / ".env"
@@ -20,4 +20,11 @@ class Streamer:
             await asyncio.get_event_loop().run_in_executor(None, fut.get, 10)
             logging.debug("→ Kafka %s", topic)
         except Exception as e:
-            logging.error("Kafka send error %s", e)
\ No newline at end of file
+            logging.error("Kafka send error %s", e)
+
+    async def send_many(self, topic: str, items: list[tuple[str | None, dict]]):
+        """여러 메시지 전송 후 ack 를 한 번에 대기 (실패 시 예외 전파 → 호출자가 재시도)"""
+        futures = [self.producer.send(topic, key=key, value=value) for key, value in items]
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [f.get(10) for f in futures])
+        logging.debug("→ Kafka %s (%d)", topic, len(items))
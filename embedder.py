@@ -0,0 +1,250 @@
+"""
+RAG 용 텍스트 임베딩 단계
+- collect() 에서 이미 가져온 트윗 텍스트를 큐로 받아 batch 단위 CPU 인코딩
+- 텍스트 해시 기준 dedup (적재 성공한 해시만, 벡터 TTL 이 지나면 다시 적재)
+- 인코딩 결과는 LRU 캐시 (벡터는 미리 할당한 float32 행렬에 보관)
+- 새 텍스트만 대량 batch 로 벡터 스토어에 적재 (NumPy 버퍼 그대로 전달)
+"""
+import asyncio, hashlib, logging, time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from config import settings
+
+class TextEmbedder:
+    DIM = 768
+
+    def __init__(self, vector, model_name: str | None = None):
+        self.vector = vector
+        self.model_name = model_name or getattr(settings, "EMBED_MODEL", "klue/roberta-base")
+        self.batch_size = getattr(settings, "EMBED_BATCH_SIZE", 64)
+        self.max_length = getattr(settings, "EMBED_MAX_LENGTH", 128)
+        self.insert_batch = getattr(settings, "EMBED_INSERT_BATCH", 2048)
+        self.flush_interval = getattr(settings, "EMBED_FLUSH_INTERVAL", 5.0)
+        self.cache_size = getattr(settings, "EMBED_CACHE_SIZE", 100_000)
+        # 벡터 스토어 TTL 과 같게 → 만료된 텍스트는 다시 적재
+        self.stored_ttl = timedelta(days=getattr(settings, "VECTOR_TTL_DAYS", 7)).total_seconds()
+
+        self._tokenizer = self._model = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=getattr(settings, "EMBED_QUEUE_SIZE", 10_000))
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+        # 해시 → 캐시 행 (LRU), 벡터는 cache_size × DIM 행렬에 저장
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._cache_vecs = np.empty((self.cache_size, self.DIM), dtype=np.float32)
+        self._free = list(range(self.cache_size - 1, -1, -1))
+
+        # 벡터 스토어에 적재 완료된 해시 → 만료 시각 (LRU, cache_size 개)
+        self._stored: OrderedDict[bytes, float] = OrderedDict()
+        # 적재 대기·진행 중인 해시 (batch 간 중복 방지, 실패 시 제거되어 다음에 재시도)
+        self._inflight: set[bytes] = set()
+
+        # 벡터 스토어 적재 대기 버퍼
+        self._pending = np.empty((self.insert_batch, self.DIM), dtype=np.float32)
+        self._pending_meta: list[dict] = []
+        self._last_flush = time.monotonic()
+
+        self.metrics = {"texts": 0, "cache_hits": 0, "encoded": 0, "inserted": 0,
+                        "dropped": 0, "encode_seconds": 0.0}
+
+    # ---------------------------------------------------------- #
+    #                  LIFECYCLE                                 #
+    # ---------------------------------------------------------- #
+    async def start(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._load_model)
+        self._task = asyncio.create_task(self._run())
+        logging.info("Embedder up (%s)", self.model_name)
+
+    async def stop(self):
+        # cancel 대신 플래그 (wait_for 가 cancel 을 삼키는 경우 방지), 최대 flush_interval 대기
+        self._closing = True
+        if self._task:
+            await self._task
+            self._task = None
+        while not self._queue.empty():
+            await self._drain()
+        await self.flush()
+
+    def _load_model(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        torch.set_num_threads(getattr(settings, "EMBED_THREADS", torch.get_num_threads()))
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModel.from_pretrained(self.model_name).eval()
+
+    # ---------------------------------------------------------- #
+    #                  PUBLIC  METHODS                           #
+    # ---------------------------------------------------------- #
+    def submit(self, symbol: str, tweets: list[dict]):
+        """collect() 용 비차단 등록 (큐가 가득 차면 버림 → 수집 경로 지연 없음)"""
+        for t in tweets:
+            text = (t.get("text") or "").strip()
+            if not text:
+                continue
+            try:
+                self._queue.put_nowait((symbol, text, t))
+            except asyncio.QueueFull:
+                self.metrics["dropped"] += 1
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """텍스트 → (n, DIM) 임베딩 (캐시 우선, 미스만 batch 인코딩)"""
+        keys = [self._hash(t) for t in texts]
+        out = np.empty((len(texts), self.DIM), dtype=np.float32)
+        missing: dict[bytes, list[int]] = {}
+        for i, key in enumerate(keys):
+            row = self._cache.get(key)
+            if row is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                self._cache.move_to_end(key)
+                out[i] = self._cache_vecs[row]
+        if missing:
+            first = [idx[0] for idx in missing.values()]
+            vecs = await asyncio.get_running_loop().run_in_executor(
+                None, self._encode_sync, [texts[i] for i in first])
+            for (key, idx), vec in zip(missing.items(), vecs):
+                self._cache_put(key, vec)
+                out[idx] = vec
+        return out
+
+    async def flush(self):
+        """대기 중인 벡터를 한 번에 적재"""
+        n = len(self._pending_meta)
+        if not n:
+            return
+        # 채운 버퍼를 통째로 넘기고 새 버퍼로 교체 (insert 중에도 _drain 이 앞 행부터 다시 기록)
+        vectors, metas = self._pending[:n], self._pending_meta
+        self._pending = np.empty_like(self._pending)
+        self._pending_meta = []
+        keys = [bytes.fromhex(m["text_hash"]) for m in metas]
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.vector.insert_many, vectors, metas)
+            self.metrics["inserted"] += n
+            for key, meta in zip(keys, metas):
+                self._mark_stored(key, meta["ts"].timestamp() + self.stored_ttl)
+        except Exception as e:
+            logging.error("Embedding insert failed (%d vectors): %s", n, e)
+        finally:
+            self._inflight.difference_update(keys)
+        self._last_flush = time.monotonic()
+
+    def get_stats(self) -> dict:
+        return {**self.metrics, "queued": self._queue.qsize(), "cached": len(self._cache),
+                "stored": len(self._stored), "pending": len(self._pending_meta)}
+
+    # ---------------------------------------------------------- #
+    #                  INTERNAL HELPERS                          #
+    # ---------------------------------------------------------- #
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    @staticmethod
+    def _tweet_time(value) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.now()
+
+    def _cache_put(self, key: bytes, vec: np.ndarray):
+        if not self._free:
+            _, row = self._cache.popitem(last=False)
+            self._free.append(row)
+        row = self._free.pop()
+        self._cache_vecs[row] = vec
+        self._cache[key] = row
+
+    def _is_stored(self, key: bytes, now: float) -> bool:
+        expires = self._stored.get(key)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self._stored[key]
+            return False
+        self._stored.move_to_end(key)
+        return True
+
+    def _mark_stored(self, key: bytes, expires: float):
+        self._stored[key] = expires
+        self._stored.move_to_end(key)
+        if len(self._stored) > self.cache_size:
+            self._stored.popitem(last=False)
+
+    def _encode_sync(self, texts: list[str]) -> np.ndarray:
+        """CPU batch 인코딩 (mean pooling, L2 정규화)"""
+        import torch
+        started = time.perf_counter()
+        out = np.empty((len(texts), self.DIM), dtype=np.float32)
+        with torch.inference_mode():
+            for i in range(0, len(texts), self.batch_size):
+                batch = texts[i:i + self.batch_size]
+                enc = self._tokenizer(batch, padding=True, truncation=True,
+                                      max_length=self.max_length, return_tensors="pt")
+                hidden = self._model(**enc).last_hidden_state
+                mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1)
+                pooled = torch.nn.functional.normalize(pooled, dim=1)
+                out[i:i + len(batch)] = pooled.numpy()
+        self.metrics["encoded"] += len(texts)
+        self.metrics["encode_seconds"] += time.perf_counter() - started
+        return out
+
+    async def _drain(self, first=None):
+        """큐에서 최대 batch_size 건을 모아 인코딩 후 적재 버퍼에 추가"""
+        items = [first] if first else []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if not items:
+            return
+        self.metrics["texts"] += len(items)
+
+        # 적재 완료(TTL 이내)·적재 대기 중인 텍스트와 batch 내 중복 제외
+        now = time.time()
+        fresh: dict[bytes, tuple] = {}
+        for symbol, text, tweet in items:
+            key = self._hash(text)
+            if key in self._inflight or self._is_stored(key, now):
+                self.metrics["cache_hits"] += 1
+            elif key not in fresh:
+                fresh[key] = (symbol, text, tweet)
+        if not fresh:
+            return
+
+        self._inflight.update(fresh)
+        try:
+            # 인코딩 캐시에 남은 벡터는 재사용 (TTL 만료 후 재적재 등)
+            vecs = await self.encode([text for _, text, _ in fresh.values()])
+        except Exception:
+            self._inflight.difference_update(fresh)
+            raise
+        for (key, (symbol, text, tweet)), vec in zip(fresh.items(), vecs):
+            self._pending[len(self._pending_meta)] = vec
+            self._pending_meta.append({
+                "symbol": symbol,
+                "ts": self._tweet_time(tweet.get("created_at")),
+                "text": text[:500],
+                "tweet_id": tweet.get("id"),
+                "text_hash": key.hex(),
+            })
+            if len(self._pending_meta) == self.insert_batch:
+                await self.flush()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                item = None
+            try:
+                await self._drain(item)
+                if self._pending_meta and time.monotonic() - self._last_flush >= self.flush_interval:
+                    await self.flush()
+            except Exception as e:
+                logging.error("Embedding batch failed: %s", e)
@@ -0,0 +1,312 @@
+"""
+Cold 아카이브 재생 (backtest / 부하 테스트)
+- tweets / market 파티션을 이벤트 시각 순으로 읽어 window 단위로 agent.collect 구동
+- MCP 는 ReplayMCP(재생 중인 창의 데이터), HyperCLOVA X 는 RecordedClova(녹화/스텁)로 대체
+  (녹화 파일은 운영 수집 시 CLOVA_RECORD_PATH 를 지정하면 ClovaRecorder 가 기록)
+- 재생 속도: 1x, 100x, ... / 0 = 최대 속도
+- 처리량, collect 지연(p50/p95/p99), 일정 대비 지연(lag) 리포트
+- 감정 결과는 운영 티어(hot/warm/kafka, Redis pub/sub)에 쓰지 않고 ReplayStorage 에 이벤트 시각으로 기록
+  (--output 지정 시 Parquet 저장)
+
+실행: python replay.py --start 2024-01-01 --end 2024-01-07 --speed 100 --output replay.parquet AAPL TSLA
+"""
+import argparse, asyncio, hashlib, json, logging, time
+from datetime import datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+class ReplayMCP:
+    """MCPClient 대체: 현재 재생 창의 트윗과 마지막 시세를 반환"""
+
+    def __init__(self):
+        self._tweets: dict[str, list[dict]] = {}
+        self._quotes: dict[str, dict] = {}
+        self.calls = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def load(self, symbol: str, tweets: list[dict], quote: dict):
+        self._tweets[symbol] = tweets
+        self._quotes[symbol] = quote
+
+    async def call(self, server: str, tool: str, params: dict) -> dict:
+        self.calls += 1
+        if (server, tool) == ("twitter", "search_tweets"):
+            return {"tweets": self._tweets.get(params["query"], [])}
+        if (server, tool) == ("alpha_vantage", "get_quote"):
+            return self._quotes.get(params["symbol"], {})
+        raise ValueError(f"Tool {server}.{tool} not available in replay")
+
+
+class RecordedClova:
+    """
+    clova_sentiment 대체
+    녹화 파일(JSONL: {"prompt_sha1": ..., "response": {...}})에서 프롬프트 해시로 응답 조회
+    녹화가 없으면 빈 응답 → agent 가 경량 모델 결과로 대체
+    latency 로 API 응답 시간 모사 가능
+    """
+
+    def __init__(self, recordings: str | None = None, latency: float = 0.0):
+        self.latency = latency
+        self.hits = self.misses = 0
+        self._responses: dict[str, dict] = {}
+        if recordings:
+            with open(recordings) as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self._responses[rec["prompt_sha1"]] = rec["response"]
+
+    @staticmethod
+    def prompt_key(texts: list[str]) -> str:
+        # clova_sentiment 와 같은 프롬프트(상위 10개 텍스트) 기준
+        return hashlib.sha1("\n".join(texts[:10]).encode()).hexdigest()
+
+    async def __call__(self, texts: list[str], meta: dict) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = self._responses.get(self.prompt_key(texts))
+        if response is None:
+            self.misses += 1
+            return {}
+        self.hits += 1
+        return response
+
+
+class ClovaRecorder:
+    """
+    clova_sentiment 래퍼: 운영 수집 중 응답을 RecordedClova 녹화 형식(JSONL)으로 추가 기록
+    (agent 가 CLOVA_RECORD_PATH 설정 시 사용, 같은 프롬프트는 한 번만 기록)
+    """
+
+    def __init__(self, clova, path: str):
+        self.clova = clova
+        self.path = path
+        self.recorded = 0
+        self._seen: set[str] = set()
+
+    async def __call__(self, texts: list[str], meta: dict) -> dict:
+        response = await self.clova(texts, meta)
+        key = RecordedClova.prompt_key(texts)
+        if response and key not in self._seen:
+            self._seen.add(key)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"prompt_sha1": key, "response": response}, ensure_ascii=False) + "\n")
+            self.recorded += 1
+        return response
+
+
+class ReplayStorage:
+    """
+    StorageManager 대체: 재생 결과를 운영 저장소와 분리해 메모리에 모음 (backtest 결과)
+    write_event 의 ts 는 재생 중인 창의 이벤트 시각, 종료 시 output 이 있으면 Parquet 로 저장
+    """
+
+    SCHEMA = pa.schema([("symbol", pa.string()), ("timestamp", pa.timestamp("us")),
+                        ("score", pa.float64()), ("label", pa.string()),
+                        ("confidence", pa.float64())])
+
+    def __init__(self, output: str | None = None):
+        self.output = output
+        self.hot = None          # agent.db (실시간 최신 점수 조회) 미사용
+        self.events: list[dict] = []
+
+    async def startup(self):
+        pass
+
+    async def shutdown(self):
+        if self.output:
+            pq.write_table(self.table(), self.output)
+            logging.info("Wrote %d replay scores to %s", len(self.events), self.output)
+
+    def write_event(self, symbol: str, score: float, label: str, confidence: float,
+                    ts: datetime | None = None, tweets=None, quote=None) -> dict:
+        self.events.append({"symbol": symbol, "timestamp": ts, "score": score,
+                            "label": label, "confidence": confidence})
+        return {"replay": True}
+
+    def table(self) -> pa.Table:
+        return pa.Table.from_pylist(self.events, schema=self.SCHEMA).sort_by(
+            [("timestamp", "ascending"), ("symbol", "ascending")])
+
+
+class ReplayEngine:
+    """이벤트 시각 기반 재생기 (다음 날짜 데이터는 재생 중 백그라운드 로드)"""
+
+    def __init__(self, agent, cold, symbols: list[str], window: int = 60,
+                 speed: float = 1.0, concurrency: int = 32):
+        self.agent = agent
+        self.cold = cold
+        self.symbols = symbols
+        self.window = window
+        self.speed = speed
+        self._sem = asyncio.Semaphore(concurrency)
+
+        self._quotes: dict[str, dict] = {}
+        self._latencies: list[float] = []
+        self._lags: list[float] = []
+        self.metrics = {"windows": 0, "collects": 0, "errors": 0, "tweets": 0, "quotes": 0}
+
+    # ---------------------------------------------------------- #
+    #                  EVENT LOADING                             #
+    # ---------------------------------------------------------- #
+    def _read_day(self, data_type: str, day: datetime) -> pa.Table:
+        batches = [b for _, b in self.cold.iter_partition_batches(
+            data_type, day, day + timedelta(days=1) - timedelta(microseconds=1), self.symbols)]
+        if not batches:
+            return pa.table({})
+        time_column = self.cold.TIME_COLUMNS[data_type]
+        return pa.Table.from_batches(batches).sort_by(time_column)
+
+    @staticmethod
+    def _event_times(column: pa.ChunkedArray) -> pa.ChunkedArray:
+        """이벤트 시각 → naive UTC timestamp[us] (UTC timestamp 컬럼, 구버전 ISO 문자열 'Z' 포함)"""
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            try:
+                column = pc.cast(column, pa.timestamp("us", tz="UTC"))
+            except pa.ArrowInvalid:
+                pass   # 오프셋 없는 문자열은 UTC 로 간주
+        return pc.cast(column, pa.timestamp("us"))
+
+    def _window_ids(self, table: pa.Table, column: str, day: datetime) -> np.ndarray:
+        ts = self._event_times(table.column(column)).to_numpy(zero_copy_only=False)
+        return ((ts - np.datetime64(day, "us")) // np.timedelta64(self.window, "s")).astype(np.int64)
+
+    def _load_day(self, day: datetime) -> list[tuple[datetime, dict[str, list[dict]], dict[str, dict]]]:
+        """하루치 이벤트를 window 별 (시작 시각, 종목별 트윗, 종목별 시세 갱신)으로 묶음 (블로킹)"""
+        windows: dict[int, tuple[dict, dict]] = {}
+        tweets = self._read_day("tweets", day)
+        if tweets.num_rows:
+            for wid, row in zip(self._window_ids(tweets, "created_at", day), tweets.to_pylist()):
+                windows.setdefault(int(wid), ({}, {}))[0].setdefault(row["symbol"], []).append(row)
+        market = self._read_day("market", day)
+        if market.num_rows:
+            for wid, row in zip(self._window_ids(market, "timestamp", day), market.to_pylist()):
+                # 아카이브 시 선언 스키마 밖이던 시세 필드(extra JSON)를 원래 응답 형태로 복원
+                quote = {k: v for k, v in row.items() if v is not None and k != "extra"}
+                quote.update(json.loads(row.get("extra") or "{}"))
+                windows.setdefault(int(wid), ({}, {}))[1][row["symbol"]] = quote  # 창 내 마지막 시세
+        return [(day + timedelta(seconds=wid * self.window), t, q)
+                for wid, (t, q) in sorted(windows.items())]
+
+    # ---------------------------------------------------------- #
+    #                  REPLAY                                    #
+    # ---------------------------------------------------------- #
+    async def _collect(self, symbol: str, ts: datetime):
+        async with self._sem:
+            started = time.perf_counter()
+            try:
+                await self.agent.collect(symbol, ts=ts)
+                self.metrics["collects"] += 1
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logging.error("replay collect %s failed: %s", symbol, e)
+            self._latencies.append(time.perf_counter() - started)
+
+    async def run(self, start: datetime, end: datetime) -> dict:
+        loop = asyncio.get_running_loop()
+        first_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = [first_day + timedelta(days=i) for i in range((end.date() - start.date()).days + 1)]
+        mcp = self.agent.mcp
+        t0 = wall0 = None
+        first_event = last_event = None
+
+        pending = loop.run_in_executor(None, self._load_day, days[0]) if days else None
+        for i, day in enumerate(days):
+            windows = await pending
+            pending = loop.run_in_executor(None, self._load_day, days[i + 1]) if i + 1 < len(days) else None
+
+            for window_start, tweets, quotes in windows:
+                if window_start + timedelta(seconds=self.window) <= start or window_start > end:
+                    continue
+                if t0 is None:
+                    t0, wall0 = window_start, loop.time()
+                    first_event = window_start
+                last_event = window_start
+
+                if self.speed:
+                    target = wall0 + (window_start - t0).total_seconds() / self.speed
+                    delay = target - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif delay < 0:
+                        self._lags.append(-delay)
+
+                self._quotes.update(quotes)
+                active = set(tweets) | set(quotes)
+                for symbol in active:
+                    mcp.load(symbol, tweets.get(symbol, []), self._quotes.get(symbol, {}))
+                self.metrics["windows"] += 1
+                self.metrics["tweets"] += sum(len(t) for t in tweets.values())
+                self.metrics["quotes"] += len(quotes)
+                # 점수 시각 = 창의 끝 (그 시점까지의 이벤트로 계산한 결과)
+                scored_at = window_start + timedelta(seconds=self.window)
+                await asyncio.gather(*(self._collect(symbol, scored_at) for symbol in sorted(active)))
+
+        return self.report(first_event, last_event, loop.time() - wall0 if wall0 is not None else 0.0)
+
+    def report(self, first_event, last_event, elapsed: float) -> dict:
+        lat = np.array(self._latencies) * 1000
+        lag = np.array(self._lags) * 1000
+        span = (last_event - first_event).total_seconds() + self.window if first_event else 0.0
+
+        def pct(values, q):
+            return round(float(np.percentile(values, q)), 2) if len(values) else 0.0
+
+        return {
+            **self.metrics,
+            "elapsed_s": round(elapsed, 3),
+            "event_span_s": span,
+            "effective_speedup": round(span / elapsed, 1) if elapsed else None,
+            "collects_per_s": round(self.metrics["collects"] / elapsed, 2) if elapsed else None,
+            "tweets_per_s": round(self.metrics["tweets"] / elapsed, 2) if elapsed else None,
+            "latency_ms": {"p50": pct(lat, 50), "p95": pct(lat, 95), "p99": pct(lat, 99),
+                           "max": round(float(lat.max()), 2) if len(lat) else 0.0},
+            "lag_ms": {"p50": pct(lag, 50), "p99": pct(lag, 99), "late_windows": len(lag)},
+        }
+
+
+async def main(args):
+    from agent import StockSentimentAgent
+    from storage.cold_db import ColdStorage
+
+    cold = ColdStorage()
+    await cold.startup()
+    # 재생 결과는 운영 티어와 분리 (실시간 sentiment 테이블·Redis·Kafka·원본 아카이브에 쓰지 않음)
+    storage = ReplayStorage(args.output)
+    agent = StockSentimentAgent(storage)
+    clova = RecordedClova(args.recordings, args.clova_latency)
+    agent.clova_sentiment = clova
+    await agent.start(mcp=ReplayMCP())
+    try:
+        engine = ReplayEngine(agent, cold, args.symbols, window=args.window,
+                              speed=args.speed, concurrency=args.concurrency)
+        report = await engine.run(datetime.fromisoformat(args.start),
+                                  datetime.fromisoformat(args.end) + timedelta(days=1)
+                                  - timedelta(microseconds=1))
+        report["clova"] = {"recorded": clova.hits, "stubbed": clova.misses}
+        report["scores"] = len(storage.events)
+        print(json.dumps(report, indent=2))
+    finally:
+        await agent.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Replay archived tweets/quotes through the agent")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up, 0 = as fast as possible")
+    parser.add_argument("--window", type=int, default=60, help="seconds of events per collect round")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--recordings", help="JSONL of recorded HyperCLOVA X responses")
+    parser.add_argument("--clova-latency", type=float, default=0.0,
+                        help="simulated HyperCLOVA X latency in seconds")
+    parser.add_argument("--output", help="Parquet file for replayed scores (symbol, timestamp, score, ...)")
+    asyncio.run(main(parser.parse_args()))
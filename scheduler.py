@@ -5,10 +5,16 @@ import asyncio, logging
 from datetime import timedelta
 
 class CollectorScheduler:
-    def __init__(self, agent):
+    def __init__(self, agent, interval: float = 60):
         self.agent = agent
+        self.interval = interval   # 기본 1 분 주기 (벤치마크는 0)
 
     async def run_forever(self, symbols: list[str]):
         while True:
-            await asyncio.gather(*(self.agent.collect(symbol) for symbol in symbols))
-            await asyncio.sleep(60)   # 1 분 주기
+            results = await asyncio.gather(*(self.agent.collect(symbol) for symbol in symbols),
+                                           return_exceptions=True)
+            # 한 종목 실패가 다른 종목·다음 주기를 멈추지 않도록
+            for symbol, result in zip(symbols, results):
+                if isinstance(result, Exception):
+                    logging.error("collect %s failed: %s", symbol, result)
+            await asyncio.sleep(self.interval)
@@ -1,35 +1,326 @@
 # storage/__init__.py
 """
 Stock Sentiment Agent Storage Layer
-- Hot: PostgreSQL + Redis (24시간)  
+- Hot: PostgreSQL + Redis (24시간)
 - Warm: InfluxDB + OpenSearch (30일)
 - Cold: NAVER Cloud Object Storage (무제한)
 """
 
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import pyarrow as pa
+from config import settings
 from .hot_db import HotDB
 from .warm_db import WarmDB
 from .cold_db import ColdStorage
 from .vector_search import VectorSearch
+from .tier_mover import TierMover
+from .fanout import TierSink
+from .range_query import combine_partials, finalize, floor_time
+from .parquet_writer import to_timestamp
 
-__all__ = ['HotDB', 'WarmDB', 'ColdStorage', 'VectorSearch']
+__all__ = ['HotDB', 'WarmDB', 'ColdStorage', 'VectorSearch', 'TierMover', 'TierSink',
+           'StorageManager']
 
 class StorageManager:
-    """통합 스토리지 관리자"""
-    
-    def __init__(self):
+    """
+    통합 스토리지 관리자
+    write_event: 감정 결과를 hot / warm / vector / kafka 티어로 동시 fan-out
+    (티어별 큐·batch·drop/retry 정책, 수집 루프는 큐 적재만 하고 바로 반환)
+    archive: 수집한 원본 트윗·시세를 Cold tweets / market 파티션에 적재 (replay·학습 데이터 원천)
+    query_range: 보관 기간 기준으로 hot / warm / cold 에 나눠 병렬 조회 후 하나의 시계열로 병합
+    """
+
+    SINKS = ('hot', 'warm', 'vector', 'kafka', 'archive')
+    TOPIC = "stock-sentiment"
+    # 티어별 기본 정책 (STORAGE_SINK_CONFIG = {'warm': {...}} 로 덮어씀)
+    # hot 은 실패 행을 HotDB 버퍼가 보관·재시도하므로 sink 재시도 없음
+    SINK_DEFAULTS = {
+        'hot':   {'batch_size': 500, 'flush_interval': 0.2, 'max_queue': 20_000,
+                  'policy': 'drop_oldest', 'max_retries': 0},
+        'warm':  {'batch_size': 1000, 'flush_interval': 1.0, 'max_queue': 20_000,
+                  'policy': 'drop_oldest', 'max_retries': 3},
+        'kafka': {'batch_size': 500, 'flush_interval': 0.1, 'max_queue': 20_000,
+                  'policy': 'drop_oldest', 'max_retries': 3},
+        # 원본 아카이브는 batch 마다 Parquet 파일이 생기므로 크게 모아서 기록 (작은 파일은 compaction)
+        'archive': {'batch_size': 20_000, 'flush_interval': 300.0, 'max_queue': 100_000,
+                    'policy': 'drop_oldest', 'max_retries': 3},
+    }
+    # 최근 아카이브한 트윗 id (검색 결과가 수집 주기마다 겹치므로 중복 적재 방지)
+    ARCHIVE_DEDUP_IDS = 200_000
+
+    def __init__(self, sinks: Optional[Sequence[str]] = None, mover: bool = True):
+        """
+        sinks: write_event 대상 티어 (기본 STORAGE_SINKS 또는 전체)
+        mover: Hot → Warm → Cold 이동 작업 실행 여부 (False 면 Cold 도 시작하지 않음)
+        """
+        self.sink_names = tuple(sinks if sinks is not None
+                                else getattr(settings, 'STORAGE_SINKS', self.SINKS))
+        unknown = set(self.sink_names) - set(self.SINKS)
+        if unknown:
+            raise ValueError(f"Unknown storage sinks: {', '.join(sorted(unknown))}")
+
         self.hot = HotDB()
         self.warm = WarmDB()
         self.cold = ColdStorage()
         self.vector = VectorSearch()
-    
+        self.mover = TierMover(self.hot, self.warm, self.cold) if mover else None
+        if self.mover and 'warm' in self.sink_names:
+            # Warm 을 직접 쓰므로 Hot → Warm 복사는 생략 (Warm → Cold 와 compaction 만 수행)
+            self.mover.hot_to_warm_enabled = False
+
+        self.embedder = None
+        if 'vector' in self.sink_names:
+            from embedder import TextEmbedder
+            self.embedder = TextEmbedder(self.vector)
+        self.stream = None
+        if 'kafka' in self.sink_names:
+            from data_streamer import Streamer
+            self.stream = Streamer()
+
+        overrides = getattr(settings, 'STORAGE_SINK_CONFIG', {})
+        self._archived_ids: deque = deque(maxlen=self.ARCHIVE_DEDUP_IDS)
+        self._archived_id_set: set = set()
+
+        writers = {'hot': self._write_hot, 'warm': self._write_warm, 'kafka': self._write_kafka,
+                   'archive': self._write_archive}
+        self.sinks: Dict[str, TierSink] = {
+            name: TierSink(name, writers[name],
+                           **{**self.SINK_DEFAULTS[name], **overrides.get(name, {})})
+            for name in self.sink_names if name in writers
+        }
+
+    def _stores(self) -> List:
+        """startup/shutdown 대상 스토어"""
+        stores = [self.hot]
+        if 'warm' in self.sink_names or self.mover:
+            stores.append(self.warm)
+        if self.mover or 'archive' in self.sink_names:
+            stores.append(self.cold)
+        if self.embedder:
+            stores.append(self.vector)   # 기본 로컬 ANN 인덱스 (VECTOR_BACKEND=milvus 로 전환)
+        return stores
+
     async def startup(self):
-        """모든 스토리지 초기화"""
-        await self.hot.startup()
-        await self.warm.startup()
-        await self.cold.startup()
-        # await self.vector.startup()  # 필요시 구현
-    
+        """스토리지 동시 초기화 (하나라도 실패하면 시작된 스토어를 닫고 예외 전파)"""
+        stores = self._stores()
+        results = await asyncio.gather(*(s.startup() for s in stores), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            started = [s for s, r in zip(stores, results)
+                       if not isinstance(r, BaseException) and hasattr(s, 'shutdown')]
+            await asyncio.gather(*(s.shutdown() for s in started), return_exceptions=True)
+            raise failed[0]
+
+        await asyncio.gather(*(sink.start() for sink in self.sinks.values()))
+        if self.embedder:
+            await self.embedder.start()
+        if self.mover:
+            await self.mover.start()      # Hot → Warm → Cold 자동 이동
+        logging.info(f"StorageManager started (sinks: {', '.join(self.sink_names)})")
+
     async def shutdown(self):
-        """모든 스토리지 연결 종료"""
-        await self.warm.shutdown()
-        # Hot DB와 Cold Storage는 자동 정리
+        """큐 잔여분 기록 후 모든 스토리지 연결 종료"""
+        if self.mover:
+            await self.mover.stop()
+        await asyncio.gather(*(sink.stop() for sink in self.sinks.values()))
+        if self.embedder:
+            await self.embedder.stop()
+        stores = [s for s in self._stores() if hasattr(s, 'shutdown')]
+        # hot 은 write-behind 버퍼 flush 포함, Cold Storage 는 자동 정리
+        results = await asyncio.gather(*(s.shutdown() for s in stores), return_exceptions=True)
+        for store, result in zip(stores, results):
+            if isinstance(result, BaseException):
+                logging.error(f"{type(store).__name__} shutdown failed: {result}")
+        if self.stream:
+            self.stream.producer.close()
+
+    # ---------------------------------------------------------- #
+    #                  WRITE PATH                                #
+    # ---------------------------------------------------------- #
+    def write_event(self, symbol: str, score: float, label: str, confidence: float,
+                    ts: Optional[datetime] = None, tweets: Optional[List[Dict]] = None,
+                    quote: Optional[Dict] = None) -> Dict[str, bool]:
+        """
+        감정 결과를 각 티어 큐에 적재 (비차단, 티어별 수락 여부 반환)
+        tweets 가 있으면 vector 티어에서 임베딩 후 적재, tweets / quote 원본은 archive 티어에 적재
+        """
+        ts = ts or datetime.utcnow()
+        event = {'symbol': symbol, 'score': score, 'label': label, 'confidence': confidence,
+                 'timestamp': ts}
+        accepted = {name: sink.offer(event) for name, sink in self.sinks.items() if name != 'archive'}
+        if self.embedder and tweets:
+            self.embedder.submit(symbol, tweets)
+            accepted['vector'] = True
+        if 'archive' in self.sinks and (tweets or quote):
+            accepted['archive'] = self._offer_raw(symbol, ts, tweets or [], quote)
+        return accepted
+
+    def _offer_raw(self, symbol: str, ts: datetime, tweets: List[Dict], quote: Optional[Dict]) -> bool:
+        sink = self.sinks['archive']
+        accepted = True
+        for tweet in tweets:
+            tweet_id = tweet.get('id')
+            if tweet_id is not None and tweet_id in self._archived_id_set:
+                continue
+            offered = sink.offer({'data_type': 'tweets', 'row': {**tweet, 'symbol': symbol},
+                                  'timestamp': self._event_time(tweet.get('created_at'), ts)})
+            # 큐가 거부한 트윗은 기록하지 않아 다음 수집 주기에 다시 적재될 수 있게 함
+            if offered and tweet_id is not None:
+                self._remember_archived(tweet_id)
+            accepted &= offered
+        if quote:
+            accepted &= sink.offer({'data_type': 'market', 'timestamp': ts,
+                                    'row': {**quote, 'symbol': symbol, 'timestamp': ts}})
+        return accepted
+
+    def _remember_archived(self, tweet_id):
+        if len(self._archived_ids) == self._archived_ids.maxlen:
+            self._archived_id_set.discard(self._archived_ids[0])
+        self._archived_ids.append(tweet_id)
+        self._archived_id_set.add(tweet_id)
+
+    @staticmethod
+    def _event_time(value, default: datetime) -> datetime:
+        try:
+            return to_timestamp(value)
+        except (TypeError, ValueError):
+            return default
+
+    async def flush(self):
+        """모든 티어 큐를 즉시 기록 (동시 진행)"""
+        await asyncio.gather(*(sink.flush() for sink in self.sinks.values()))
+        if 'hot' in self.sinks:
+            await self.hot.flush()       # write-behind 버퍼까지 반영
+        if self.embedder:
+            await self.embedder.flush()
+
+    async def _write_hot(self, events: List[Dict]):
+        await self.hot.put_many([(e['symbol'], e['score'], e['label'], e['confidence'],
+                                  e['timestamp']) for e in events])
+
+    async def _write_warm(self, events: List[Dict]):
+        # 결정적 ID(종목·시각) 라 재시도해도 중복 없음
+        await self.warm.store_sentiment_batch([{**e, 'source_type': 'realtime'} for e in events])
+
+    async def _write_kafka(self, events: List[Dict]):
+        await self.stream.send_many(self.TOPIC, [(e['symbol'], e) for e in events])
+
+    async def _write_archive(self, events: List[Dict]):
+        """
+        원본 트윗·시세를 (데이터 타입, 이벤트 날짜) 별 Cold 파일로 기록
+        part 이름은 batch 내용 해시 → sink 재시도 시 같은 파일을 덮어써 중복이 생기지 않음
+        """
+        groups: Dict[Tuple[str, datetime], List[Dict]] = {}
+        for e in events:
+            day = e['timestamp'].replace(hour=0, minute=0, second=0, microsecond=0)
+            groups.setdefault((e['data_type'], day), []).append(e['row'])
+        for (data_type, day), rows in sorted(groups.items()):
+            digest = hashlib.sha1(json.dumps(rows, default=str, sort_keys=True).encode()).hexdigest()
+            archive = (self.cold.archive_social_data if data_type == 'tweets'
+                       else self.cold.archive_market_data)
+            if not await archive(rows, day, part_name=f"raw-{digest[:16]}"):
+                raise RuntimeError(f"Cold {data_type} archive failed for {day:%Y-%m-%d}")
+
+    # ---------------------------------------------------------- #
+    #                  READ PATH                                 #
+    # ---------------------------------------------------------- #
+    def plan_range(self, start: datetime, end: datetime,
+                   archived_until: Optional[datetime] = None) -> List[Tuple[str, datetime, datetime]]:
+        """
+        [start, end) 를 티어별 비중첩 구간으로 분할
+        hot: 보관 중인 가장 오래된 파티션부터
+        cold: Cold 아카이브 완료 시점(archived_until, TierMover watermark)까지
+              단, 하루 전체가 Warm 에 남아 있는 날짜는 Warm 에서 조회
+        warm: 그 사이 (아카이브 기록이 없으면 Warm 보관 만료일부터)
+        """
+        now = datetime.utcnow()
+        hot_cut = self.hot._partition_start(now - self.hot.retention)
+        warm_retention = (self.mover.warm_retention if self.mover
+                          else timedelta(days=getattr(settings, 'WARM_RETENTION_DAYS', 30)))
+        warm_start = (now - warm_retention).replace(hour=0, minute=0, second=0, microsecond=0)
+        cold_cut = min(archived_until, warm_start + timedelta(days=1)) if archived_until else warm_start
+        stores = self._stores()
+
+        plan = []
+        for tier, lower, upper in (('cold', None, cold_cut), ('warm', cold_cut, hot_cut),
+                                   ('hot', hot_cut, None)):
+            lo = max(start, lower) if lower else start
+            hi = min(end, upper) if upper else end
+            if lo >= hi:
+                continue
+            if getattr(self, tier) not in stores:
+                logging.warning(f"query_range: {tier} tier not started, "
+                                f"{lo:%Y-%m-%d %H:%M} ~ {hi:%Y-%m-%d %H:%M} skipped")
+                continue
+            plan.append((tier, lo, hi))
+        return plan
+
+    async def _archived_until(self) -> Optional[datetime]:
+        """Warm → Cold 아카이브 watermark (mover 미실행 프로세스는 tier_watermarks 조회)"""
+        if self.mover:
+            return self.mover.archived_until
+        try:
+            checkpoint = await TierMover.read_checkpoint(self.hot.pg, TierMover.WARM_TO_COLD)
+        except Exception as e:
+            logging.warning(f"query_range: archive watermark unavailable ({e})")
+            return None
+        return checkpoint[0] if checkpoint else None
+
+    async def query_range(self, symbols: List[str], start: datetime, end: datetime,
+                          resolution: str = '1h') -> pa.Table:
+        """
+        종목별 감정 시계열 (symbol, time, score, confidence, count) Arrow 테이블
+        start/end 는 resolution 경계로 맞춤, 티어별 부분 집계(합계·건수)를 pushdown 후 병렬 실행·병합
+        schema metadata 'plan' 에 티어별 구간·행 수·소요 시간·오류 기록
+        """
+        step = WarmDB._duration_seconds(resolution)
+        symbols = sorted(set(symbols))
+        start = floor_time(start, step)
+        if floor_time(end, step) < end:
+            end = floor_time(end, step) + timedelta(seconds=step)
+        plan = self.plan_range(start, end, await self._archived_until())
+
+        def run(tier: str, lo: datetime, hi: datetime):
+            if tier == 'hot':
+                return self.hot.aggregate_range(symbols, lo, hi, step)
+            if tier == 'warm':
+                return self.warm.aggregate_range(symbols, lo, hi, resolution)
+            return self.cold.aggregate_range(symbols, lo, hi, step)
+
+        async def timed(tier, lo, hi):
+            started = time.perf_counter()
+            table = await run(tier, lo, hi)
+            return table, (time.perf_counter() - started) * 1000
+
+        results = await asyncio.gather(*(timed(*p) for p in plan), return_exceptions=True)
+        parts, report = [], []
+        for (tier, lo, hi), result in zip(plan, results):
+            entry = {'tier': tier, 'start': lo.isoformat(), 'end': hi.isoformat()}
+            if isinstance(result, BaseException):
+                # 한 티어 실패 시 나머지 티어 결과는 반환 (해당 구간은 비어 있음)
+                logging.error(f"query_range {tier} failed: {result}")
+                entry['error'] = str(result)
+            else:
+                table, ms = result
+                parts.append(table)
+                entry.update(rows=table.num_rows, ms=round(ms, 1))
+            report.append(entry)
+
+        table = finalize(combine_partials(parts))
+        return table.replace_schema_metadata({'plan': json.dumps(report)})
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """티어별 쓰기 지표 (+ 임베딩, 티어 이동)"""
+        metrics = {name: sink.get_metrics() for name, sink in self.sinks.items()}
+        if self.embedder:
+            metrics['vector'] = self.embedder.get_stats()
+        if self.mover:
+            metrics['mover'] = self.mover.get_metrics()
+        return metrics
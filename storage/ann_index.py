@@ -0,0 +1,404 @@
+# storage/ann_index.py
+"""
+In-process ANN 인덱스 (IVF-Flat, 내적/코사인)
+- 벡터·메타데이터는 memory-mapped 파일에 저장 → 재시작 시 즉시 로드, RAM 보다 큰 인덱스 가능
+- k-means 로 학습한 nlist 개 centroid, 질의는 가까운 nprobe 개 리스트만 스캔
+- 학습/compaction 시 행을 리스트 순서로 재배치 → 리스트 스캔은 연속 구간 읽기 (memmap fancy indexing 회피)
+- 학습 전(데이터가 적을 때)은 brute force
+- symbol / 시간 범위 필터, TTL 삭제(tombstone 후 주기적 compaction)
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+class IVFFlatIndex:
+    """
+    float32 벡터 IVF-Flat 인덱스
+    파일 구성 (path 디렉터리):
+      vectors.f32 (capacity × dim), ts.i64, symbol.S16, alive.u1, list.i32,
+      meta.jsonl (행별 메타데이터, 오프셋은 meta_offset.i64), centroids.npy, header.json
+    행 [0, sorted) 는 리스트 순서로 정렬된 구간 (리스트 i 는 bounds[i]:bounds[i+1]),
+    이후 추가된 행은 리스트별 id 목록(tail)으로 관리하다 REORDER_RATIO 를 넘으면 재배치
+    """
+
+    SYMBOL_WIDTH = 16
+    INITIAL_CAPACITY = 4096
+    REORDER_RATIO = 0.25    # tail 이 정렬 구간의 이 비율을 넘으면 compaction(재배치)
+    CHUNK = 65536
+
+    def __init__(self, path: str, dim: int = 768, nlist: int = 256, nprobe: int = 16,
+                 train_min_points: Optional[int] = None):
+        self.path = path
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        # centroid 당 최소 표본 수 (이보다 적으면 brute force 유지)
+        self.train_min_points = train_min_points or nlist * 39
+
+        self._lock = threading.RLock()
+        self.count = 0          # 기록된 행 수 (삭제 포함)
+        self.alive_count = 0
+        self.capacity = 0
+        self.trained_at = 0     # 학습 시점의 alive 행 수 (4배 증가 시 재학습)
+        self.centroids: Optional[np.ndarray] = None
+        self._sorted = 0        # 리스트 순서로 재배치된 앞쪽 행 수
+        self._bounds: Optional[np.ndarray] = None
+        self._lists: List[List[np.ndarray]] = []    # 정렬 구간 이후(tail) 리스트별 행 id
+
+        os.makedirs(path, exist_ok=True)
+        self._open()
+
+    # ---------------------------------------------------------- #
+    #                  STORAGE                                   #
+    # ---------------------------------------------------------- #
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _columns(self) -> Dict[str, Tuple[str, object, tuple]]:
+        return {
+            'vectors': ('vectors.f32', np.float32, (self.dim,)),
+            'ts': ('ts.i64', np.int64, ()),
+            'symbol': ('symbol.S16', f"S{self.SYMBOL_WIDTH}", ()),
+            'alive': ('alive.u1', np.uint8, ()),
+            'list': ('list.i32', np.int32, ()),
+            'meta_offset': ('meta_offset.i64', np.int64, (2,)),
+        }
+
+    def _map(self, capacity: int):
+        """capacity 행 크기로 파일을 늘리고 memmap 재생성"""
+        for attr, (name, dtype, tail) in self._columns().items():
+            path = self._file(name)
+            nbytes = capacity * int(np.prod(tail or (1,))) * np.dtype(dtype).itemsize
+            with open(path, 'ab') as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            setattr(self, f"_{attr}", np.memmap(path, dtype=dtype, mode='r+',
+                                                 shape=(capacity,) + tail))
+        self.capacity = capacity
+
+    def _open(self):
+        header_path = self._file('header.json')
+        header = {}
+        if os.path.exists(header_path):
+            with open(header_path) as f:
+                header = json.load(f)
+            if header.get('dim', self.dim) != self.dim:
+                raise ValueError(f"Index at {self.path} has dim {header['dim']}, expected {self.dim}")
+        self.count = header.get('count', 0)
+        self.trained_at = header.get('trained_at', 0)
+        self._sorted = min(header.get('sorted', 0), self.count)
+        self._map(max(header.get('capacity', 0), self.INITIAL_CAPACITY))
+        self._meta_file = open(self._file('meta.jsonl'), 'ab+')
+        # 비정상 종료 시 header 보다 뒤에 기록된 메타데이터는 무시
+        self._meta_file.truncate(int(self._meta_offset[self.count - 1].sum()) if self.count else 0)
+
+        if os.path.exists(self._file('centroids.npy')) and self.trained_at:
+            self.centroids = np.load(self._file('centroids.npy'))
+        self._rebuild_lists()
+        self.alive_count = int(self._alive[:self.count].sum())
+
+    def _rebuild_lists(self):
+        self._lists, self._bounds = [], None
+        if self.centroids is None:
+            return
+        nlist = len(self.centroids)
+        self._bounds = np.searchsorted(np.asarray(self._list[:self._sorted]), np.arange(nlist + 1))
+        assign = np.asarray(self._list[self._sorted:self.count])
+        alive = np.asarray(self._alive[self._sorted:self.count]).astype(bool)
+        order = np.argsort(assign, kind='stable')
+        order = order[alive[order]]
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [[(order[bounds[i]:bounds[i + 1]] + self._sorted).astype(np.int64)]
+                       for i in range(nlist)]
+
+    def flush(self):
+        """memmap 과 header 를 디스크에 반영"""
+        with self._lock:
+            for attr in self._columns():
+                getattr(self, f"_{attr}").flush()
+            self._meta_file.flush()
+            tmp = self._file('header.json.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'dim': self.dim, 'count': self.count, 'capacity': self.capacity,
+                           'trained_at': self.trained_at, 'sorted': self._sorted, 'nlist': self.nlist,
+                           'updated_at': time.time()}, f)
+            os.replace(tmp, self._file('header.json'))
+
+    def close(self):
+        self.flush()
+        self._meta_file.close()
+
+    # ---------------------------------------------------------- #
+    #                  WRITE                                     #
+    # ---------------------------------------------------------- #
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, vectors: np.ndarray, symbols: Sequence[str], ts: np.ndarray,
+            metas: Optional[Sequence[dict]] = None) -> np.ndarray:
+        """벡터 batch 추가 (cosine 검색용으로 정규화), 부여된 행 id 반환"""
+        vectors = self._normalize(np.atleast_2d(vectors))
+        n = len(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected dim {self.dim}, got {vectors.shape[1]}")
+
+        with self._lock:
+            if self.count + n > self.capacity:
+                self._map(max(self.capacity * 2, self.count + n))
+            ids = np.arange(self.count, self.count + n, dtype=np.int64)
+            self._vectors[ids] = vectors
+            self._ts[ids] = np.asarray(ts, dtype=np.int64)
+            self._symbol[ids] = np.asarray([s.encode()[:self.SYMBOL_WIDTH] for s in symbols],
+                                           dtype=f"S{self.SYMBOL_WIDTH}")
+            self._alive[ids] = 1
+
+            start = self._meta_file.seek(0, os.SEEK_END)
+            lines = [json.dumps(m or {}, default=str).encode() + b'\n' for m in (metas or [None] * n)]
+            lengths = np.fromiter((len(l) for l in lines), dtype=np.int64, count=n)
+            self._meta_file.write(b''.join(lines))
+            self._meta_file.flush()  # metadata() 는 pread 로 읽으므로 버퍼를 비워 둠
+            self._meta_offset[ids, 0] = start + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            self._meta_offset[ids, 1] = lengths
+
+            if self.centroids is not None:
+                assign = self._assign(vectors)
+                self._list[ids] = assign
+                for lst in np.unique(assign):
+                    self._lists[lst].append(ids[assign == lst])
+            self.count += n
+            self.alive_count += n
+
+            keep = None
+            if self.centroids is None and self.alive_count >= self.train_min_points:
+                keep = self._train()
+            elif self.centroids is not None and self.alive_count >= 4 * self.trained_at:
+                keep = self._train()
+            elif self.centroids is not None and self.count - self._sorted > self.REORDER_RATIO * self._sorted:
+                keep = self._compact()
+            if keep is not None:
+                # 재배치로 바뀐 id 로 변환
+                position = np.empty(int(keep.max()) + 1 if len(keep) else 0, dtype=np.int64)
+                position[keep] = np.arange(len(keep))
+                ids = position[ids]
+        return ids
+
+    # ---------------------------------------------------------- #
+    #                  TRAINING                                  #
+    # ---------------------------------------------------------- #
+    def _assign(self, vectors: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for i in range(0, len(vectors), chunk):
+            out[i:i + chunk] = np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, iterations: int = 10, sample_size: int = 65536, seed: int = 0):
+        """alive 벡터 표본으로 spherical k-means 학습 후 전체 재할당·재배치 (행 id 가 바뀜)"""
+        with self._lock:
+            self._train(iterations, sample_size, seed)
+
+    def _train(self, iterations: int = 10, sample_size: int = 65536,
+               seed: int = 0) -> Optional[np.ndarray]:
+        alive = np.flatnonzero(self._alive[:self.count])
+        if len(alive) < self.nlist:
+            return None
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(alive, min(sample_size, len(alive)), replace=False))
+        data = np.asarray(self._vectors[sample])
+        centroids = data[rng.choice(len(data), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=self.nlist)
+            empty = counts == 0
+            # 빈 centroid 는 임의 표본으로 재시작
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+            centroids = self._normalize(sums)
+
+        self.centroids = centroids
+        for i in range(0, self.count, self.CHUNK):
+            self._list[i:i + self.CHUNK] = self._assign(np.asarray(self._vectors[i:i + self.CHUNK]))
+        self.trained_at = len(alive)
+        np.save(self._file('centroids.npy'), centroids)
+        return self._compact()
+
+    # ---------------------------------------------------------- #
+    #                  SEARCH                                    #
+    # ---------------------------------------------------------- #
+    def _tail(self, lst: int) -> np.ndarray:
+        chunks = self._lists[lst]
+        if len(chunks) > 1:
+            chunks[:] = [np.concatenate(chunks)]
+        return chunks[0]
+
+    def _mask(self, rows, symbols: Optional[np.ndarray],
+              since: Optional[int], until: Optional[int]) -> np.ndarray:
+        """rows (slice 또는 id 배열) 중 alive 이고 필터를 통과하는 행 mask"""
+        mask = self._alive[rows].astype(bool)
+        if symbols is not None:
+            mask &= np.isin(self._symbol[rows], symbols)
+        if since is not None:
+            mask &= self._ts[rows] >= since
+        if until is not None:
+            mask &= self._ts[rows] <= until
+        return mask
+
+    def _filter(self, ids: np.ndarray, symbols: Optional[np.ndarray],
+                since: Optional[int], until: Optional[int]) -> np.ndarray:
+        return ids[self._mask(ids, symbols, since, until)]
+
+    def _scan_list(self, lst: int, queries: np.ndarray, symbols: Optional[np.ndarray],
+                   since: Optional[int], until: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """리스트 하나를 질의 묶음과 행렬곱 → (행 id, (행 수 × 질의 수) 점수)"""
+        lo, hi = int(self._bounds[lst]), int(self._bounds[lst + 1])
+        mask = self._mask(slice(lo, hi), symbols, since, until)
+        block = np.asarray(self._vectors[lo:hi])   # 정렬 구간: 연속 읽기
+        if not mask.all():
+            block = block[mask]
+        ids = np.flatnonzero(mask) + lo
+        tail = self._filter(self._tail(lst), symbols, since, until)
+        if len(tail):
+            ids = np.concatenate((ids, tail))
+            block = np.concatenate((block, np.asarray(self._vectors[tail])))
+        return ids, block @ queries.T
+
+    def _top(self, ids: np.ndarray, sc: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if len(ids) > k:
+            top = np.argpartition(-sc, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-sc[top])]
+        return [(int(ids[i]), float(sc[i])) for i in top]
+
+    def search(self, queries: np.ndarray, k: int = 10, symbols: Optional[Sequence[str]] = None,
+               since: Optional[int] = None, until: Optional[int] = None,
+               nprobe: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """질의 batch 별 (행 id, cosine 유사도) 상위 k 목록"""
+        queries = self._normalize(np.atleast_2d(queries))
+        nprobe = nprobe or self.nprobe
+        symbol_keys = (np.asarray([s.encode()[:self.SYMBOL_WIDTH] for s in symbols],
+                                  dtype=f"S{self.SYMBOL_WIDTH}") if symbols else None)
+        with self._lock:
+            if self.centroids is None:
+                # 학습 전: 필터 통과 벡터 전체와 행렬곱 한 번
+                ids = self._filter(np.arange(self.count, dtype=np.int64), symbol_keys, since, until)
+                scores = (np.asarray(self._vectors[ids]) @ queries.T if len(ids)
+                          else np.empty((0, len(queries)), dtype=np.float32))
+                return [self._top(ids, scores[:, qi], k) for qi in range(len(queries))]
+
+            nprobe = min(nprobe, len(self.centroids))
+            probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            hit_ids: List[List[np.ndarray]] = [[] for _ in queries]
+            hit_scores: List[List[np.ndarray]] = [[] for _ in queries]
+            # 리스트 단위로 묶어 스캔: 리스트마다 벡터를 한 번만 읽고 해당 질의 전체와 행렬곱
+            for lst in np.unique(probes):
+                qs = np.flatnonzero((probes == lst).any(axis=1))
+                ids, scores = self._scan_list(int(lst), queries[qs], symbol_keys, since, until)
+                if not len(ids):
+                    continue
+                for j, qi in enumerate(qs):
+                    hit_ids[qi].append(ids)
+                    hit_scores[qi].append(scores[:, j])
+            return [self._top(np.concatenate(hit_ids[qi]), np.concatenate(hit_scores[qi]), k)
+                    if hit_ids[qi] else [] for qi in range(len(queries))]
+
+    def search_with_metadata(self, queries: np.ndarray, k: int = 10,
+                             **filters) -> List[List[Tuple[int, float, dict]]]:
+        """search 와 메타데이터 조회를 같은 lock 안에서 (그 사이 compaction 으로 id 가 바뀌지 않음)"""
+        with self._lock:
+            hits = self.search(queries, k, **filters)
+            return [[(i, score, meta) for (i, score), meta in zip(row, self.metadata([i for i, _ in row]))]
+                    for row in hits]
+
+    def metadata(self, ids: Sequence[int]) -> List[dict]:
+        """행 id 의 메타데이터 (pread 로 필요한 부분만 읽음)"""
+        out = []
+        with self._lock:
+            fd = self._meta_file.fileno()
+            for i in ids:
+                offset, length = self._meta_offset[i]
+                out.append(json.loads(os.pread(fd, int(length), int(offset))))
+        return out
+
+    # ---------------------------------------------------------- #
+    #                  TTL                                       #
+    # ---------------------------------------------------------- #
+    def delete_before(self, cutoff: int, compact_ratio: float = 0.3) -> int:
+        """ts < cutoff 행 삭제 (tombstone), 삭제 비율이 높으면 파일 compaction"""
+        with self._lock:
+            expired = np.flatnonzero((self._ts[:self.count] < cutoff) & (self._alive[:self.count] == 1))
+            if not len(expired):
+                return 0
+            self._alive[expired] = 0
+            self.alive_count -= len(expired)
+            if self.count and 1 - self.alive_count / self.count >= compact_ratio:
+                self.compact()
+            else:
+                self._rebuild_lists()
+                self.flush()
+            return len(expired)
+
+    def compact(self):
+        """alive 행만 남기고 학습된 경우 리스트 순서로 재배치 (행 id 가 바뀜)"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> np.ndarray:
+        """
+        keep 순서대로 각 컬럼·메타데이터를 새 파일에 chunk 단위로 복사 후 교체
+        (인덱스 전체를 메모리에 올리지 않음), 새 행 i 의 기존 id(keep[i]) 배열 반환
+        """
+        keep = np.flatnonzero(self._alive[:self.count])
+        if self.centroids is not None:
+            keep = keep[np.argsort(np.asarray(self._list[keep]), kind='stable')]
+        n = len(keep)
+        replaced = []
+        for attr, (name, dtype, tail) in self._columns().items():
+            if attr == 'meta_offset':
+                continue
+            src = getattr(self, f"_{attr}")
+            dst = np.memmap(self._file(name + '.tmp'), dtype=dtype, mode='w+',
+                            shape=(self.capacity,) + tail)
+            for i in range(0, n, self.CHUNK):
+                rows = keep[i:i + self.CHUNK]
+                dst[i:i + len(rows)] = src[rows]
+            dst.flush()
+            del dst
+            replaced.append(name)
+
+        name = self._columns()['meta_offset'][0]
+        offsets = np.memmap(self._file(name + '.tmp'), dtype=np.int64, mode='w+',
+                            shape=(self.capacity, 2))
+        fd, position = self._meta_file.fileno(), 0
+        with open(self._file('meta.jsonl.tmp'), 'wb') as out:
+            for i in range(0, n, self.CHUNK):
+                rows = keep[i:i + self.CHUNK]
+                spans = np.asarray(self._meta_offset[rows])
+                out.write(b''.join(os.pread(fd, int(l), int(o)) for o, l in spans))
+                offsets[i:i + len(rows), 0] = position + np.concatenate(([0], np.cumsum(spans[:, 1])[:-1]))
+                offsets[i:i + len(rows), 1] = spans[:, 1]
+                position += int(spans[:, 1].sum())
+        offsets.flush()
+        del offsets
+        replaced += [name, 'meta.jsonl']
+
+        self._meta_file.close()
+        for name in replaced:
+            os.replace(self._file(name + '.tmp'), self._file(name))
+        self._map(self.capacity)
+        self._meta_file = open(self._file('meta.jsonl'), 'ab+')
+        self.count = self.alive_count = n
+        self._sorted = n if self.centroids is not None else 0
+        self._rebuild_lists()
+        self.flush()
+        return keep
+
+    def __len__(self) -> int:
+        return self.alive_count
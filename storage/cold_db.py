@@ -5,22 +5,58 @@ Cold Storage: NAVER Cloud Object Storage (무제한 보관)
 - 머신러닝 학습용 데이터셋 관리
 - 배치 분석, 데이터 레이크 기능
 """
+import asyncio
+import json
 import logging
+import uuid
+import zlib
 import boto3
 import pandas as pd
 import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Iterator
-from io import BytesIO
+from typing import List, Dict, Optional, Iterator, Iterable, Tuple
 from pathlib import Path
 from config import settings
+from .parquet_writer import EXTRA_COLUMN, StreamingParquetArchiver, conform_rows
+from .cold_manifest import ISO_SECONDS, ColdManifest, FileStats, inclusive_end
+from .object_cache import ObjectCache
+from .feature_builder import DailyAggregator, daily_features, join_daily_features
+from .range_query import bucket_batch, combine_partials
 
 class ColdStorage:
     """
     NAVER Cloud Object Storage를 활용한 장기 보관 스토리지
     S3 호환 API 사용
     """
+
+    # 데이터 타입별 이벤트 시각 컬럼 (시간 조건 pushdown 용)
+    TIME_COLUMNS = {'sentiment': 'timestamp', 'tweets': 'created_at', 'market': 'timestamp'}
+    COMPRESSION = {'sentiment': 'snappy', 'tweets': 'gzip', 'market': 'snappy'}
+    FILE_PREFIXES = {'sentiment': 'sentiment', 'tweets': 'tweets', 'market': 'market'}
+    # 데이터 타입별 선언 스키마 (행마다 키·null 여부가 달라도 모든 파일이 같은 스키마)
+    # 이벤트 시각은 UTC timestamp, 선언되지 않은 키는 extra(JSON) 컬럼에 보존
+    SCHEMAS = {
+        'sentiment': pa.schema([
+            ('symbol', pa.string()), ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('sentiment_score', pa.float64()), ('sentiment_label', pa.string()),
+            ('confidence', pa.float64()), ('archived_at', pa.timestamp('us')),
+            (EXTRA_COLUMN, pa.string())]),
+        'tweets': pa.schema([
+            ('id', pa.string()), ('text', pa.string()), ('author', pa.string()),
+            ('created_at', pa.timestamp('us', tz='UTC')),
+            ('retweet_count', pa.int64()), ('like_count', pa.int64()),
+            ('symbol', pa.string()), ('source', pa.string()), ('archived_at', pa.timestamp('us'))]),
+        'market': pa.schema([
+            ('symbol', pa.string()), ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('price', pa.float64()), ('open', pa.float64()), ('high', pa.float64()),
+            ('low', pa.float64()), ('previous_close', pa.float64()), ('change', pa.float64()),
+            ('volume', pa.int64()), ('archived_at', pa.timestamp('us')),
+            (EXTRA_COLUMN, pa.string())]),
+    }
     
     def __init__(self):
         # NAVER Cloud Object Storage 설정
@@ -32,6 +68,29 @@ class ColdStorage:
         
         # S3 호환 클라이언트 초기화
         self._s3_client = None
+        self._arrow_fs = None
+        self.manifest: Optional[ColdManifest] = None
+        self.cache: Optional[ObjectCache] = None
+
+        # 병렬 로드 설정 (LIST / GET 동시 요청 상한)
+        self.max_workers = getattr(settings, 'COLD_MAX_WORKERS', 16)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix='cold-io')
+
+        # 스트리밍 아카이브 설정 (row group 행 수 / multipart part 바이트)
+        self.row_group_size = getattr(settings, 'COLD_ROW_GROUP_SIZE', 128 * 1024)
+        self.part_size = getattr(settings, 'COLD_PART_SIZE', 16 * 1024 * 1024)
+        self.max_open_writers = getattr(settings, 'COLD_MAX_OPEN_WRITERS', 4)
+
+        # 종목 bucket 파티션 수 / compaction 목표 파일 크기
+        self.symbol_buckets = getattr(settings, 'COLD_SYMBOL_BUCKETS', 16)
+        self.target_file_size = getattr(settings, 'COLD_TARGET_FILE_SIZE', 128 * 1024 * 1024)
+        self.compact_min_files = getattr(settings, 'COLD_COMPACT_MIN_FILES', 2)
+
+        # 로컬 디스크 캐시 (반복 backtest/학습 시 WAN 재다운로드 방지)
+        self.cache_dir = getattr(settings, 'COLD_CACHE_DIR', '.cache/cold-storage')
+        self.cache_max_bytes = getattr(settings, 'COLD_CACHE_MAX_BYTES', 10 * 1024 * 1024 * 1024)
+        self.prefetch_days = getattr(settings, 'COLD_PREFETCH_DAYS', 2)
         
         # 데이터 경로 구조
         self.data_paths = {
@@ -52,6 +111,17 @@ class ColdStorage:
                 aws_secret_access_key=self.secret_key,
                 region_name='kr-standard'  # NAVER Cloud 리전
             )
+            # Arrow 데이터셋용 S3 파일시스템 (row group 단위 range GET)
+            self._arrow_fs = pafs.S3FileSystem(
+                access_key=self.access_key,
+                secret_key=self.secret_key,
+                endpoint_override=self.endpoint_url,
+                region='kr-standard'
+            )
+            self.manifest = ColdManifest(self._s3_client, self.bucket_name)
+            if self.cache_dir:
+                self.cache = ObjectCache(self._s3_client, self.bucket_name,
+                                         self.cache_dir, self.cache_max_bytes)
             
             # 버킷 존재 확인 및 생성
             await self._ensure_bucket_exists()
@@ -88,256 +158,643 @@ class ColdStorage:
             day=f"{date.day:02d}"
         )
 
-    async def archive_sentiment_data(self, data: List[Dict], date: datetime):
-        """감정 데이터 Parquet 형식으로 아카이브"""
+    def _symbol_bucket(self, symbol: Optional[str]) -> int:
+        """종목 → bucket 번호 (프로세스·버전과 무관하게 고정된 crc32 해시)"""
+        return zlib.crc32((symbol or '').encode()) % self.symbol_buckets
+
+    def _get_bucket_path(self, data_type: str, date: datetime, bucket: Optional[int]) -> str:
+        """Hive 레이아웃 경로 (.../day=DD/bucket=NN/), bucket 이 없으면 날짜 경로"""
+        path = self._get_data_path(data_type, date)
+        return path if bucket is None else f"{path}bucket={bucket:02d}/"
+
+    def _file_key(self, data_type: str, date: datetime, bucket: Optional[int],
+                  part_name: str) -> str:
+        return (self._get_bucket_path(data_type, date, bucket)
+                + f"{self.FILE_PREFIXES[data_type]}_{date.strftime('%Y%m%d')}_{part_name}.parquet")
+
+    def _stream_archive(self, data_type: str, date: datetime, rows: Iterable[Dict],
+                        metadata: Dict[str, str], part_name: str) -> List[Dict]:
+        """
+        행 스트림을 종목 bucket 별 multipart Parquet 로 업로드 (블로킹)
+        bucket 별로 Arrow 버퍼에 모아 그 bucket 이 row_group_size 에 닿을 때만 row group 하나로 기록
+        열린 writer 는 max_open_writers 개로 제한, 초과 시 가장 오래 쓰지 않은 bucket 파일을 완료하고
+        이후 그 bucket 은 새 파일({part_name}-N)에 이어 씀 (작은 파일은 compaction 이 병합)
+        메모리 상한: bucket 수 × row_group_size 행(컬럼형) + max_open_writers × part_size
+        반환: 업로드한 파일의 manifest entry 목록
+        """
+        time_column = self.TIME_COLUMNS.get(data_type)
+        schema = self.SCHEMAS.get(data_type)
+        if schema is not None:
+            rows = conform_rows(rows, schema)
+        stage_rows = min(self.row_group_size, 8192)
+        writers: Dict[int, StreamingParquetArchiver] = {}   # 열린 writer (최근 사용 순)
+        stats: Dict[int, FileStats] = {}
+        files: Dict[int, int] = {}                          # bucket → 만든 파일 수
+        staged: Dict[int, List[Dict]] = {}                  # dict 행 (stage_rows 마다 Arrow 로 변환)
+        pending: Dict[int, List[pa.RecordBatch]] = {}
+        pending_rows: Dict[int, int] = {}
+        entries: List[Dict] = []
+
+        def to_arrow(bucket: int):
+            nonlocal schema
+            chunk = staged.pop(bucket, None)
+            if not chunk:
+                return
+            if schema is None:
+                # 선언 스키마가 없는 타입: 모든 bucket 파일이 같은 스키마를 갖도록 첫 청크로 한 번만 추론
+                schema = pa.RecordBatch.from_pylist(chunk).schema
+            pending.setdefault(bucket, []).append(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            pending_rows[bucket] = pending_rows.get(bucket, 0) + len(chunk)
+
+        def finish(bucket: int):
+            writer = writers.pop(bucket)
+            writer.close()
+            entries.append(stats.pop(bucket).entry(writer.key, date, bucket,
+                                                   writer.bytes_written, writer.etag))
+
+        def emit(bucket: int):
+            to_arrow(bucket)
+            batches = pending.pop(bucket, None)
+            if not batches:
+                return
+            del pending_rows[bucket]
+            writer = writers.pop(bucket, None)
+            if writer is None:
+                if len(writers) >= self.max_open_writers:
+                    finish(next(iter(writers)))
+                n = files[bucket] = files.get(bucket, 0) + 1
+                writer = StreamingParquetArchiver(
+                    self._s3_client, self.bucket_name,
+                    self._file_key(data_type, date, bucket,
+                                   part_name if n == 1 else f"{part_name}-{n}"),
+                    schema=schema, compression=self.COMPRESSION[data_type],
+                    row_group_size=self.row_group_size, part_size=self.part_size,
+                    metadata={**metadata, 'bucket': str(bucket)})
+                stats[bucket] = FileStats(time_column)
+            writers[bucket] = writer
+            batch = pa.Table.from_batches(batches).combine_chunks().to_batches()[0]
+            writer.write_batch(batch)
+            stats[bucket].add_batch(batch)
+
         try:
-            if not data:
+            for row in rows:
+                bucket = self._symbol_bucket(row.get('symbol'))
+                chunk = staged.setdefault(bucket, [])
+                chunk.append(row)
+                if len(chunk) >= stage_rows:
+                    to_arrow(bucket)
+                    if pending_rows[bucket] >= self.row_group_size:
+                        emit(bucket)
+            for bucket in sorted(set(staged) | set(pending)):
+                emit(bucket)
+            for bucket in list(writers):
+                finish(bucket)
+        except Exception:
+            for writer in writers.values():
+                writer.abort()
+            # 완료했지만 manifest 에 등록하지 않은 파일 정리
+            self._delete_objects([e['key'] for e in entries])
+            raise
+
+        entries.sort(key=lambda e: (e['bucket'], e['key']))
+        if entries:
+            if self.manifest.load_month(data_type, date.year, date.month) is None:
+                # 월 manifest 최초 생성 시 기존 파일을 먼저 색인 (이후 로더는 LIST 를 건너뜀)
+                self._index_month(data_type, date.year, date.month)
+            self.manifest.update(data_type, added=entries)
+        return entries
+
+    async def _archive(self, data_type: str, date: datetime, rows: Iterable[Dict],
+                       metadata: Dict[str, str], part_name: Optional[str]) -> Tuple[str, int]:
+        """아카이브 후 (날짜 경로, 행 수) 반환"""
+        # part_name 을 고정하면 재실행 시 같은 key 를 덮어써 멱등, 생략하면 새 파일 추가
+        part_name = part_name or f"part-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        entries = await asyncio.get_running_loop().run_in_executor(
+            None, self._stream_archive, data_type, date, rows, metadata, part_name)
+        return self._get_data_path(data_type, date), sum(e['rows'] for e in entries)
+
+    async def archive_sentiment_data(self, data: Iterable[Dict], date: datetime,
+                                     part_name: Optional[str] = None) -> str:
+        """감정 데이터 Parquet 형식으로 아카이브 (성공 시 날짜 파티션 경로, 실패 시 빈 문자열)"""
+        try:
+            archived_at = datetime.utcnow()
+            rows = ({**row, 'archived_at': archived_at} for row in data)
+            
+            # Object Storage에 종목 bucket 별로 스트리밍 업로드
+            path, count = await self._archive('sentiment', date, rows, {
+                'data-type': 'sentiment',
+                'compression': 'snappy'
+            }, part_name)
+            if not count:
                 logging.warning("No sentiment data to archive")
-                return
-            
-            # DataFrame 변환
-            df = pd.DataFrame(data)
-            df['archived_at'] = datetime.utcnow()
-            
-            # Parquet 파일로 변환
-            buffer = BytesIO()
-            table = pa.Table.from_pandas(df)
-            pq.write_table(table, buffer, compression='snappy')
-            buffer.seek(0)
-            
-            # Object Storage에 업로드
-            path = self._get_data_path('sentiment', date)
-            filename = f"sentiment_{date.strftime('%Y%m%d')}.parquet"
-            key = path + filename
-            
-            self._s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=key,
-                Body=buffer.getvalue(),
-                ContentType='application/octet-stream',
-                Metadata={
-                    'data-type': 'sentiment',
-                    'record-count': str(len(data)),
-                    'compression': 'snappy'
-                }
-            )
+                return ""
             
-            logging.info(f"Archived {len(data)} sentiment records to {key}")
+            logging.info(f"Archived {count} sentiment records to {path}")
+            return path
             
         except Exception as e:
             logging.error(f"Failed to archive sentiment data: {e}")
+            return ""
 
-    async def archive_social_data(self, tweets: List[Dict], date: datetime):
+    async def archive_social_data(self, tweets: Iterable[Dict], date: datetime,
+                                  part_name: Optional[str] = None) -> str:
         """소셜 미디어 데이터 아카이브"""
         try:
-            if not tweets:
-                return
-            
-            # 텍스트 데이터 전처리
-            processed_tweets = []
-            for tweet in tweets:
-                processed_tweets.append({
-                    'id': tweet.get('id'),
-                    'text': tweet.get('text', '')[:500],  # 텍스트 길이 제한
-                    'author': tweet.get('author', ''),
-                    'created_at': tweet.get('created_at'),
-                    'retweet_count': tweet.get('retweet_count', 0),
-                    'like_count': tweet.get('like_count', 0),
-                    'symbol': tweet.get('symbol', ''),
-                    'source': tweet.get('source', 'twitter'),
-                    'archived_at': datetime.utcnow()
-                })
-            
-            df = pd.DataFrame(processed_tweets)
-            
-            # Parquet으로 압축 저장
-            buffer = BytesIO()
-            table = pa.Table.from_pandas(df)
-            pq.write_table(table, buffer, compression='gzip')
-            buffer.seek(0)
-            
-            path = self._get_data_path('tweets', date)
-            filename = f"tweets_{date.strftime('%Y%m%d')}.parquet"
-            key = path + filename
-            
-            self._s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=key,
-                Body=buffer.getvalue(),
-                ContentType='application/octet-stream',
-                Metadata={
-                    'data-type': 'social-tweets',
-                    'record-count': str(len(processed_tweets))
-                }
-            )
-            
-            logging.info(f"Archived {len(processed_tweets)} tweets to {key}")
+            archived_at = datetime.utcnow()
+            # 텍스트 데이터 전처리 (스트리밍)
+            processed_tweets = ({
+                'id': tweet.get('id'),
+                'text': tweet.get('text', '')[:500],  # 텍스트 길이 제한
+                'author': tweet.get('author', ''),
+                'created_at': tweet.get('created_at'),
+                'retweet_count': tweet.get('retweet_count', 0),
+                'like_count': tweet.get('like_count', 0),
+                'symbol': tweet.get('symbol', ''),
+                'source': tweet.get('source', 'twitter'),
+                'archived_at': archived_at
+            } for tweet in tweets)
+            
+            path, count = await self._archive('tweets', date, processed_tweets, {
+                'data-type': 'social-tweets'
+            }, part_name)
+            if not count:
+                return ""
+            
+            logging.info(f"Archived {count} tweets to {path}")
+            return path
             
         except Exception as e:
             logging.error(f"Failed to archive social data: {e}")
+            return ""
 
-    async def archive_market_data(self, market_data: List[Dict], date: datetime):
+    async def archive_market_data(self, market_data: Iterable[Dict], date: datetime,
+                                  part_name: Optional[str] = None) -> str:
         """시장 데이터 아카이브"""
         try:
-            if not market_data:
-                return
+            archived_at = datetime.utcnow()
+            rows = ({**row, 'archived_at': archived_at} for row in market_data)
             
-            df = pd.DataFrame(market_data)
-            df['archived_at'] = datetime.utcnow()
+            path, count = await self._archive('market', date, rows, {
+                'data-type': 'market'
+            }, part_name)
+            if not count:
+                return ""
             
-            buffer = BytesIO()
-            table = pa.Table.from_pandas(df)
-            pq.write_table(table, buffer, compression='snappy')
-            buffer.seek(0)
-            
-            path = self._get_data_path('market', date)
-            filename = f"market_{date.strftime('%Y%m%d')}.parquet"
-            key = path + filename
-            
-            self._s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=key,
-                Body=buffer.getvalue(),
-                ContentType='application/octet-stream'
-            )
-            
-            logging.info(f"Archived market data to {key}")
+            logging.info(f"Archived {count} market records to {path}")
+            return path
             
         except Exception as e:
             logging.error(f"Failed to archive market data: {e}")
+            return ""
+
+    def _list_day(self, data_type: str, date: datetime) -> List[Dict]:
+        """하루치 파티션 오브젝트 목록 (페이지네이션 포함)"""
+        paginator = self._s3_client.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket_name,
+                                       Prefix=self._get_data_path(data_type, date)):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith('.parquet'):
+                    objects.append({'key': obj['Key'], 'size': obj['Size'],
+                                    'etag': obj['ETag'].strip('"'), 'date': date})
+        return objects
+
+    def _list_partitions(self, data_type: str, days: List[datetime]) -> List[Dict]:
+        """날짜 파티션 목록을 병렬 조회 (날짜 순서 유지)"""
+        listings = self._pool.map(lambda day: self._list_day(data_type, day), days)
+        return [obj for listing in listings for obj in listing]
+
+    def _bucket_of_key(self, key: str) -> Optional[int]:
+        part = next((p for p in key.split('/') if p.startswith('bucket=')), None)
+        return int(part[len('bucket='):]) if part else None
+
+    def _plan_objects(self, data_type: str, start_date: datetime, end_date: datetime,
+                      symbols: Optional[List[str]] = None) -> List[Dict]:
+        """
+        읽을 파일 계획: manifest 로 날짜·bucket·시간 범위·symbol bloom pruning
+        manifest 가 없는 월(레이아웃 이전 아카이브)만 LIST 로 보완
+        """
+        buckets = {self._symbol_bucket(s) for s in symbols} if symbols else None
+        objects, unplanned = self.manifest.plan(data_type, start_date, end_date, symbols, buckets)
+        if unplanned:
+            for obj in self._list_partitions(data_type, unplanned):
+                bucket = self._bucket_of_key(obj['key'])
+                if buckets is None or bucket is None or bucket in buckets:
+                    objects.append(obj)
+        return objects
+
+    def _scan_filter(self, schema: pa.Schema, data_type: str,
+                     start_date: datetime, end_date: datetime,
+                     symbols: Optional[List[str]]) -> Optional[ds.Expression]:
+        """
+        스키마에 존재하는 컬럼에 한해 종목·시간 조건 구성 (row group 통계로 pruning)
+        시간 범위는 [start_date, end_date] 양 끝 포함, 날짜만 준 end_date 는 그 날 끝까지 (inclusive_end)
+        """
+        conditions = []
+        if symbols and 'symbol' in schema.names:
+            conditions.append(ds.field('symbol').isin(symbols))
+
+        time_column = self.TIME_COLUMNS.get(data_type)
+        time_type = schema.field(time_column).type if time_column in schema.names else None
+        if time_type is not None and pa.types.is_timestamp(time_type):
+            conditions.append(ds.field(time_column) >= pa.scalar(start_date).cast(time_type))
+            conditions.append(ds.field(time_column) <= pa.scalar(inclusive_end(end_date)).cast(time_type))
+        elif time_type is not None and pa.types.is_string(time_type):
+            # 선언 스키마 이전 아카이브의 ISO 8601 문자열 시각: 같은 형식끼리 사전순 비교
+            # ('~' 는 초 이하·'Z'·오프셋 접미사보다 커서 끝 초 전체를 포함)
+            conditions.append(ds.field(time_column) >= start_date.strftime(ISO_SECONDS))
+            conditions.append(ds.field(time_column) <= inclusive_end(end_date).strftime(ISO_SECONDS) + '~')
+
+        expr = None
+        for cond in conditions:
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def _open_dataset(self, keys: List[str], schema: Optional[pa.Schema] = None) -> ds.Dataset:
+        return ds.dataset([f"{self.bucket_name}/{key}" for key in keys],
+                          format='parquet', filesystem=self._arrow_fs, schema=schema)
+
+    def _open_cached_dataset(self, paths: List[str],
+                             schema: Optional[pa.Schema] = None) -> ds.Dataset:
+        # 캐시 파일은 mmap 으로 열어 페이지 캐시에서 바로 읽음 (복사 없음)
+        return ds.dataset(paths, format='parquet', schema=schema,
+                          filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+    def _scan(self, dataset: ds.Dataset, data_type: str, start_date: datetime,
+              end_date: datetime, symbols: Optional[List[str]],
+              columns: Optional[List[str]], batch_size: int) -> Iterator[pa.RecordBatch]:
+        if columns:
+            columns = [c for c in columns if c in dataset.schema.names]
+        scanner = dataset.scanner(
+            columns=columns,
+            filter=self._scan_filter(dataset.schema, data_type, start_date, end_date, symbols),
+            batch_size=batch_size,
+            fragment_readahead=self.max_workers,
+            use_threads=True
+        )
+        yield from scanner.to_batches()
+
+    @staticmethod
+    def _group_by_day(objects: List[Dict]) -> Dict[str, List[Dict]]:
+        days: Dict[str, List[Dict]] = {}
+        for obj in objects:
+            day = obj['date'] if isinstance(obj['date'], str) else obj['date'].strftime('%Y-%m-%d')
+            days.setdefault(day, []).append(obj)
+        return dict(sorted(days.items()))
+
+    def _iter_cached_batches(self, days: Dict[str, List[Dict]], data_type: str,
+                             start_date: datetime, end_date: datetime,
+                             symbols: Optional[List[str]], columns: Optional[List[str]],
+                             batch_size: int) -> Iterator[Tuple[str, pa.RecordBatch]]:
+        """
+        날짜 파티션 순서로 캐시를 거쳐 스캔
+        현재 날짜를 읽는 동안 다음 prefetch_days 일치 파일을 백그라운드로 받아 둠
+        """
+        order = list(days)
+        futures: Dict[str, List] = {}
+        schema = None  # 첫 날짜 스키마로 고정 (단일 데이터셋 스캔과 같은 결과)
+
+        def submit(day: str):
+            if day not in futures:
+                futures[day] = [self._pool.submit(self.cache.fetch, obj['key'], obj.get('etag'), True)
+                                for obj in days[day]]
+
+        try:
+            for i, day in enumerate(order):
+                for upcoming in order[i:i + 1 + self.prefetch_days]:
+                    submit(upcoming)
+                paths = [f.result() for f in futures[day]]
+                try:
+                    dataset = self._open_cached_dataset(paths, schema)
+                    schema = dataset.schema
+                    for batch in self._scan(dataset, data_type, start_date, end_date,
+                                            symbols, columns, batch_size):
+                        yield day, batch
+                finally:
+                    for path in paths:
+                        self.cache.release(path)
+                    del futures[day]
+        finally:
+            # 소비가 중단되면 남은 prefetch 의 pin 해제
+            for pending in futures.values():
+                for f in pending:
+                    if not f.cancel():
+                        try:
+                            self.cache.release(f.result())
+                        except Exception:
+                            pass
+
+    def iter_partition_batches(self, data_type: str, start_date: datetime,
+                               end_date: datetime, symbols: Optional[List[str]] = None,
+                               columns: Optional[List[str]] = None,
+                               batch_size: int = 65_536) -> Iterator[Tuple[str, pa.RecordBatch]]:
+        """
+        (파티션 날짜 'YYYY-MM-DD', RecordBatch) 스트림, 날짜 오름차순 (블로킹)
+        manifest 로 파일 pruning → 종목/시간 조건·컬럼 projection 을 row group 단위로 pushdown
+        """
+        objects = self._plan_objects(data_type, start_date, end_date, symbols)
+        if not objects:
+            return
+
+        days = self._group_by_day(objects)
+        if self.cache is not None:
+            yield from self._iter_cached_batches(days, data_type, start_date, end_date,
+                                                 symbols, columns, batch_size)
+            return
+
+        schema = None
+        for day, day_objects in days.items():
+            dataset = self._open_dataset([obj['key'] for obj in day_objects], schema)
+            schema = dataset.schema
+            for batch in self._scan(dataset, data_type, start_date, end_date,
+                                    symbols, columns, batch_size):
+                yield day, batch
+
+    def iter_historical_batches(self, data_type: str, start_date: datetime,
+                                end_date: datetime, symbols: Optional[List[str]] = None,
+                                columns: Optional[List[str]] = None,
+                                batch_size: int = 65_536) -> Iterator[pa.RecordBatch]:
+        """과거 데이터 RecordBatch 스트림 (블로킹, executor/스레드에서 소비)"""
+        for _, batch in self.iter_partition_batches(data_type, start_date, end_date,
+                                                    symbols, columns, batch_size):
+            yield batch
+
+    def peek_schema(self, data_type: str, start_date: datetime,
+                    end_date: datetime) -> Optional[pa.Schema]:
+        """기간 내 첫 파일의 스키마 (footer 만 읽음)"""
+        objects = self._plan_objects(data_type, start_date, end_date)
+        if not objects:
+            return None
+        obj = objects[0]
+        if self.cache is not None:
+            return pq.read_schema(self.cache.fetch(obj['key'], obj.get('etag')))
+        return pq.read_schema(f"{self.bucket_name}/{obj['key']}", filesystem=self._arrow_fs)
+
+    async def load_historical_table(self, data_type: str, start_date: datetime,
+                                    end_date: datetime, symbols: Optional[List[str]] = None,
+                                    columns: Optional[List[str]] = None) -> pa.Table:
+        """과거 데이터를 Arrow 테이블로 로드"""
+        def load():
+            batches = list(self.iter_historical_batches(
+                data_type, start_date, end_date, symbols, columns))
+            return pa.Table.from_batches(batches) if batches else pa.table({})
+
+        table = await asyncio.get_running_loop().run_in_executor(None, load)
+        logging.info(f"Loaded {table.num_rows} records from cold storage")
+        return table
 
     async def load_historical_data(self, data_type: str, start_date: datetime, 
                                  end_date: datetime, symbols: Optional[List[str]] = None) -> pd.DataFrame:
-        """과거 데이터 로드 (분석용)"""
+        """과거 데이터 로드 (분석용, pandas 호환)"""
         try:
-            all_data = []
-            current_date = start_date
-            
-            while current_date <= end_date:
-                path = self._get_data_path(data_type, current_date)
-                
-                # 해당 날짜의 파일 목록 조회
-                response = self._s3_client.list_objects_v2(
-                    Bucket=self.bucket_name,
-                    Prefix=path
-                )
-                
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        # 파일 다운로드 및 로드
-                        obj_data = self._s3_client.get_object(
-                            Bucket=self.bucket_name,
-                            Key=obj['Key']
-                        )
-                        
-                        buffer = BytesIO(obj_data['Body'].read())
-                        df = pd.read_parquet(buffer)
-                        
-                        # 심볼 필터링
-                        if symbols and 'symbol' in df.columns:
-                            df = df[df['symbol'].isin(symbols)]
-                        
-                        all_data.append(df)
-                
-                current_date += timedelta(days=1)
-            
-            # 모든 데이터 결합
-            if all_data:
-                combined_df = pd.concat(all_data, ignore_index=True)
-                logging.info(f"Loaded {len(combined_df)} records from cold storage")
-                return combined_df
-            else:
+            table = await self.load_historical_table(data_type, start_date, end_date, symbols)
+            if table.num_rows == 0:
                 logging.warning("No data found in specified date range")
                 return pd.DataFrame()
+            return table.to_pandas()
                 
         except Exception as e:
             logging.error(f"Failed to load historical data: {e}")
             return pd.DataFrame()
 
+    def _aggregate_range(self, symbols: Optional[List[str]], start_date: datetime,
+                         end_date: datetime, step: int) -> pa.Table:
+        partials: List[pa.Table] = []
+        for batch in self.iter_historical_batches(
+                'sentiment', start_date, end_date, symbols,
+                columns=['symbol', 'timestamp', 'sentiment_score', 'confidence']):
+            partials.append(bucket_batch(batch, 'timestamp', 'sentiment_score', 'confidence', step))
+            if len(partials) >= 64:
+                partials = [combine_partials(partials)]
+        return combine_partials(partials)
+
+    async def aggregate_range(self, symbols: Optional[List[str]], start_date: datetime,
+                              end_date: datetime, step: int) -> pa.Table:
+        """
+        [start_date, end_date) 감정 데이터를 step 초 구간별 부분 집계
+        manifest pruning + 컬럼 projection 스캔, batch 단위 집계로 원본을 메모리에 올리지 않음
+        """
+        # 스캔 조건은 end 포함이라 1µs 앞까지
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._aggregate_range, symbols, start_date,
+            end_date - timedelta(microseconds=1), step)
+
+    # ---------------------------------------------------------- #
+    #                  MANIFEST / COMPACTION                     #
+    # ---------------------------------------------------------- #
+    def _index_object(self, data_type: str, obj: Dict) -> Dict:
+        """기존 Parquet 파일의 symbol/시간 컬럼만 읽어 manifest entry 생성"""
+        time_column = self.TIME_COLUMNS.get(data_type)
+        stats = FileStats(time_column)
+        with self._arrow_fs.open_input_file(f"{self.bucket_name}/{obj['key']}") as f:
+            pf = pq.ParquetFile(f)
+            columns = [c for c in ('symbol', time_column) if c in pf.schema_arrow.names]
+            for batch in pf.iter_batches(columns=columns or None):
+                stats.add_batch(batch)
+        return stats.entry(obj['key'], obj['date'], self._bucket_of_key(obj['key']),
+                           obj['size'], obj['etag'])
+
+    def _index_month(self, data_type: str, year: int, month: int) -> List[Dict]:
+        """월 단위 LIST 후 manifest 에 없는 파일 색인 (레이아웃 이전 아카이브 마이그레이션)"""
+        first = datetime(year, month, 1)
+        days = [first + timedelta(days=i) for i in range(31)
+                if (first + timedelta(days=i)).month == month]
+        known = {e['key'] for e in self.manifest.load_month(data_type, year, month) or []}
+        objects = [obj for obj in self._list_partitions(data_type, days) if obj['key'] not in known]
+        entries = list(self._pool.map(lambda obj: self._index_object(data_type, obj), objects))
+        self.manifest.update(data_type, added=entries)
+        return entries
+
+    async def rebuild_manifest(self, data_type: str, start_date: datetime, end_date: datetime) -> int:
+        """기간 내 월 manifest 를 LIST 기반으로 보강, 새로 색인한 파일 수 반환"""
+        months = sorted({((start_date + timedelta(days=i)).year, (start_date + timedelta(days=i)).month)
+                         for i in range((end_date.date() - start_date.date()).days + 1)})
+        loop = asyncio.get_running_loop()
+        indexed = 0
+        for year, month in months:
+            entries = await loop.run_in_executor(None, self._index_month, data_type, year, month)
+            indexed += len(entries)
+        logging.info(f"Indexed {indexed} {data_type} files into cold manifest")
+        return indexed
+
+    def _delete_objects(self, keys: List[str]):
+        for i in range(0, len(keys), 1000):
+            self._s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': k} for k in keys[i:i + 1000]], 'Quiet': True})
+
+    def _compact_group(self, data_type: str, date: datetime, bucket: Optional[int],
+                       entries: List[Dict]) -> Tuple[int, int]:
+        """
+        같은 날짜·bucket 의 작은 파일을 target_file_size 단위 파일로 병합 (블로킹)
+        manifest 를 새 파일로 교체한 뒤 원본 삭제 → 읽기 계획은 항상 존재하는 파일만 가리킴
+        반환: (병합한 원본 파일 수, 새 파일 수)
+        """
+        small = [e for e in entries if e.get('bytes', 0) < self.target_file_size // 2]
+        if len(small) < self.compact_min_files:
+            return 0, 0
+
+        dataset = self._open_dataset([e['key'] for e in small])
+        try:
+            # 선언 스키마 이전 파일이 섞여 있어도 컬럼이 빠지지 않도록 파일 스키마 합집합으로 읽음
+            schema = pa.unify_schemas([f.physical_schema for f in dataset.get_fragments()],
+                                      promote_options='permissive')
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logging.warning(f"Skipping compaction of {data_type} {date:%Y-%m-%d} "
+                            f"bucket={bucket}: incompatible file schemas ({e})")
+            return 0, 0
+        dataset = self._open_dataset([e['key'] for e in small], schema)
+        time_column = self.TIME_COLUMNS.get(data_type)
+        added: List[Dict] = []
+        writer, stats = None, None
+        try:
+            for batch in dataset.to_batches(batch_size=self.row_group_size):
+                if writer is None:
+                    part_name = f"compacted-{uuid.uuid4().hex[:12]}"
+                    writer = StreamingParquetArchiver(
+                        self._s3_client, self.bucket_name,
+                        self._file_key(data_type, date, bucket, part_name),
+                        schema=dataset.schema, compression=self.COMPRESSION[data_type],
+                        row_group_size=self.row_group_size, part_size=self.part_size,
+                        metadata={'data-type': data_type, 'compacted': 'true'})
+                    stats = FileStats(time_column)
+                writer.write_batch(batch)
+                stats.add_batch(batch)
+                if writer.bytes_written >= self.target_file_size:
+                    writer.close()
+                    added.append(stats.entry(writer.key, date, bucket,
+                                             writer.bytes_written, writer.etag))
+                    writer = None
+            if writer is not None:
+                writer.close()
+                added.append(stats.entry(writer.key, date, bucket,
+                                         writer.bytes_written, writer.etag))
+                writer = None
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            # 이미 올린 병합 파일은 manifest 에 등록 전이므로 정리
+            self._delete_objects([e['key'] for e in added])
+            raise
+
+        removed = [e['key'] for e in small]
+        self.manifest.update(data_type, added=added, removed_keys=removed)
+        self._delete_objects(removed)
+        return len(removed), len(added)
+
+    async def compact(self, data_type: str, start_date: datetime, end_date: datetime) -> Dict:
+        """기간 내 날짜·bucket 별 small file compaction"""
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(
+            None, self.manifest.entries, data_type, start_date, end_date)
+
+        groups: Dict[Tuple[str, Optional[int]], List[Dict]] = {}
+        for e in entries:
+            groups.setdefault((e['date'], e.get('bucket')), []).append(e)
+
+        result = {'groups': 0, 'files_merged': 0, 'files_written': 0, 'errors': 0}
+        for (day, bucket), group in sorted(groups.items(), key=lambda g: (g[0][0], -1 if g[0][1] is None else g[0][1])):
+            try:
+                merged, written = await loop.run_in_executor(
+                    None, self._compact_group, data_type,
+                    datetime.strptime(day, '%Y-%m-%d'), bucket, group)
+            except Exception as e:
+                result['errors'] += 1
+                logging.error(f"Compaction failed for {data_type} {day} bucket={bucket}: {e}")
+                continue
+            if merged:
+                result['groups'] += 1
+                result['files_merged'] += merged
+                result['files_written'] += written
+
+        if result['files_merged']:
+            logging.info(f"Compacted {result['files_merged']} {data_type} files "
+                         f"into {result['files_written']}")
+        return result
+
+    def _build_training_dataset(self, prefix: str, symbols: List[str],
+                                start_date: datetime, end_date: datetime) -> Dict:
+        """
+        일 파티션 단위 특성 계산 → date=YYYY-MM-DD/ Hive 파티션 Parquet 로 기록 (블로킹)
+        세 데이터 타입 스트림을 날짜 순으로 맞물려 하루씩 처리하므로 메모리는 기간과 무관
+        """
+        market_schema = self.peek_schema('market', start_date, end_date)
+        market_columns = [f.name for f in market_schema
+                          if f.name not in ('symbol', 'timestamp', 'archived_at')
+                          and (pa.types.is_integer(f.type) or pa.types.is_floating(f.type))
+                          ] if market_schema is not None else []
+        aggregators = {
+            'sentiment': DailyAggregator('sentiment', ['sentiment_score', 'confidence']),
+            'tweets': DailyAggregator('tweets', ['retweet_count', 'like_count']),
+            'market': DailyAggregator('market', market_columns),
+        }
+        streams = {
+            data_type: daily_features(
+                self.iter_partition_batches(data_type, start_date, end_date, symbols,
+                                            columns=['symbol', self.TIME_COLUMNS[data_type]]
+                                            + agg.columns),
+                agg)
+            for data_type, agg in aggregators.items()
+        }
+        days = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range((end_date.date() - start_date.date()).days + 1)]
+
+        written_days, records = [], 0
+        for day, table in join_daily_features(streams,
+                                              {k: a.schema for k, a in aggregators.items()},
+                                              days, primary=('sentiment', 'tweets')):
+            with StreamingParquetArchiver(self._s3_client, self.bucket_name,
+                                          f"{prefix}date={day}/part-0.parquet",
+                                          schema=table.schema, compression='snappy',
+                                          row_group_size=self.row_group_size,
+                                          part_size=self.part_size,
+                                          metadata={'data-type': 'training-dataset'}) as writer:
+                for batch in table.to_batches(max_chunksize=self.row_group_size):
+                    writer.write_batch(batch)
+            written_days.append(day)
+            records += table.num_rows
+        return {'days': written_days, 'records': records}
+
     async def create_training_dataset(self, symbols: List[str], 
                                     days_back: int = 90) -> str:
-        """머신러닝 학습용 데이터셋 생성"""
+        """머신러닝 학습용 데이터셋 생성 (성공 시 date 파티션 데이터셋 prefix)"""
         try:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days_back)
             
-            # 다양한 데이터 소스에서 데이터 수집
-            sentiment_data = await self.load_historical_data('sentiment', start_date, end_date, symbols)
-            social_data = await self.load_historical_data('tweets', start_date, end_date, symbols)
-            market_data = await self.load_historical_data('market', start_date, end_date, symbols)
+            dataset_name = f"training_dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}/"
+            prefix = self.data_paths['datasets'] + dataset_name
             
-            # 데이터 결합 및 특성 엔지니어링
-            dataset = self._prepare_ml_features(sentiment_data, social_data, market_data)
-            
-            # 학습 데이터셋으로 저장
-            dataset_name = f"training_dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
-            key = self.data_paths['datasets'] + dataset_name
-            
-            buffer = BytesIO()
-            table = pa.Table.from_pandas(dataset)
-            pq.write_table(table, buffer, compression='snappy')
-            buffer.seek(0)
+            # 감정·소셜·시장 데이터를 일 단위로 스트리밍 집계 후 파티션별 업로드
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, self._build_training_dataset, prefix, symbols, start_date, end_date)
+            if not result['records']:
+                logging.warning("No data available for training dataset")
+                return ""
             
+            # 데이터셋 설명 (기존 오브젝트 메타데이터 대체)
             self._s3_client.put_object(
                 Bucket=self.bucket_name,
-                Key=key,
-                Body=buffer.getvalue(),
-                ContentType='application/octet-stream',
-                Metadata={
+                Key=prefix + '_dataset.json',
+                Body=json.dumps({
                     'data-type': 'training-dataset',
-                    'symbols': ','.join(symbols),
-                    'days-back': str(days_back),
-                    'record-count': str(len(dataset))
-                }
+                    'symbols': symbols,
+                    'days-back': days_back,
+                    'record-count': result['records'],
+                    'partitions': result['days'],
+                    'partitioning': 'hive:date'
+                }).encode(),
+                ContentType='application/json'
             )
             
-            logging.info(f"Created training dataset: {key}")
-            return key
+            logging.info(f"Created training dataset: {prefix} "
+                         f"({result['records']} rows, {len(result['days'])} days)")
+            return prefix
             
         except Exception as e:
             logging.error(f"Failed to create training dataset: {e}")
             return ""
 
-    def _prepare_ml_features(self, sentiment_df: pd.DataFrame, 
-                           social_df: pd.DataFrame, 
-                           market_df: pd.DataFrame) -> pd.DataFrame:
-        """머신러닝용 특성 준비"""
-        try:
-            # 간단한 특성 엔지니어링 예시
-            features = []
-            
-            # 감정 데이터 특성
-            if not sentiment_df.empty:
-                sentiment_features = sentiment_df.groupby(['symbol', 'date']).agg({
-                    'sentiment_score': ['mean', 'std'],
-                    'confidence': 'mean'
-                }).reset_index()
-                features.append(sentiment_features)
-            
-            # 소셜 데이터 특성 (볼륨, 참여도)
-            if not social_df.empty:
-                social_features = social_df.groupby(['symbol', 'date']).agg({
-                    'retweet_count': 'sum',
-                    'like_count': 'sum',
-                    'id': 'count'  # 트윗 수
-                }).reset_index()
-                features.append(social_features)
-            
-            # 시장 데이터와 결합
-            if features and not market_df.empty:
-                combined = features[0]
-                for feature_df in features[1:]:
-                    combined = pd.merge(combined, feature_df, on=['symbol', 'date'], how='outer')
-                
-                final_dataset = pd.merge(combined, market_df, on=['symbol', 'date'], how='left')
-                return final_dataset.fillna(0)
-            
-            return pd.DataFrame()
-            
-        except Exception as e:
-            logging.error(f"Failed to prepare ML features: {e}")
-            return pd.DataFrame()
-
     async def list_archived_data(self, data_type: str, days_back: int = 30) -> List[Dict]:
         """아카이브된 데이터 목록 조회"""
         try:
@@ -377,24 +834,35 @@ class ColdStorage:
         try:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
             
-            # 전체 오브젝트 목록 조회
-            response = self._s3_client.list_objects_v2(Bucket=self.bucket_name)
+            # 전체 오브젝트 목록 조회 (manifest 자체는 아래에서 갱신)
+            paginator = self._s3_client.get_paginator('list_objects_v2')
             
-            deleted_count = 0
-            if 'Contents' in response:
-                for obj in response['Contents']:
+            deleted: Dict[Optional[str], List[str]] = {}
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                for obj in page.get('Contents', []):
+                    if obj['Key'].startswith(self.manifest.prefix):
+                        continue
                     if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                        self._s3_client.delete_object(
-                            Bucket=self.bucket_name,
-                            Key=obj['Key']
-                        )
-                        deleted_count += 1
+                        deleted.setdefault(self._data_type_of(obj['Key']), []).append(obj['Key'])
+            
+            deleted_count = 0
+            for data_type, keys in deleted.items():
+                self._delete_objects(keys)
+                if data_type is not None:
+                    self.manifest.update(data_type, removed_keys=keys)
+                deleted_count += len(keys)
             
             logging.info(f"Cleaned up {deleted_count} old archive files")
             
         except Exception as e:
             logging.error(f"Failed to cleanup old archives: {e}")
 
+    def _data_type_of(self, key: str) -> Optional[str]:
+        for data_type in self.TIME_COLUMNS:
+            if key.startswith(self.data_paths[data_type].split('year=')[0]):
+                return data_type
+        return None
+
     async def get_storage_stats(self) -> Dict:
         """스토리지 사용량 통계"""
         try:
@@ -430,6 +898,8 @@ class ColdStorage:
             
             # 크기를 MB로 변환
             stats['total_size_mb'] = stats['total_size_bytes'] / (1024 * 1024)
+            if self.cache is not None:
+                stats['local_cache'] = self.cache.get_stats()
             
             return stats
             
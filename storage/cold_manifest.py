@@ -0,0 +1,240 @@
+# storage/cold_manifest.py
+"""
+Cold 데이터 레이크 manifest
+- 데이터 타입·월 단위 JSON manifest (manifests/{data_type}/year=YYYY/month=MM/manifest.json)
+- 파일별 행 수, 바이트, 시간 범위, symbol min/max + bloom filter 기록
+- 로더는 LIST 없이 manifest 만으로 읽을 파일을 결정
+"""
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+
+ISO_SECONDS = '%Y-%m-%dT%H:%M:%S'
+
+def inclusive_end(end: datetime) -> datetime:
+    """
+    조회 끝 시각 (포함) 정규화
+    시각 없이 날짜만 준 end(자정)는 기존처럼 그 날 전체를 포함하도록 23:59:59.999999 로 확장
+    """
+    if end.time() == datetime.min.time():
+        return end + timedelta(days=1) - timedelta(microseconds=1)
+    return end
+
+class SymbolBloom:
+    """종목 코드용 고정 크기 bloom filter (기본 8192 bit, k=4 → 500 종목 기준 오탐 ~0.2%)"""
+
+    def __init__(self, bits: int = 8192, hashes: int = 4, data: Optional[bytes] = None):
+        self.bits = bits
+        self.hashes = hashes
+        self._data = bytearray(data) if data else bytearray(bits // 8)
+
+    def _positions(self, symbol: str):
+        digest = hashlib.blake2b(symbol.encode(), digest_size=4 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[4 * i:4 * i + 4], 'little') % self.bits
+
+    def add(self, symbol: str):
+        for pos in self._positions(symbol):
+            self._data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, symbol: str) -> bool:
+        return all(self._data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(symbol))
+
+    def encode(self) -> str:
+        return base64.b64encode(bytes(self._data)).decode()
+
+    @classmethod
+    def decode(cls, value: str) -> 'SymbolBloom':
+        data = base64.b64decode(value)
+        return cls(bits=len(data) * 8, data=data)
+
+
+class FileStats:
+    """기록 중인 Parquet 파일의 manifest 통계 누적 (symbol 범위·bloom, 시간 범위)"""
+
+    def __init__(self, time_column: Optional[str]):
+        self.time_column = time_column
+        self.rows = 0
+        self.symbol_min: Optional[str] = None
+        self.symbol_max: Optional[str] = None
+        self.t_min: Optional[datetime] = None
+        self.t_max: Optional[datetime] = None
+        self.bloom = SymbolBloom()
+
+    @staticmethod
+    def _naive_utc(value: datetime) -> datetime:
+        return value.replace(tzinfo=None) - (value.utcoffset() or timedelta(0))
+
+    def add_batch(self, batch: pa.RecordBatch):
+        self.rows += batch.num_rows
+        names = batch.schema.names
+        if 'symbol' in names:
+            symbols = [s for s in pc.unique(batch.column('symbol')).to_pylist() if s]
+            for symbol in symbols:
+                self.bloom.add(symbol)
+            if symbols:
+                lo, hi = min(symbols), max(symbols)
+                self.symbol_min = lo if self.symbol_min is None else min(self.symbol_min, lo)
+                self.symbol_max = hi if self.symbol_max is None else max(self.symbol_max, hi)
+        if self.time_column in names and pa.types.is_timestamp(batch.schema.field(self.time_column).type):
+            mm = pc.min_max(batch.column(self.time_column)).as_py()
+            if mm['min'] is not None:
+                lo, hi = self._naive_utc(mm['min']), self._naive_utc(mm['max'])
+                self.t_min = lo if self.t_min is None else min(self.t_min, lo)
+                self.t_max = hi if self.t_max is None else max(self.t_max, hi)
+
+    def entry(self, key: str, date: datetime, bucket: Optional[int],
+              size: int, etag: Optional[str]) -> Dict:
+        return {
+            'key': key, 'date': date.strftime('%Y-%m-%d'), 'bucket': bucket,
+            'rows': self.rows, 'bytes': size, 'etag': etag,
+            't_min': self.t_min.strftime(ISO_SECONDS) if self.t_min else None,
+            't_max': self.t_max.strftime(ISO_SECONDS) if self.t_max else None,
+            'symbol_min': self.symbol_min, 'symbol_max': self.symbol_max,
+            'bloom': self.bloom.encode() if self.symbol_min is not None else None,
+            'created_at': datetime.utcnow().strftime(ISO_SECONDS)
+        }
+
+
+class ColdManifest:
+    """
+    S3 위 월 단위 manifest 읽기/갱신
+    갱신은 ETag 조건부 PUT(If-Match / If-None-Match) 으로 read-modify-write 하고,
+    다른 프로세스가 먼저 갱신해 조건이 실패하면 다시 읽어 재적용 (프로세스 내에서는 lock 으로 직렬화)
+    """
+
+    KEY_DATE = re.compile(r'year=(\d{4})/month=(\d{2})/day=(\d{2})/')
+    CONFLICT_CODES = ('PreconditionFailed', '412', 'ConditionalRequestConflict', '409')
+
+    def __init__(self, s3_client, bucket: str, prefix: str = 'manifests/',
+                 max_retries: int = 8):
+        self._s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+
+    def _key(self, data_type: str, year: int, month: int) -> str:
+        return f"{self.prefix}{data_type}/year={year}/month={month:02d}/manifest.json"
+
+    @staticmethod
+    def _error_code(e: Exception) -> Optional[str]:
+        return getattr(e, 'response', {}).get('Error', {}).get('Code')
+
+    def _read_month(self, data_type: str, year: int,
+                    month: int) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """(entry 목록, ETag), 없으면 (None, None)"""
+        try:
+            response = self._s3.get_object(Bucket=self.bucket, Key=self._key(data_type, year, month))
+        except Exception as e:
+            if self._error_code(e) in ('NoSuchKey', '404'):
+                return None, None
+            raise
+        return json.loads(response['Body'].read())['files'], response.get('ETag')
+
+    def load_month(self, data_type: str, year: int, month: int) -> Optional[List[Dict]]:
+        """월 manifest 로드 (없으면 None)"""
+        return self._read_month(data_type, year, month)[0]
+
+    def _save_month(self, data_type: str, year: int, month: int, files: List[Dict],
+                    etag: Optional[str]):
+        """읽은 시점의 ETag 와 같을 때만 기록 (없던 manifest 는 생성만 허용)"""
+        body = json.dumps({'data_type': data_type, 'year': year, 'month': month,
+                           'updated_at': datetime.utcnow().isoformat(), 'files': files})
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        self._s3.put_object(Bucket=self.bucket, Key=self._key(data_type, year, month),
+                            Body=body.encode(), ContentType='application/json', **condition)
+
+    @staticmethod
+    def _month_of(entry: Dict) -> Tuple[int, int]:
+        year, month, _ = entry['date'].split('-')
+        return int(year), int(month)
+
+    def _update_month(self, data_type: str, year: int, month: int,
+                      added: List[Dict], removed: set):
+        replaced = removed | {e['key'] for e in added}
+        for attempt in range(self.max_retries + 1):
+            current, etag = self._read_month(data_type, year, month)
+            files = [e for e in current or [] if e['key'] not in replaced]
+            files.extend(added)
+            try:
+                self._save_month(data_type, year, month, files, etag)
+                return
+            except Exception as e:
+                if self._error_code(e) not in self.CONFLICT_CODES or attempt == self.max_retries:
+                    raise
+                logging.info(f"Manifest {data_type} {year}-{month:02d} changed concurrently, "
+                             f"retrying (attempt {attempt + 1})")
+                time.sleep(min(0.05 * 2 ** attempt, 2.0) * (0.5 + random.random()))
+
+    def update(self, data_type: str, added: Iterable[Dict] = (),
+               removed_keys: Iterable[str] = ()):
+        """entry 추가(같은 key 는 교체) / 삭제를 월별 manifest 에 반영"""
+        added = list(added)
+        removed = set(removed_keys)
+        months = {self._month_of(e) for e in added}
+        for key in removed:
+            m = self.KEY_DATE.search(key)
+            if m:
+                months.add((int(m.group(1)), int(m.group(2))))
+
+        with self._lock:
+            for year, month in sorted(months):
+                self._update_month(data_type, year, month,
+                                   [e for e in added if self._month_of(e) == (year, month)], removed)
+
+    def plan(self, data_type: str, start: datetime, end: datetime,
+             symbols: Optional[List[str]] = None,
+             buckets: Optional[set] = None) -> Tuple[List[Dict], List[datetime]]:
+        """
+        manifest 기반 읽기 계획
+        반환: (읽을 파일 entry 목록, manifest 가 없어 LIST 가 필요한 날짜 목록)
+        """
+        end = inclusive_end(end)
+        days = [start + timedelta(days=i) for i in range((end.date() - start.date()).days + 1)]
+        months = sorted({(d.year, d.month) for d in days})
+        loaded = {m: self.load_month(data_type, *m) for m in months}
+
+        start_iso, end_iso = start.strftime(ISO_SECONDS), end.strftime(ISO_SECONDS)
+        wanted_days = {d.strftime('%Y-%m-%d') for d in days}
+        selected, unplanned = [], []
+        for day in days:
+            if loaded[(day.year, day.month)] is None:
+                unplanned.append(day)
+
+        for files in loaded.values():
+            for e in files or []:
+                if e['date'] not in wanted_days:
+                    continue
+                # bucket 이 없는 entry(버킷 레이아웃 이전 파일)는 bucket 으로 거르지 않음
+                if buckets is not None and e.get('bucket') is not None and e['bucket'] not in buckets:
+                    continue
+                if e.get('t_max') and e['t_max'] < start_iso:
+                    continue
+                if e.get('t_min') and e['t_min'] > end_iso:
+                    continue
+                if symbols and e.get('symbol_min') is not None:
+                    if not any(e['symbol_min'] <= s <= e['symbol_max'] for s in symbols):
+                        continue
+                    if e.get('bloom'):
+                        bloom = SymbolBloom.decode(e['bloom'])
+                        if not any(s in bloom for s in symbols):
+                            continue
+                selected.append(e)
+
+        # bucket 없는(레이아웃 이전) entry 가 같은 날짜의 bucket entry 와 섞여도 비교 가능하도록 -1
+        selected.sort(key=lambda e: (e['date'], -1 if e.get('bucket') is None else e['bucket'], e['key']))
+        return selected, unplanned
+
+    def entries(self, data_type: str, start: datetime, end: datetime) -> List[Dict]:
+        """기간 내 전체 entry (compaction 등 관리 작업용)"""
+        return self.plan(data_type, start, end)[0]
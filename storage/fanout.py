@@ -0,0 +1,125 @@
+# storage/fanout.py
+"""
+티어별 비동기 쓰기 큐 (StorageManager.write_event fan-out 용)
+- 티어마다 독립 큐 + batch writer → 느린 티어가 수집 루프나 다른 티어를 지연시키지 않음
+- 큐 상한 초과 시 정책에 따라 drop (drop_oldest: 최신 값 우선 / drop_newest: 기존 값 우선)
+- batch 실패 시 지수 backoff 재시도 후 폐기, 티어별 지표 유지
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class TierSink:
+    """단일 티어 쓰기 큐 (writer 는 이벤트 list 를 받아 한 번에 저장하는 coroutine)"""
+
+    POLICIES = ('drop_oldest', 'drop_newest')
+
+    def __init__(self, name: str, writer: Callable[[List[Dict]], Awaitable],
+                 batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue: int = 10_000, policy: str = 'drop_oldest',
+                 max_retries: int = 3, retry_backoff: float = 0.5):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown drop policy for {name}: {policy}")
+        self.name = name
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue: deque = deque()          # (enqueue monotonic, event)
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {
+            'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0,
+            'batches': 0, 'retries': 0, 'last_batch_ms': 0.0, 'max_lag_ms': 0.0
+        }
+
+    async def start(self):
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """남은 이벤트를 모두 쓴 뒤 종료 (cancel 대신 플래그로 종료해 batch 유실 방지)"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    def offer(self, event: Dict) -> bool:
+        """비차단 적재, 정책상 버려지면 False"""
+        if len(self._queue) >= self.max_queue:
+            self.metrics['dropped'] += 1
+            if self.policy == 'drop_newest':
+                return False
+            self._queue.popleft()
+        self._queue.append((time.monotonic(), event))
+        self.metrics['enqueued'] += 1
+        if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self):
+        """큐에 있는 이벤트를 즉시 기록"""
+        while self._queue:
+            await self._write(self._take())
+
+    def get_metrics(self) -> Dict:
+        return {**self.metrics, 'queued': len(self._queue), 'policy': self.policy}
+
+    # ---------------------------------------------------------- #
+    #                  INTERNAL HELPERS                          #
+    # ---------------------------------------------------------- #
+    def _take(self) -> List[tuple]:
+        return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+    async def _wait(self, timeout: float):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while not self._closing or self._queue:
+            if not self._queue:
+                await self._wait(self.flush_interval)
+                continue
+            # batch 가 찰 때까지 가장 오래된 이벤트 기준 flush_interval 만큼 대기
+            linger = self.flush_interval - (time.monotonic() - self._queue[0][0])
+            if len(self._queue) < self.batch_size and linger > 0 and not self._closing:
+                await self._wait(linger)
+                continue
+            await self._write(self._take())
+
+    async def _write(self, batch: List[tuple]):
+        if not batch:
+            return
+        events = [event for _, event in batch]
+        async with self._write_lock:
+            for attempt in range(self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    await self.writer(events)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        self.metrics['failed'] += len(events)
+                        logging.error(f"{self.name} sink dropped {len(events)} events: {e}")
+                        return
+                    self.metrics['retries'] += 1
+                    logging.warning(f"{self.name} sink write failed (attempt {attempt + 1}): {e}")
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                self.metrics['written'] += len(events)
+                self.metrics['batches'] += 1
+                self.metrics['last_batch_ms'] = (time.perf_counter() - started) * 1000
+                self.metrics['max_lag_ms'] = max(self.metrics['max_lag_ms'],
+                                                 (time.monotonic() - batch[0][0]) * 1000)
+                return
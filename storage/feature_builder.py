@@ -0,0 +1,159 @@
+# storage/feature_builder.py
+"""
+학습 데이터셋 특성 계산 (out-of-core)
+- 날짜 파티션 단위 RecordBatch 스트림을 종목별 부분 집계(sum/sumsq/count/min/max)로 누적
+- Arrow group_by / join 커널만 사용 (pandas 미사용)
+- 메모리는 하루치 batch 하나 + 종목 수 크기로 제한 → 조회 기간과 무관
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+class DailyAggregator:
+    """
+    하루치 batch 를 종목별 부분 집계로 누적하고 특성 테이블로 확정
+    특성: {prefix}_count, {prefix}_{col}_{sum,mean,std,min,max}
+    (컬럼명이 이미 prefix 로 시작하면 prefix 를 반복하지 않음: sentiment_score_mean)
+    """
+
+    FEATURES = ('sum', 'mean', 'std', 'min', 'max')
+    COMPACT_EVERY = 64  # 부분 집계 테이블이 이만큼 쌓이면 한 번 합침
+
+    def __init__(self, prefix: str, columns: List[str]):
+        self.prefix = prefix
+        self.columns = list(columns)
+        self._partials: List[pa.Table] = []
+
+    @property
+    def schema(self) -> pa.Schema:
+        fields = [pa.field('symbol', pa.string()), pa.field(f"{self.prefix}_count", pa.int64())]
+        for col in self.columns:
+            fields += [pa.field(f"{self._base(col)}_{f}", pa.float64()) for f in self.FEATURES]
+        return pa.schema(fields)
+
+    def _base(self, col: str) -> str:
+        return col if col.startswith(f"{self.prefix}_") else f"{self.prefix}_{col}"
+
+    def add(self, batch: pa.RecordBatch):
+        if batch.num_rows == 0 or 'symbol' not in batch.schema.names:
+            return
+        arrays = {'symbol': batch.column('symbol'), '_rows': pa.nulls(batch.num_rows, pa.int8())}
+        aggs = [('_rows', 'count', pc.CountOptions(mode='all'))]
+        for col in self.columns:
+            if col in batch.schema.names:
+                values = pc.cast(batch.column(col), pa.float64())
+            else:
+                values = pa.nulls(batch.num_rows, pa.float64())
+            arrays[col] = values
+            arrays[f"{col}__sq"] = pc.multiply(values, values)
+            aggs += [(col, 'sum'), (f"{col}__sq", 'sum'), (col, 'count'), (col, 'min'), (col, 'max')]
+
+        partial = pa.table(arrays).group_by('symbol').aggregate(aggs)
+        # 이후 재집계가 같은 이름으로 되도록 컬럼명 정규화
+        self._partials.append(partial.rename_columns(
+            [self._normalize(name) for name in partial.column_names]))
+        if len(self._partials) >= self.COMPACT_EVERY:
+            self._partials = [self._combine(self._partials)]
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        if name == '_rows_count':
+            return 'rows'
+        if name.endswith('__sq_sum'):
+            return name[:-len('__sq_sum')] + '__sumsq'
+        for stat in ('sum', 'count', 'min', 'max'):
+            if name.endswith(f"_{stat}"):
+                return f"{name[:-len(stat) - 1]}__{stat}"
+        return name
+
+    def _combine(self, partials: List[pa.Table]) -> pa.Table:
+        """부분 집계 병합 (합은 합으로, min/max 는 min/max 로)"""
+        aggs = [('rows', 'sum')]
+        for col in self.columns:
+            aggs += [(f"{col}__sum", 'sum'), (f"{col}__sumsq", 'sum'), (f"{col}__count", 'sum'),
+                     (f"{col}__min", 'min'), (f"{col}__max", 'max')]
+        merged = pa.concat_tables(partials).group_by('symbol').aggregate(aggs)
+        # "<name>_<agg>" 꼬리를 떼어 원래 부분 집계 컬럼명 복원
+        return merged.rename_columns([name if name == 'symbol' else name.rsplit('_', 1)[0]
+                                      for name in merged.column_names])
+
+    def finish(self) -> pa.Table:
+        """하루치 특성 테이블 반환 후 상태 초기화 (데이터가 없으면 빈 테이블)"""
+        if not self._partials:
+            return self.schema.empty_table()
+        table = self._combine(self._partials)
+        self._partials = []
+
+        columns = {'symbol': table.column('symbol'),
+                   f"{self.prefix}_count": pc.cast(table.column('rows'), pa.int64())}
+        for col in self.columns:
+            count = pc.cast(table.column(f"{col}__count"), pa.float64()).to_numpy(zero_copy_only=False)
+            total = table.column(f"{col}__sum").to_numpy(zero_copy_only=False).astype(float)
+            sumsq = table.column(f"{col}__sumsq").to_numpy(zero_copy_only=False).astype(float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = total / count
+                std = np.sqrt(np.maximum(sumsq / count - mean * mean, 0.0))
+            mask = count == 0
+            base = self._base(col)
+            columns[f"{base}_sum"] = pa.array(total, mask=mask)
+            columns[f"{base}_mean"] = pa.array(mean, mask=mask)
+            columns[f"{base}_std"] = pa.array(std, mask=mask)
+            columns[f"{base}_min"] = pc.cast(table.column(f"{col}__min"), pa.float64())
+            columns[f"{base}_max"] = pc.cast(table.column(f"{col}__max"), pa.float64())
+        return pa.table(columns).cast(self.schema)
+
+
+def daily_features(partition_batches: Iterator[Tuple[str, pa.RecordBatch]],
+                   aggregator: DailyAggregator) -> Iterator[Tuple[str, pa.Table]]:
+    """날짜 순서의 (날짜, batch) 스트림 → (날짜, 종목별 특성) 스트림"""
+    current: Optional[str] = None
+    for day, batch in partition_batches:
+        if current is not None and day != current:
+            yield current, aggregator.finish()
+        current = day
+        aggregator.add(batch)
+    if current is not None:
+        yield current, aggregator.finish()
+
+
+def join_daily_features(streams: Dict[str, Iterator[Tuple[str, pa.Table]]],
+                        schemas: Dict[str, pa.Schema], days: List[str],
+                        primary: Tuple[str, ...]) -> Iterator[Tuple[str, pa.Table]]:
+    """
+    데이터 타입별 일 특성 스트림을 날짜 기준으로 맞물려 종목 단위 join
+    primary 타입들은 full outer join, 나머지는 left join (시장 데이터 등 보조 특성)
+    결측 값은 0 으로 채움
+    """
+    heads: Dict[str, Optional[Tuple[str, pa.Table]]] = {
+        name: next(stream, None) for name, stream in streams.items()}
+
+    for day in days:
+        tables = {}
+        for name, stream in streams.items():
+            head = heads[name]
+            while head is not None and head[0] < day:  # 범위 밖 파티션은 건너뜀
+                head = heads[name] = next(stream, None)
+            if head is not None and head[0] == day:
+                tables[name] = head[1]
+                heads[name] = next(stream, None)
+            else:
+                tables[name] = schemas[name].empty_table()
+
+        combined = None
+        for name in primary:
+            table = tables[name]
+            combined = table if combined is None else combined.join(
+                table, 'symbol', join_type='full outer')
+        for name in streams:
+            if name not in primary:
+                combined = combined.join(tables[name], 'symbol', join_type='left outer')
+        if combined.num_rows == 0:
+            continue
+
+        filled = {}
+        for field in combined.schema:
+            column = combined.column(field.name)
+            filled[field.name] = column if field.name == 'symbol' else pc.fill_null(
+                column, pa.scalar(0, field.type))
+        yield day, pa.table(filled).sort_by('symbol')
@@ -1,43 +1,403 @@
-import asyncpg, aioredis, logging
+import asyncpg, aioredis, asyncio, json, logging, time
+from collections import deque
+from datetime import datetime, timedelta
+import pyarrow as pa
 from config import settings
+from .range_query import PARTIAL_SCHEMA
 
 class HotDB:
     """
     PostgreSQL + Redis 캐시 (24h)
+    write_behind 모드: put() 은 버퍼에만 적재, 크기/주기 기준으로 COPY + Redis pipeline 일괄 반영
+    sentiment 는 ts 기준 시간/일 단위 RANGE 파티션 테이블, 보관 기간 경과 시 파티션 단위 DROP
+    새 점수는 Redis pub/sub(UPDATES_CHANNEL) 로 발행 → UI 등 구독자는 재조회 없이 갱신
     """
-    async def startup(self):
-        self.pg = await asyncpg.create_pool(settings.POSTGRES_URL, min_size=1, max_size=5)
+    COLUMNS = ("symbol", "score", "label", "confidence", "ts")
+    CACHE_TTL = 300
+    UPDATES_CHANNEL = "sentiment-updates"
+    PARTITION_FORMATS = {"hour": "%Y%m%d%H", "day": "%Y%m%d"}
+
+    def __init__(self, write_behind: bool | None = None,
+                 batch_size: int | None = None,
+                 flush_interval: float | None = None):
+        self.write_behind = write_behind if write_behind is not None \
+            else getattr(settings, 'HOT_WRITE_BEHIND', False)
+        self.batch_size = batch_size or getattr(settings, 'HOT_BATCH_SIZE', 1000)
+        self.flush_interval = flush_interval or getattr(settings, 'HOT_FLUSH_INTERVAL', 1.0)
+        self.max_buffer = getattr(settings, 'HOT_MAX_BUFFER', self.batch_size * 20)
+
+        # 파티션 설정
+        self.partition_interval = getattr(settings, 'HOT_PARTITION_INTERVAL', 'hour')
+        if self.partition_interval not in self.PARTITION_FORMATS:
+            raise ValueError(f"Unknown partition interval: {self.partition_interval}")
+        self.retention = timedelta(hours=getattr(settings, 'HOT_RETENTION_HOURS', 24))
+        self.partitions_ahead = getattr(settings, 'HOT_PARTITIONS_AHEAD', 3)
+        self.maintenance_interval = getattr(settings, 'HOT_MAINTENANCE_INTERVAL', 300)
+
+        # 상한 초과 시 가장 오래된 행부터 자동 제거 (O(1))
+        self._buffer: deque[tuple] = deque(maxlen=self.max_buffer)
+        self._flush_lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task] = []
+        self._partitions: set[str] = set()
+        # 이 시각 이후 데이터를 가진 파티션은 보관 기간이 지나도 유지 (TierMover watermark)
+        self.keep_after: datetime | None = None
+        self.metrics = {
+            "buffered": 0, "flushed_rows": 0, "flushes": 0,
+            "flush_errors": 0, "dropped_rows": 0, "last_flush_ms": 0.0
+        }
+
+    async def connect(self):
+        """연결만 생성 (읽기 전용 클라이언트용: 테이블/파티션 관리·백그라운드 작업 없음)"""
+        self.pg = await asyncpg.create_pool(settings.POSTGRES_URL, min_size=1,
+                                            max_size=getattr(settings, 'HOT_POOL_SIZE', 5))
         self.cache = await aioredis.from_url(settings.REDIS_URL)
+
+    async def startup(self):
+        await self.connect()
         await self._init_table()
+        self._tasks.append(asyncio.create_task(self._maintenance_loop()))
+        if self.write_behind:
+            self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def shutdown(self):
+        """버퍼 잔여분 flush 후 연결 종료"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.flush()
+        if self._buffer:
+            logging.error("HotDB shutdown with %d unflushed rows", len(self._buffer))
+        await self.pg.close()
+        await self.cache.close()
+
+    @staticmethod
+    async def _relkind(c, name: str) -> str | None:
+        return await c.fetchval("SELECT c.relkind FROM pg_class c"
+                                " JOIN pg_namespace n ON n.oid = c.relnamespace"
+                                " WHERE c.relname = $1 AND n.nspname = current_schema()", name)
 
     async def _init_table(self):
+        """
+        파티션 테이블 준비
+        구버전 비파티션 테이블은 sentiment_legacy 로 보존 후 보관 기간 내 행만 이관
+        (이름 변경·생성·이관을 한 트랜잭션으로 → 중간 실패 시 원래 테이블 그대로 남아 다음 기동 때 재시도)
+        """
+        async with self.pg.acquire() as c:
+            try:
+                async with c.transaction():
+                    kind = await self._relkind(c, 'sentiment')
+                    if kind == 'r':
+                        logging.warning("Migrating unpartitioned sentiment table to sentiment_legacy")
+                        if await self._relkind(c, 'sentiment_legacy'):
+                            # 이전 이관 후 구버전이 다시 만든 테이블 → 기존 legacy 에 이어 붙임
+                            await c.execute("INSERT INTO sentiment_legacy(symbol,score,label,confidence,ts)"
+                                            " SELECT symbol,score,label,confidence,ts FROM sentiment")
+                            await c.execute("DROP TABLE sentiment")
+                        else:
+                            await c.execute("ALTER TABLE sentiment RENAME TO sentiment_legacy")
+
+                    await c.execute("""
+                    CREATE TABLE IF NOT EXISTS sentiment(
+                      symbol varchar(10) not null,
+                      score  float,
+                      label  varchar(20),
+                      confidence float,
+                      ts timestamp not null default (now() at time zone 'utc')
+                    ) PARTITION BY RANGE (ts);
+                    CREATE INDEX IF NOT EXISTS sentiment_ts_brin ON sentiment USING brin(ts);
+                    CREATE INDEX IF NOT EXISTS sentiment_symbol_ts_idx ON sentiment(symbol, ts desc);
+                    """)
+
+                    rows = await c.fetch("SELECT c.relname FROM pg_inherits i"
+                                         " JOIN pg_class c ON c.oid = i.inhrelid"
+                                         " JOIN pg_class p ON p.oid = i.inhparent"
+                                         " WHERE p.relname = 'sentiment'")
+                    self._partitions = {r["relname"] for r in rows}
+
+                    if kind == 'r':
+                        since = datetime.utcnow() - self.retention
+                        await self._create_partitions(c, since)
+                        await c.execute("INSERT INTO sentiment(symbol,score,label,confidence,ts)"
+                                        " SELECT symbol,score,label,confidence,ts FROM sentiment_legacy"
+                                        " WHERE ts >= $1", since)
+            except Exception:
+                self._partitions = set()   # rollback 된 파티션을 만든 것으로 기억하지 않도록
+                raise
+        if kind != 'r':
+            await self.ensure_partitions()
+
+    # ---------------------------------------------------------- #
+    #                  PARTITIONS                                #
+    # ---------------------------------------------------------- #
+    @property
+    def _step(self) -> timedelta:
+        return timedelta(hours=1) if self.partition_interval == "hour" else timedelta(days=1)
+
+    def _partition_start(self, ts: datetime) -> datetime:
+        if self.partition_interval == "hour":
+            return ts.replace(minute=0, second=0, microsecond=0)
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _partition_name(self, ts: datetime) -> str:
+        fmt = self.PARTITION_FORMATS[self.partition_interval]
+        return f"sentiment_p{self._partition_start(ts).strftime(fmt)}"
+
+    def _partition_end(self, name: str) -> datetime | None:
+        """파티션 이름 → 상한 시각 (형식이 다르면 None)"""
+        suffix = name.removeprefix("sentiment_p")
+        for interval, fmt in self.PARTITION_FORMATS.items():
+            try:
+                start = datetime.strptime(suffix, fmt)
+            except ValueError:
+                continue
+            if len(suffix) == len(start.strftime(fmt)):
+                return start + (timedelta(hours=1) if interval == "hour" else timedelta(days=1))
+        return None
+
+    async def ensure_partitions(self, since: datetime | None = None) -> list[str]:
+        """since(기본: 현재) 부터 partitions_ahead 구간 앞까지 파티션 생성"""
+        async with self.pg.acquire() as c:
+            return await self._create_partitions(c, since)
+
+    async def _create_partitions(self, c, since: datetime | None = None) -> list[str]:
+        """주어진 연결(트랜잭션 안일 수 있음)에서 파티션 생성"""
+        now = datetime.utcnow()
+        start = self._partition_start(since or now)
+        end = self._partition_start(now) + self._step * self.partitions_ahead
+        created = []
+        while start <= end:
+            name = self._partition_name(start)
+            if name not in self._partitions:
+                await c.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF sentiment"
+                                f" FOR VALUES FROM ('{start.isoformat()}')"
+                                f" TO ('{(start + self._step).isoformat()}')")
+                self._partitions.add(name)
+                created.append(name)
+            start += self._step
+        if created:
+            logging.info(f"Created sentiment partitions: {', '.join(created)}")
+        return created
+
+    async def _ensure_partitions_for(self, timestamps):
+        if any(self._partition_name(ts) not in self._partitions for ts in timestamps):
+            await self.ensure_partitions(since=min(timestamps))
+
+    async def drop_expired_partitions(self, keep_after: datetime | None = None,
+                                      detach_only: bool = False) -> list[str]:
+        """
+        보관 기간이 지난 파티션 DETACH(+DROP)
+        keep_after: 이 시각 이후 데이터를 포함한 파티션은 보존 (티어 이동 watermark 등)
+        """
+        cutoff = datetime.utcnow() - self.retention
+        if keep_after is not None:
+            cutoff = min(cutoff, keep_after)
+
+        expired = sorted(name for name in self._partitions
+                         if (end := self._partition_end(name)) is not None and end <= cutoff)
         async with self.pg.acquire() as c:
-            await c.execute("""
-            CREATE TABLE IF NOT EXISTS sentiment(
-              id serial primary key,
-              symbol varchar(10),
-              score  float,
-              label  varchar(20),
-              confidence float,
-              ts timestamp default now()
-            );
-            CREATE INDEX IF NOT EXISTS idx_symbol_ts ON sentiment(symbol, ts desc);
-            """)
+            for name in expired:
+                await c.execute(f"ALTER TABLE sentiment DETACH PARTITION {name}")
+                if not detach_only:
+                    await c.execute(f"DROP TABLE {name}")
+                self._partitions.discard(name)
+        if expired:
+            logging.info(f"{'Detached' if detach_only else 'Dropped'} sentiment partitions: "
+                         f"{', '.join(expired)}")
+        return expired
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                await self.ensure_partitions()
+                await self.drop_expired_partitions(keep_after=self.keep_after)
+            except Exception as e:
+                logging.error(f"HotDB partition maintenance error: {e}")
 
     async def put(self, symbol: str, score: float, label: str, confidence: float):
+        if self.write_behind:
+            if len(self._buffer) >= self.max_buffer:
+                # 백프레셔: 가장 오래된 행을 버리고 최신 값 우선 (deque maxlen 이 제거)
+                self.metrics["dropped_rows"] += 1
+            self._buffer.append((symbol, score, label, confidence, datetime.utcnow()))
+            self.metrics["buffered"] = len(self._buffer)
+            if len(self._buffer) >= self.batch_size and not self._flush_lock.locked():
+                await self.flush()
+            return
+
+        ts = datetime.utcnow()
+        await self._ensure_partitions_for((ts,))
         async with self.pg.acquire() as c:
-            await c.execute("INSERT INTO sentiment(symbol,score,label,confidence) VALUES ($1,$2,$3,$4)",
-                            symbol, score, label, confidence)
-        await self.cache.setex(f"sent:{symbol}", 300,
+            await c.execute("INSERT INTO sentiment(symbol,score,label,confidence,ts) VALUES ($1,$2,$3,$4,$5)",
+                            symbol, score, label, confidence, ts)
+        await self.cache.setex(f"sent:{symbol}", self.CACHE_TTL,
                                f"{score}|{label}|{confidence}")
+        await self.cache.publish(self.UPDATES_CHANNEL,
+                                 self._update_message(symbol, score, label, confidence, ts))
+
+    async def put_many(self, rows: list[tuple]) -> int:
+        """
+        (symbol, score, label, confidence, ts) 행 일괄 반영 (StorageManager fan-out 용)
+        버퍼에 합쳐 COPY 한 번으로 기록, 실패한 행은 버퍼에 남아 다음 flush 에서 재시도
+        """
+        overflow = len(self._buffer) + len(rows) - self.max_buffer
+        if overflow > 0:
+            self.metrics["dropped_rows"] += overflow
+        self._buffer.extend(rows)
+        self.metrics["buffered"] = len(self._buffer)
+        if self.write_behind and len(self._buffer) < self.batch_size:
+            return 0
+        return await self.flush()
+
+    # ---------------------------------------------------------- #
+    #                  WRITE-BEHIND                              #
+    # ---------------------------------------------------------- #
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"HotDB flush loop error: {e}")
+
+    async def flush(self) -> int:
+        """버퍼를 COPY 한 번 + Redis pipeline 한 번으로 반영"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            rows = list(self._buffer)
+            self._buffer.clear()
+            started = time.perf_counter()
+            try:
+                await self._ensure_partitions_for([r[4] for r in rows])
+                async with self.pg.acquire() as c:
+                    try:
+                        await c.copy_records_to_table("sentiment", records=rows,
+                                                      columns=self.COLUMNS)
+                    except asyncpg.PostgresError as e:
+                        logging.warning(f"COPY failed ({e}), falling back to executemany")
+                        await c.executemany(
+                            "INSERT INTO sentiment(symbol,score,label,confidence,ts)"
+                            " VALUES ($1,$2,$3,$4,$5)", rows)
+            except Exception as e:
+                # 실패한 배치는 버퍼 앞에 되돌려 다음 주기에 재시도
+                overflow = len(rows) + len(self._buffer) - self.max_buffer
+                if overflow > 0:
+                    self.metrics["dropped_rows"] += overflow
+                requeued = deque(rows, maxlen=self.max_buffer)
+                requeued.extend(self._buffer)
+                self._buffer = requeued
+                self.metrics["flush_errors"] += 1
+                self.metrics["buffered"] = len(self._buffer)
+                logging.error(f"HotDB flush failed, {len(rows)} rows requeued: {e}")
+                return 0
+
+            # 종목별 최신 값만 캐시 + 발행 (한 번의 pipeline round-trip)
+            latest = {r[0]: r for r in rows}
+            try:
+                pipe = self.cache.pipeline(transaction=False)
+                for symbol, score, label, conf, ts in latest.values():
+                    pipe.setex(f"sent:{symbol}", self.CACHE_TTL, f"{score}|{label}|{conf}")
+                    pipe.publish(self.UPDATES_CHANNEL,
+                                 self._update_message(symbol, score, label, conf, ts))
+                await pipe.execute()
+            except Exception as e:
+                logging.error(f"HotDB cache pipeline failed: {e}")
+
+            self.metrics["flushed_rows"] += len(rows)
+            self.metrics["flushes"] += 1
+            self.metrics["buffered"] = len(self._buffer)
+            self.metrics["last_flush_ms"] = (time.perf_counter() - started) * 1000
+            return len(rows)
+
+    def buffer_stats(self) -> dict:
+        """write-behind 버퍼 지표"""
+        stats = dict(self.metrics)
+        stats["buffered"] = len(self._buffer)
+        stats["rows_per_flush"] = (stats["flushed_rows"] / stats["flushes"]
+                                   if stats["flushes"] else 0.0)
+        return stats
+
+    @staticmethod
+    def _update_message(symbol, score, label, confidence, ts: datetime) -> str:
+        return json.dumps({"symbol": symbol, "score": score, "label": label,
+                           "confidence": confidence, "ts": ts.isoformat()})
+
+    async def subscribe(self):
+        """새 점수 구독 (async iterator, 메시지는 dict)"""
+        pubsub = self.cache.pubsub()
+        await pubsub.subscribe(self.UPDATES_CHANNEL)
+        try:
+            async for msg in pubsub.listen():
+                if msg.get("type") == "message":
+                    yield json.loads(msg["data"])
+        finally:
+            await pubsub.unsubscribe(self.UPDATES_CHANNEL)
+            await pubsub.close()
+
+    @staticmethod
+    def _parse_cached(raw: bytes) -> tuple:
+        s, l, c = raw.decode().split("|")
+        return float(s), l, float(c)
 
     async def get_latest(self, symbol: str) -> tuple | None:
         cached = await self.cache.get(f"sent:{symbol}")
         if cached:
-            s, l, c = cached.decode().split("|")
-            return float(s), l, float(c)
+            return self._parse_cached(cached)
 
         async with self.pg.acquire() as c:
             row = await c.fetchrow("SELECT score,label,confidence FROM sentiment"
                                    " WHERE symbol=$1 ORDER BY ts DESC LIMIT 1", symbol)
-            return (row["score"], row["label"], row["confidence"]) if row else None
\ No newline at end of file
+            return (row["score"], row["label"], row["confidence"]) if row else None
+
+    async def get_latest_many(self, symbols: list[str]) -> dict[str, tuple]:
+        """
+        여러 종목 최신 점수 일괄 조회
+        Redis MGET 1회 + 미스 종목 DISTINCT ON 쿼리 1회 + 캐시 backfill pipeline 1회
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+
+        result: dict[str, tuple] = {}
+        cached = await self.cache.mget([f"sent:{s}" for s in symbols])
+        misses = []
+        for symbol, raw in zip(symbols, cached):
+            if raw:
+                result[symbol] = self._parse_cached(raw)
+            else:
+                misses.append(symbol)
+
+        if not misses:
+            return result
+
+        async with self.pg.acquire() as c:
+            rows = await c.fetch("SELECT DISTINCT ON (symbol) symbol,score,label,confidence"
+                                 " FROM sentiment WHERE symbol = ANY($1::varchar[])"
+                                 " ORDER BY symbol, ts DESC", misses)
+        if not rows:
+            return result
+
+        pipe = self.cache.pipeline(transaction=False)
+        for row in rows:
+            result[row["symbol"]] = (row["score"], row["label"], row["confidence"])
+            pipe.setex(f"sent:{row['symbol']}", self.CACHE_TTL,
+                       f"{row['score']}|{row['label']}|{row['confidence']}")
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logging.error(f"HotDB cache backfill failed: {e}")
+        return result
+
+    async def aggregate_range(self, symbols: list[str], start: datetime, end: datetime,
+                              step: int) -> pa.Table:
+        """[start, end) 구간 step 초 단위 부분 집계 (파티션 pruning + DB 측 GROUP BY)"""
+        async with self.pg.acquire() as c:
+            rows = await c.fetch(
+                "SELECT symbol,"
+                " to_timestamp(floor(extract(epoch FROM ts) / $4) * $4) AT TIME ZONE 'UTC' AS time,"
+                " sum(score) AS score_sum, sum(confidence) AS confidence_sum, count(*) AS count"
+                " FROM sentiment WHERE symbol = ANY($1::varchar[]) AND ts >= $2 AND ts < $3"
+                " GROUP BY 1, 2", symbols, start, end, float(step))
+        return pa.Table.from_pylist([dict(r) for r in rows], schema=PARTIAL_SCHEMA)
@@ -0,0 +1,155 @@
+# storage/object_cache.py
+"""
+Cold Object Storage 로컬 디스크 캐시
+- read-through: (object key, ETag) 단위로 한 번만 다운로드
+- 전체 바이트 상한 기준 LRU 제거 (사용 중인 파일은 pin 으로 보호)
+- Arrow 는 memory map 으로 열어 zero-copy 읽기
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import pyarrow as pa
+
+class ObjectCache:
+    """
+    S3 호환 오브젝트의 로컬 파일 캐시
+    같은 key 라도 ETag 가 바뀌면 다른 파일로 취급 (재아카이브·compaction 후 오래된 내용 방지)
+    """
+
+    CHUNK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket: str, root: str,
+                 max_bytes: int = 10 * 1024 * 1024 * 1024):
+        self._s3 = s3_client
+        self.bucket = bucket
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()  # path → bytes (LRU 순)
+        self._pinned: Dict[str, int] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self.total_bytes = 0
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes_downloaded': 0}
+
+        os.makedirs(self.root, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """재시작 시 기존 캐시 파일을 마지막 사용 시각(mtime) 순으로 LRU 에 복원"""
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)  # 중단된 다운로드
+                    continue
+                st = os.stat(path)
+                files.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _path(self, key: str, etag: str) -> str:
+        digest = hashlib.sha1(f"{key}\0{etag}".encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}{os.path.splitext(key)[1]}")
+
+    def _head_etag(self, key: str) -> str:
+        return self._s3.head_object(Bucket=self.bucket, Key=key)['ETag'].strip('"')
+
+    def _download(self, key: str, path: str) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        size = 0
+        try:
+            body = self._s3.get_object(Bucket=self.bucket, Key=key)['Body']
+            with open(tmp, 'wb') as f:
+                while True:
+                    chunk = body.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return size
+
+    def _evict(self, keep: Optional[str] = None):
+        """상한 초과분을 오래된 순으로 제거 (lock 보유 상태에서 호출)"""
+        for path in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if path == keep or self._pinned.get(path):
+                continue
+            size = self._entries.pop(path)
+            self.total_bytes -= size
+            self.metrics['evictions'] += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def fetch(self, key: str, etag: Optional[str] = None, pin: bool = False) -> str:
+        """
+        캐시된 로컬 경로 반환 (없으면 다운로드, 블로킹)
+        같은 파일을 동시에 요청하면 다운로드는 한 번만 수행
+        pin=True 면 release() 전까지 제거 대상에서 제외
+        """
+        etag = (etag or self._head_etag(key)).strip('"')
+        path = self._path(key, etag)
+        while True:
+            with self._lock:
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+                    os.utime(path)  # 재시작 후에도 LRU 순서 유지
+                    self.metrics['hits'] += 1
+                    if pin:
+                        self._pinned[path] = self._pinned.get(path, 0) + 1
+                    return path
+                event = self._inflight.get(path)
+                if event is None:
+                    event = self._inflight[path] = threading.Event()
+                    break
+            event.wait()
+            # 다른 스레드의 다운로드 완료(또는 실패) 후 다시 확인
+
+        try:
+            size = self._download(key, path)
+            with self._lock:
+                self._entries[path] = size
+                self.total_bytes += size
+                self.metrics['misses'] += 1
+                self.metrics['bytes_downloaded'] += size
+                if pin:
+                    self._pinned[path] = self._pinned.get(path, 0) + 1
+                self._evict(keep=path)
+            return path
+        finally:
+            with self._lock:
+                self._inflight.pop(path).set()
+
+    def release(self, path: str):
+        """fetch(pin=True) 로 잡은 파일 pin 해제"""
+        with self._lock:
+            count = self._pinned.get(path, 0) - 1
+            if count > 0:
+                self._pinned[path] = count
+            else:
+                self._pinned.pop(path, None)
+            self._evict()
+
+    def open(self, key: str, etag: Optional[str] = None) -> pa.MemoryMappedFile:
+        """memory map 으로 연 파일 (열린 mapping 은 캐시에서 제거되어도 유효)"""
+        return pa.memory_map(self.fetch(key, etag))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.metrics, 'files': len(self._entries),
+                    'total_bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                    'pinned': len(self._pinned)}
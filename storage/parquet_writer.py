@@ -0,0 +1,254 @@
+# storage/parquet_writer.py
+"""
+스트리밍 Parquet 아카이브 writer
+- record batch 를 ParquetWriter 에 순차 기록 (row group 단위)
+- 출력 바이트는 part_size 마다 S3 multipart part 로 업로드 → 메모리 사용량 일정
+- S3 호환 클라이언트(boto3, MinIO, 로컬 fake)면 어디든 사용 가능
+- 선언 스키마가 있으면 dict 행을 스키마에 맞춰 변환 (conform_rows)
+"""
+import io
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 multipart 최소 part 크기 (마지막 part 제외)
+
+EXTRA_COLUMN = 'extra'  # 선언되지 않은 키를 JSON 으로 보관하는 컬럼 (스키마에 있을 때만)
+
+def to_timestamp(value) -> datetime:
+    """datetime / ISO 8601 문자열(Twitter 등 'Z' 접미사 포함) → naive UTC datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    if not isinstance(value, datetime):
+        raise TypeError(f"not a timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _converter(dtype: pa.DataType) -> Optional[Callable[[Any], Any]]:
+    if pa.types.is_timestamp(dtype):
+        return to_timestamp
+    if pa.types.is_floating(dtype):
+        return float
+    if pa.types.is_integer(dtype):
+        return lambda v: v if isinstance(v, int) else int(float(v))
+    if pa.types.is_string(dtype) or pa.types.is_large_string(dtype):
+        return lambda v: v if isinstance(v, str) else str(v)
+    return None
+
+def conform_rows(rows: Iterable[Dict], schema: pa.Schema) -> Iterator[Dict]:
+    """
+    dict 행 → 선언 스키마 타입으로 변환 (숫자 문자열, ISO 시각 문자열 등)
+    스키마에 EXTRA_COLUMN 이 있으면 선언되지 않은 키와 변환할 수 없는 값을 JSON 으로 보존
+    """
+    converters = {f.name: _converter(f.type) for f in schema if f.name != EXTRA_COLUMN}
+    keep_extra = EXTRA_COLUMN in schema.names
+    for row in rows:
+        out, extra = {}, {}
+        for key, value in row.items():
+            convert = converters.get(key, False)
+            if convert is False:
+                if key != EXTRA_COLUMN:
+                    extra[key] = value
+                continue
+            if value is None or convert is None:
+                out[key] = value
+                continue
+            try:
+                out[key] = convert(value)
+            except (TypeError, ValueError):
+                out[key] = None
+                extra[key] = value
+        if keep_extra:
+            out[EXTRA_COLUMN] = json.dumps(extra, default=str, ensure_ascii=False) if extra else None
+        yield out
+
+
+class MultipartUploadSink(io.RawIOBase):
+    """
+    파일 객체 → S3 multipart 업로드 어댑터
+    part_size 가 찰 때마다 part 를 올리고, part 단위로 재시도
+    전체 크기가 part_size 미만이면 put_object 한 번으로 업로드
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str,
+                 part_size: int = 16 * 1024 * 1024, max_retries: int = 3,
+                 content_type: str = 'application/octet-stream',
+                 metadata: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self._s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_retries = max_retries
+        self.content_type = content_type
+        self.metadata = metadata or {}
+
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts = []
+        self._position = 0
+        self._finished = False
+        self.etag: Optional[str] = None
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            chunk = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(chunk)
+        return len(data)
+
+    def _retry(self, fn, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(**kwargs)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"S3 request failed for {self.key} (attempt {attempt + 1}): {e}")
+                time.sleep(min(2 ** attempt, 10))
+
+    def _upload_part(self, chunk: bytes):
+        if self._upload_id is None:
+            response = self._s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key,
+                ContentType=self.content_type, Metadata=self.metadata)
+            self._upload_id = response['UploadId']
+
+        part_number = len(self._parts) + 1
+        response = self._retry(self._s3.upload_part, Bucket=self.bucket, Key=self.key,
+                               UploadId=self._upload_id, PartNumber=part_number, Body=chunk)
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def close(self):
+        """남은 버퍼 업로드 후 multipart 완료 (또는 단일 put_object)"""
+        if self._finished or self.closed:
+            super().close()
+            return
+        try:
+            if self._upload_id is None:
+                response = self._retry(self._s3.put_object, Bucket=self.bucket, Key=self.key,
+                                       Body=bytes(self._buffer), ContentType=self.content_type,
+                                       Metadata=self.metadata)
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                response = self._retry(self._s3.complete_multipart_upload,
+                                       Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                       MultipartUpload={'Parts': self._parts})
+            self.etag = (response or {}).get('ETag', '').strip('"') or None
+            self._buffer.clear()
+            self._finished = True
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            super().close()
+
+    def abort(self):
+        """진행 중인 multipart 업로드 폐기 (고아 part 과금 방지)"""
+        if self._upload_id is not None and not self._finished:
+            try:
+                self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                UploadId=self._upload_id)
+            except Exception as e:
+                logging.error(f"Failed to abort multipart upload {self.key}: {e}")
+        self._buffer.clear()
+        self._finished = True
+        super().close()
+
+
+class StreamingParquetArchiver:
+    """
+    dict 행 / RecordBatch 스트림 → Parquet → S3 multipart
+    메모리는 row group 하나 + part 하나 크기로 제한됨
+    Parquet 스키마는 첫 기록 시 고정되므로 키·타입이 행마다 다를 수 있으면 schema 를 선언해서 사용
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str,
+                 schema: Optional[pa.Schema] = None,
+                 compression: str = 'snappy',
+                 row_group_size: int = 128 * 1024,
+                 part_size: int = 16 * 1024 * 1024,
+                 metadata: Optional[Dict[str, str]] = None):
+        self.key = key
+        self.schema = schema
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+
+        self._sink = MultipartUploadSink(s3_client, bucket, key, part_size=part_size,
+                                         metadata=metadata)
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @property
+    def bytes_written(self) -> int:
+        return self._sink.tell()
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._sink.etag
+
+    def write_batch(self, batch: pa.RecordBatch):
+        if self._writer is None:
+            self.schema = self.schema or batch.schema
+            self._writer = pq.ParquetWriter(pa.PythonFile(self._sink, mode='w'),
+                                            self.schema, compression=self.compression)
+        elif batch.schema != self.schema:
+            batch = pa.Table.from_batches([batch]).cast(self.schema).to_batches()[0]
+        self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.rows_written += batch.num_rows
+
+    def write_rows(self, rows: Iterable[Dict]):
+        """
+        dict 행을 row_group_size 단위로 묶어 기록
+        schema 가 있으면 conform_rows 로 변환, 없으면 첫 청크로 추론 (이후 새 키는 기록되지 않음)
+        """
+        if self.schema is not None:
+            rows = conform_rows(rows, self.schema)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.row_group_size:
+                self.write_batch(pa.RecordBatch.from_pylist(chunk, schema=self.schema))
+                chunk = []
+        if chunk:
+            self.write_batch(pa.RecordBatch.from_pylist(chunk, schema=self.schema))
+
+    def close(self) -> int:
+        """Parquet footer 기록 후 업로드 완료, 기록한 행 수 반환"""
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        else:
+            self._sink.abort()  # 기록할 행이 없으면 빈 파일을 만들지 않음
+        return self.rows_written
+
+    def abort(self):
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self._sink.abort()
@@ -0,0 +1,83 @@
+# storage/range_query.py
+"""
+티어 간 시간 범위 조회 공통 요소 (StorageManager.query_range 용)
+- 각 티어는 (symbol, time 구간 시작) 별 부분 집계(sum, count)를 PARTIAL_SCHEMA 로 반환
+- 구간이 티어 경계에 걸쳐도 합계를 다시 더하므로 평균이 정확함
+"""
+from datetime import datetime, timedelta
+from typing import List
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PARTIAL_SCHEMA = pa.schema([
+    ('symbol', pa.string()),
+    ('time', pa.timestamp('us')),
+    ('score_sum', pa.float64()),
+    ('confidence_sum', pa.float64()),
+    ('count', pa.int64()),
+])
+
+RESULT_SCHEMA = pa.schema([
+    ('symbol', pa.string()),
+    ('time', pa.timestamp('us')),
+    ('score', pa.float64()),
+    ('confidence', pa.float64()),
+    ('count', pa.int64()),
+])
+
+EPOCH = datetime(1970, 1, 1)
+
+def floor_time(ts: datetime, step: int) -> datetime:
+    """epoch 기준 step 초 단위 구간 시작 (Influx window 와 같은 정렬)"""
+    seconds = int((ts - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % step)
+
+def bucket_batch(batch: pa.RecordBatch, time_column: str, score_column: str,
+                 confidence_column: str, step: int) -> pa.Table:
+    """원본 RecordBatch → 구간별 부분 집계 (cold 스캔 등 raw 데이터용)"""
+    ts = batch.column(time_column)
+    micros = ts.cast(pa.timestamp('us', tz=ts.type.tz)).cast(pa.int64())   # UTC epoch (tz 무관)
+    step_us = step * 1_000_000
+    bucket = pc.multiply(pc.divide(micros, step_us), step_us)   # int 나눗셈 = floor (epoch 이후)
+    table = pa.table({
+        'symbol': batch.column('symbol').cast(pa.string()),
+        'time': bucket.cast(pa.timestamp('us')),
+        'score': batch.column(score_column).cast(pa.float64()),
+        'confidence': batch.column(confidence_column).cast(pa.float64()),
+    }).filter(pc.is_valid(pc.field('score')))
+    return _to_partial(table.group_by(['symbol', 'time']).aggregate([
+        ('score', 'sum'), ('confidence', 'sum'), ('score', 'count')]))
+
+def combine_partials(parts: List[pa.Table]) -> pa.Table:
+    """부분 집계 합산 (같은 symbol·time 구간 병합)"""
+    parts = [p for p in parts if p.num_rows]
+    if not parts:
+        return PARTIAL_SCHEMA.empty_table()
+    table = pa.concat_tables([p.cast(PARTIAL_SCHEMA) for p in parts])
+    return _to_partial(table.group_by(['symbol', 'time']).aggregate([
+        ('score_sum', 'sum'), ('confidence_sum', 'sum'), ('count', 'sum')]))
+
+def finalize(partial: pa.Table) -> pa.Table:
+    """부분 집계 → 평균 시계열 (symbol, time 정렬)"""
+    count = partial.column('count')
+    denom = pc.if_else(pc.greater(count, 0), count, None).cast(pa.float64())
+    return pa.table({
+        'symbol': partial.column('symbol'),
+        'time': partial.column('time'),
+        'score': pc.divide(partial.column('score_sum'), denom),
+        'confidence': pc.divide(partial.column('confidence_sum'), denom),
+        'count': count,
+    }, schema=RESULT_SCHEMA).sort_by([('symbol', 'ascending'), ('time', 'ascending')])
+
+def _to_partial(aggregated: pa.Table) -> pa.Table:
+    """group_by 결과 컬럼명(*_sum, *_count) → PARTIAL_SCHEMA"""
+    names = aggregated.column_names
+    def col(*candidates):
+        return aggregated.column(next(c for c in candidates if c in names))
+    return pa.table({
+        'symbol': col('symbol'),
+        'time': col('time'),
+        'score_sum': col('score_sum', 'score_sum_sum'),
+        'confidence_sum': col('confidence_sum', 'confidence_sum_sum'),
+        'count': col('score_count', 'count_sum').cast(pa.int64()),
+    }, schema=PARTIAL_SCHEMA)
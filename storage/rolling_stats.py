@@ -0,0 +1,192 @@
+# storage/rolling_stats.py
+"""
+In-memory Analytics Store: 종목별 롤링 통계 (NumPy ring buffer)
+- score / confidence / volume 고정 크기 윈도우
+- O(1) 증분 평균·표준편차·EWMA 갱신
+- 감정/언급량 스파이크 감지, 전 종목 벡터화 조회
+"""
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+class RollingStats:
+    """
+    collect() 결과를 받아 종목별 롤링 통계를 유지하는 인메모리 스토어
+    WarmDB 재조회 없이 대시보드·알림용 지표를 마이크로초 단위로 제공
+    """
+
+    FIELDS = ('score', 'confidence', 'volume')
+    _SCORE, _CONF, _VOLUME = range(3)
+
+    def __init__(self, window: int = 60, alpha: Optional[float] = None,
+                 z_threshold: float = 3.0, min_periods: int = 5,
+                 capacity: int = 256):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self.z_threshold = z_threshold
+        self.min_periods = min_periods
+
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        """슬롯 배열 할당 (기존 데이터 보존)"""
+        f = len(self.FIELDS)
+        old = getattr(self, '_buf', None)
+        n = len(self._symbols)
+
+        buf = np.zeros((capacity, f, self.window))
+        arrays = {name: np.zeros((capacity, f)) for name in
+                  ('_sum', '_sumsq', '_ewma', '_last', '_z')}
+        pos = np.zeros(capacity, dtype=np.int64)
+        count = np.zeros(capacity, dtype=np.int64)
+        updated = np.zeros(capacity)
+
+        if old is not None:
+            buf[:n] = old[:n]
+            for name, arr in arrays.items():
+                arr[:n] = getattr(self, name)[:n]
+            pos[:n] = self._pos[:n]
+            count[:n] = self._count[:n]
+            updated[:n] = self._updated[:n]
+
+        self._buf = buf
+        for name, arr in arrays.items():
+            setattr(self, name, arr)
+        self._pos, self._count, self._updated = pos, count, updated
+
+    def _slot(self, symbol: str) -> int:
+        i = self._index.get(symbol)
+        if i is None:
+            i = len(self._symbols)
+            if i == len(self._buf):
+                self._alloc(len(self._buf) * 2)
+            self._index[symbol] = i
+            self._symbols.append(symbol)
+        return i
+
+    # ---------------------------------------------------------- #
+    #                  UPDATE                                    #
+    # ---------------------------------------------------------- #
+    def update(self, symbol: str, score: float, confidence: float,
+               volume: float, ts: Optional[float] = None) -> Dict:
+        """새 관측치 반영 (O(1)) 후 해당 종목 스냅샷 반환"""
+        i = self._slot(symbol)
+        x = np.array((score, confidence, volume), dtype=np.float64)
+        n = self._count[i]
+
+        # 직전 윈도우 대비 z-score (스파이크 판단 기준)
+        if n >= 2:
+            mean = self._sum[i] / n
+            std = np.sqrt(np.maximum(self._sumsq[i] / n - mean * mean, 0.0))
+            self._z[i] = np.divide(x - mean, std, out=np.zeros_like(x), where=std > 1e-12)
+        else:
+            self._z[i] = 0.0
+
+        pos = self._pos[i]
+        if n == self.window:
+            old = self._buf[i, :, pos]
+            self._sum[i] -= old
+            self._sumsq[i] -= old * old
+        else:
+            self._count[i] = n + 1
+
+        self._buf[i, :, pos] = x
+        self._sum[i] += x
+        self._sumsq[i] += x * x
+        self._pos[i] = (pos + 1) % self.window
+
+        # 윈도우 한 바퀴마다 누적 오차 보정 (분할 상환 O(1))
+        if self._pos[i] == 0:
+            self._sum[i] = self._buf[i].sum(axis=1)
+            self._sumsq[i] = (self._buf[i] ** 2).sum(axis=1)
+
+        self._ewma[i] = x if n == 0 else self.alpha * x + (1 - self.alpha) * self._ewma[i]
+        self._last[i] = x
+        self._updated[i] = ts if ts is not None else time.time()
+
+        return self._rows(np.array([i]))[0]
+
+    # ---------------------------------------------------------- #
+    #                  QUERY                                     #
+    # ---------------------------------------------------------- #
+    def _moments(self, rows):
+        n = np.maximum(self._count[rows], 1)[:, None]
+        mean = self._sum[rows] / n
+        std = np.sqrt(np.maximum(self._sumsq[rows] / n - mean * mean, 0.0))
+        return mean, std
+
+    def _spikes(self, rows):
+        ready = self._count[rows] > self.min_periods
+        z = self._z[rows]
+        score_spike = ready & (np.abs(z[:, self._SCORE]) >= self.z_threshold)
+        volume_spike = ready & (z[:, self._VOLUME] >= self.z_threshold)
+        return score_spike, volume_spike
+
+    def _rows(self, rows: np.ndarray) -> List[Dict]:
+        mean, std = self._moments(rows)
+        score_spike, volume_spike = self._spikes(rows)
+        out = []
+        for j, i in enumerate(rows.tolist()):
+            snap = {'symbol': self._symbols[i], 'samples': int(self._count[i]),
+                    'updated_at': float(self._updated[i]),
+                    'score_spike': bool(score_spike[j]),
+                    'volume_spike': bool(volume_spike[j])}
+            for f, name in enumerate(self.FIELDS):
+                snap[f'{name}_last'] = float(self._last[i, f])
+                snap[f'{name}_mean'] = float(mean[j, f])
+                snap[f'{name}_std'] = float(std[j, f])
+                snap[f'{name}_ewma'] = float(self._ewma[i, f])
+                snap[f'{name}_z'] = float(self._z[i, f])
+            out.append(snap)
+        return out
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """단일 종목 스냅샷"""
+        i = self._index.get(symbol)
+        return self._rows(np.array([i]))[0] if i is not None else None
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """전 종목 지표를 컬럼 배열로 반환 (복사본)"""
+        rows = np.arange(len(self._symbols))
+        mean, std = self._moments(rows)
+        score_spike, volume_spike = self._spikes(rows)
+        cols = {'symbol': np.array(self._symbols, dtype=object),
+                'samples': self._count[rows].copy(),
+                'updated_at': self._updated[rows].copy(),
+                'score_spike': score_spike,
+                'volume_spike': volume_spike}
+        for f, name in enumerate(self.FIELDS):
+            cols[f'{name}_last'] = self._last[rows, f].copy()
+            cols[f'{name}_mean'] = mean[:, f]
+            cols[f'{name}_std'] = std[:, f]
+            cols[f'{name}_ewma'] = self._ewma[rows, f].copy()
+            cols[f'{name}_z'] = self._z[rows, f].copy()
+        return cols
+
+    def top_movers(self, n: int = 50, field: str = 'score',
+                   absolute: bool = True) -> List[Dict]:
+        """직전 윈도우 대비 z-score 기준 상위 n개 종목"""
+        f = self.FIELDS.index(field)
+        size = len(self._symbols)
+        if size == 0 or n <= 0:
+            return []
+
+        key = self._z[:size, f]
+        key = np.abs(key) if absolute else key
+        key = np.where(self._count[:size] > self.min_periods, key, -np.inf)
+
+        n = min(n, size)
+        top = np.argpartition(-key, n - 1)[:n]
+        top = top[np.argsort(-key[top])]
+        return self._rows(top[np.isfinite(key[top])])
+
+    def spikes(self) -> List[str]:
+        """현재 감정 또는 언급량 스파이크 상태인 종목"""
+        rows = np.arange(len(self._symbols))
+        score_spike, volume_spike = self._spikes(rows)
+        return [self._symbols[i] for i in np.flatnonzero(score_spike | volume_spike)]
+
+    def __len__(self) -> int:
+        return len(self._symbols)
@@ -0,0 +1,233 @@
+# storage/tier_mover.py
+"""
+Tier Mover: Hot → Warm → Cold 증분 데이터 이동
+- watermark(checkpoint) 기반 재개 가능 (PostgreSQL tier_watermarks 테이블)
+- Hot → Warm: (ts, symbol) keyset 페이지 단위 조회 후 InfluxDB/OpenSearch bulk 저장
+- Warm → Cold: Warm 보관 만료 archive_margin 전에 날짜 단위로 Parquet 아카이브
+- Cold compaction: 최근 아카이브 날짜의 small file 병합 (주기 별도)
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from config import settings
+
+class TierMover:
+    """
+    Hot/Warm/Cold 사이 데이터 이동 백그라운드 작업
+    모든 쓰기는 결정적 키(시각·종목) 기반이라 checkpoint 이전 재실행에도 중복이 생기지 않음
+    """
+
+    HOT_TO_WARM = 'hot_to_warm'
+    WARM_TO_COLD = 'warm_to_cold'
+    COLD_COMPACT = 'cold_compact'
+    ARCHIVE_PART = 'tier'  # 고정 part 이름 → 같은 날짜 재아카이브 시 덮어쓰기
+    COMPACT_TYPES = ('sentiment', 'tweets', 'market')
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, hot, warm, cold):
+        self.hot = hot
+        self.warm = warm
+        self.cold = cold
+
+        self.batch_size = getattr(settings, 'TIER_BATCH_SIZE', 5000)
+        self.max_rows_per_run = getattr(settings, 'TIER_MAX_ROWS_PER_RUN', 500_000)
+        self.interval = getattr(settings, 'TIER_MOVE_INTERVAL', 300)
+        # Hot 에 쓰인 지 이 시간이 지난 행부터 Warm 으로 이동 (Hot 은 보관 기간까지 유지)
+        self.hot_settle = timedelta(minutes=getattr(settings, 'TIER_HOT_SETTLE_MINUTES', 60))
+        self.warm_retention = timedelta(days=getattr(settings, 'WARM_RETENTION_DAYS', 30))
+        # Warm 보관 만료보다 이만큼 먼저 아카이브 (만료와 경합하지 않도록)
+        self.archive_margin = timedelta(days=getattr(settings, 'TIER_ARCHIVE_MARGIN_DAYS', 1))
+        if self.archive_margin >= self.warm_retention:
+            raise ValueError("TIER_ARCHIVE_MARGIN_DAYS must be shorter than WARM_RETENTION_DAYS")
+        # Cold 에 아카이브 완료된 구간의 끝 (이 시각 이전은 Cold 조회, StorageManager.plan_range)
+        self.archived_until: Optional[datetime] = None
+        self.hot_to_warm_enabled = True
+        self.compact_interval = getattr(settings, 'TIER_COMPACT_INTERVAL', 3600)
+        self.compact_days = getattr(settings, 'TIER_COMPACT_DAYS', 7)
+        self._last_compact = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, Dict] = {
+            stage: {'runs': 0, 'errors': 0, 'rows_moved': 0, 'last_run_rows': 0,
+                    'last_run_seconds': 0.0, 'rows_per_sec': 0.0, 'watermark': None}
+            for stage in (self.HOT_TO_WARM, self.WARM_TO_COLD, self.COLD_COMPACT)
+        }
+
+    async def start(self):
+        """checkpoint 테이블 준비 후 백그라운드 루프 시작"""
+        async with self.hot.pg.acquire() as c:
+            await c.execute("""
+            CREATE TABLE IF NOT EXISTS tier_watermarks(
+              stage varchar(32) primary key,
+              ts timestamp not null,
+              symbol varchar(10) not null default '',
+              updated_at timestamp not null default (now() at time zone 'utc')
+            );
+            """)
+        wm, _ = await self._load_checkpoint(self.HOT_TO_WARM)
+        self.hot.keep_after = wm if self.hot_to_warm_enabled else None
+        archived, _ = await self._load_checkpoint(self.WARM_TO_COLD)
+        self.archived_until = archived if archived != self.EPOCH else None
+        self._task = asyncio.create_task(self._run_forever())
+        logging.info("TierMover started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        """한 주기 이동 (각 단계 실패는 다음 주기에 checkpoint 부터 재시도)"""
+        if self.hot_to_warm_enabled:
+            await self._run_stage(self.HOT_TO_WARM, self.move_hot_to_warm)
+        await self._run_stage(self.WARM_TO_COLD, self.move_warm_to_cold)
+        if time.monotonic() - self._last_compact >= self.compact_interval:
+            self._last_compact = time.monotonic()
+            await self._run_stage(self.COLD_COMPACT, self.compact_cold)
+
+    async def _run_stage(self, stage: str, fn):
+        m = self.metrics[stage]
+        started = time.perf_counter()
+        try:
+            rows = await fn()
+        except Exception as e:
+            m['errors'] += 1
+            logging.error(f"Tier move {stage} failed: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        m['runs'] += 1
+        m['rows_moved'] += rows
+        m['last_run_rows'] = rows
+        m['last_run_seconds'] = elapsed
+        m['rows_per_sec'] = rows / elapsed if elapsed > 0 else 0.0
+        if rows:
+            logging.info(f"Tier move {stage}: {rows} rows in {elapsed:.1f}s "
+                         f"({m['rows_per_sec']:.0f} rows/s)")
+
+    # ---------------------------------------------------------- #
+    #                  CHECKPOINTS                               #
+    # ---------------------------------------------------------- #
+    @staticmethod
+    async def read_checkpoint(pg, stage: str) -> Optional[Tuple[datetime, str]]:
+        """단계 watermark 조회 (없으면 None, mover 를 실행하지 않는 프로세스에서도 사용)"""
+        async with pg.acquire() as c:
+            row = await c.fetchrow("SELECT ts, symbol FROM tier_watermarks WHERE stage=$1", stage)
+        return (row['ts'], row['symbol']) if row else None
+
+    async def _load_checkpoint(self, stage: str) -> Tuple[datetime, str]:
+        return await self.read_checkpoint(self.hot.pg, stage) or (self.EPOCH, '')
+
+    async def _save_checkpoint(self, stage: str, ts: datetime, symbol: str = ''):
+        async with self.hot.pg.acquire() as c:
+            await c.execute("""
+            INSERT INTO tier_watermarks(stage, ts, symbol) VALUES ($1, $2, $3)
+            ON CONFLICT (stage) DO UPDATE
+              SET ts = EXCLUDED.ts, symbol = EXCLUDED.symbol,
+                  updated_at = now() at time zone 'utc'
+            """, stage, ts, symbol)
+        self.metrics[stage]['watermark'] = ts
+
+    # ---------------------------------------------------------- #
+    #                  HOT → WARM                                #
+    # ---------------------------------------------------------- #
+    async def move_hot_to_warm(self) -> int:
+        """
+        (ts, symbol) keyset 순서로 watermark 이후 안정화된 행을 Warm 으로 복사
+        페이지(batch_size) 조회 후 연결을 반납하고 Warm 에 쓰므로 Warm 지연이 PG 트랜잭션을 붙잡지 않음
+        """
+        wm_ts, wm_symbol = await self._load_checkpoint(self.HOT_TO_WARM)
+        upper = datetime.utcnow() - self.hot_settle
+        moved = 0
+        while moved < self.max_rows_per_run:
+            async with self.hot.pg.acquire() as c:
+                records = await c.fetch(
+                    "SELECT symbol, score, label, confidence, ts FROM sentiment"
+                    " WHERE (ts, symbol) > ($1, $2) AND ts < $3"
+                    " ORDER BY ts, symbol LIMIT $4",
+                    wm_ts, wm_symbol, upper, self.batch_size)
+            if not records:
+                break
+            batch = [{'symbol': rec['symbol'], 'score': rec['score'], 'label': rec['label'],
+                      'confidence': rec['confidence'], 'timestamp': rec['ts']} for rec in records]
+            await self.warm.store_sentiment_batch(batch)
+            wm_ts, wm_symbol = batch[-1]['timestamp'], batch[-1]['symbol']
+            await self._save_checkpoint(self.HOT_TO_WARM, wm_ts, wm_symbol)
+            # 아직 Warm 에 없는 Hot 파티션은 보관 기간이 지나도 DROP 하지 않음
+            self.hot.keep_after = wm_ts
+            moved += len(batch)
+            if len(records) < self.batch_size:
+                break
+        return moved
+
+    # ---------------------------------------------------------- #
+    #                  WARM → COLD                               #
+    # ---------------------------------------------------------- #
+    @staticmethod
+    def _day(ts: datetime) -> datetime:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def move_warm_to_cold(self) -> int:
+        """
+        Warm 보관 만료 archive_margin 전에 끝나는 날짜를 하루씩 Parquet 로 아카이브
+        (만료 시점에는 이미 Cold 사본이 있으므로 Influx/OpenSearch 보관 정책과 경합하지 않음)
+        """
+        wm_ts, _ = await self._load_checkpoint(self.WARM_TO_COLD)
+        now = datetime.utcnow()
+        cutoff = self._day(now - self.warm_retention + self.archive_margin)
+        if wm_ts == self.EPOCH:
+            # 최초 실행: Warm 에 남아 있는 가장 오래된 날짜부터 (만료 경계일은 남은 부분만)
+            wm_ts = self._day(now - self.warm_retention)
+
+        moved = 0
+        day = wm_ts
+        while day < cutoff and moved < self.max_rows_per_run:
+            next_day = day + timedelta(days=1)
+            counter = [0]
+
+            def rows(start=day, stop=next_day):
+                # Influx 스트림을 그대로 Parquet writer 로 흘려보냄 (하루치를 메모리에 올리지 않음)
+                for row in self.warm.export_sentiment(start, stop):
+                    counter[0] += 1
+                    yield row
+
+            key = await self.cold.archive_sentiment_data(rows(), day, part_name=self.ARCHIVE_PART)
+            if counter[0] and not key:
+                raise RuntimeError(f"Cold archive failed for {day:%Y-%m-%d}")
+            await self._save_checkpoint(self.WARM_TO_COLD, next_day)
+            self.archived_until = next_day
+            moved += counter[0]
+            day = next_day
+        return moved
+
+    # ---------------------------------------------------------- #
+    #                  COLD COMPACTION                           #
+    # ---------------------------------------------------------- #
+    async def compact_cold(self) -> int:
+        """
+        최근 compact_days 일 sentiment / 원본(tweets, market) 파티션 compaction, 병합한 파일 수 반환
+        (원본은 StorageManager archive 티어가 batch 마다 파일을 추가함)
+        """
+        end = datetime.utcnow()
+        merged, errors = 0, 0
+        for data_type in self.COMPACT_TYPES:
+            result = await self.cold.compact(data_type, end - timedelta(days=self.compact_days), end)
+            merged += result['files_merged']
+            errors += result['errors']
+        if errors:
+            raise RuntimeError(f"{errors} compaction groups failed")
+        return merged
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """단계별 처리량 지표"""
+        return {stage: dict(m) for stage, m in self.metrics.items()}
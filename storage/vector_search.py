@@ -1,21 +1,183 @@
 """
-Milvus 혹은 Pinecone – 유사 텍스트 검색 (RAG)
+Milvus 혹은 로컬 ANN 인덱스 – 유사 텍스트 검색 (RAG)
+- backend: 'local' (in-process IVF-Flat, memmap 영속화) | 'milvus'
+- batch insert / similar_many, symbol·시간 필터, 7일 TTL
 """
-import pymilvus, numpy as np
+import asyncio, logging, time
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+import numpy as np
 from config import settings
+from .ann_index import IVFFlatIndex
+
+def _epoch(value) -> int:
+    if value is None:
+        return int(time.time())
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class LocalVectorBackend:
+    """IVFFlatIndex 기반 in-process 백엔드 (서버 불필요)"""
+
+    def __init__(self, dim: int, path: str):
+        self.index = IVFFlatIndex(path, dim=dim,
+                                  nlist=getattr(settings, 'VECTOR_NLIST', 256),
+                                  nprobe=getattr(settings, 'VECTOR_NPROBE', 16))
+
+    def insert_many(self, vectors: np.ndarray, symbols: Sequence[str], ts: np.ndarray,
+                    metas: Sequence[dict]) -> int:
+        return len(self.index.add(vectors, symbols, ts, metas))
+
+    def similar_many(self, vectors: np.ndarray, k: int, symbols, since, until) -> list[list[dict]]:
+        # expire() 의 compaction 이 사이에 id 를 바꾸지 않도록 검색과 메타데이터 조회를 한 lock 안에서
+        hits = self.index.search_with_metadata(vectors, k, symbols=symbols, since=since, until=until)
+        return [[{**meta, "id": i, "score": score} for i, score, meta in row] for row in hits]
+
+    def delete_before(self, cutoff: int) -> int:
+        return self.index.delete_before(cutoff)
+
+    def flush(self):
+        self.index.flush()
+
+    def close(self):
+        self.index.close()
+
+
+class MilvusVectorBackend:
+    """pymilvus Collection 백엔드 (collection·HNSW 인덱스 자동 생성)"""
+
+    def __init__(self, dim: int, name: str):
+        import pymilvus   # 선택 의존성: milvus 백엔드에서만 필요
+        self._m = pymilvus
+        pymilvus.connections.connect(host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+        if not pymilvus.utility.has_collection(name):
+            fields = [
+                pymilvus.FieldSchema("id", pymilvus.DataType.INT64, is_primary=True, auto_id=True),
+                pymilvus.FieldSchema("vector", pymilvus.DataType.FLOAT_VECTOR, dim=dim),
+                pymilvus.FieldSchema("symbol", pymilvus.DataType.VARCHAR, max_length=16),
+                pymilvus.FieldSchema("ts", pymilvus.DataType.INT64),
+                pymilvus.FieldSchema("meta", pymilvus.DataType.VARCHAR, max_length=4096),
+            ]
+            collection = pymilvus.Collection(name, pymilvus.CollectionSchema(fields, "tweet embeddings"))
+            collection.create_index("vector", {"index_type": "HNSW", "metric_type": "IP",
+                                               "params": {"M": 16, "efConstruction": 200}})
+            collection.create_index("symbol", {"index_type": "INVERTED"})
+        self._client = pymilvus.Collection(name)
+        self._client.load()
+
+    def insert_many(self, vectors, symbols, ts, metas) -> int:
+        import json
+        vectors = IVFFlatIndex._normalize(vectors)   # IP 로 cosine 검색
+        self._client.insert([vectors, list(symbols), np.asarray(ts, dtype=np.int64),
+                             [json.dumps(m, default=str)[:4096] for m in metas]])
+        return len(vectors)
+
+    def similar_many(self, vectors, k, symbols, since, until) -> list[list[dict]]:
+        import json
+        conditions = []
+        if symbols:
+            conditions.append(f"symbol in {list(symbols)!r}".replace("'", '"'))
+        if since is not None:
+            conditions.append(f"ts >= {int(since)}")
+        if until is not None:
+            conditions.append(f"ts <= {int(until)}")
+        res = self._client.search(IVFFlatIndex._normalize(vectors), "vector",
+                                  {"metric_type": "IP", "params": {"ef": max(64, 2 * k)}},
+                                  limit=k, expr=" and ".join(conditions) or None,
+                                  output_fields=["meta"])
+        return [[{**json.loads(hit.entity.get("meta") or "{}"), "id": hit.id, "score": hit.distance}
+                 for hit in hits] for hits in res]
+
+    def delete_before(self, cutoff: int) -> int:
+        result = self._client.delete(f"ts < {int(cutoff)}")
+        return getattr(result, "delete_count", 0)
+
+    def flush(self):
+        self._client.flush()
+
+    def close(self):
+        self._m.connections.disconnect("default")
+
 
 class VectorSearch:
     DIM = 768
     INDEX = "tweet_embeddings"
 
-    def __init__(self):
-        self._client = pymilvus.Collection(self.INDEX)  # pragma: no cover
-        # TODO: collection & index 생성 로직
+    def __init__(self, backend: Optional[str] = None):
+        self.backend_name = backend or getattr(settings, 'VECTOR_BACKEND', 'local')
+        self.index_dir = getattr(settings, 'VECTOR_INDEX_DIR', f".cache/{self.INDEX}")
+        self.ttl = timedelta(days=getattr(settings, 'VECTOR_TTL_DAYS', 7))
+        self.expire_interval = getattr(settings, 'VECTOR_EXPIRE_INTERVAL', 3600)
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def startup(self):
+        """백엔드 연결/인덱스 로드 후 TTL 정리 루프 시작"""
+        loop = asyncio.get_running_loop()
+        if self.backend_name == 'milvus':
+            self._client = await loop.run_in_executor(None, MilvusVectorBackend, self.DIM, self.INDEX)
+        else:
+            self._client = await loop.run_in_executor(None, LocalVectorBackend, self.DIM, self.index_dir)
+        self._task = asyncio.create_task(self._expire_loop())
+        logging.info(f"VectorSearch started ({self.backend_name})")
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client:
+            await asyncio.get_running_loop().run_in_executor(None, self._client.close)
+
+    async def _expire_loop(self):
+        while True:
+            try:
+                removed = await asyncio.get_running_loop().run_in_executor(None, self.expire)
+                if removed:
+                    logging.info(f"Expired {removed} vectors older than {self.ttl.days} days")
+            except Exception as e:
+                logging.error(f"Vector TTL cleanup failed: {e}")
+            await asyncio.sleep(self.expire_interval)
+
+    # ---------------------------------------------------------- #
+    #                  PUBLIC  METHODS                           #
+    # ---------------------------------------------------------- #
+    def insert_many(self, vectors: np.ndarray, metas: Sequence[dict]) -> int:
+        """
+        벡터 batch 저장 (블로킹, (n, DIM) float32 배열 그대로 전달)
+        meta 의 symbol / ts(datetime 또는 epoch 초) 가 필터 컬럼으로 쓰임
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.DIM)
+        if len(vectors) != len(metas):
+            raise ValueError("vectors and metas length mismatch")
+        symbols = [m.get("symbol", "") for m in metas]
+        ts = np.fromiter((_epoch(m.get("ts")) for m in metas), dtype=np.int64, count=len(metas))
+        return self._client.insert_many(vectors, symbols, ts, metas)
 
     def insert(self, vec: np.ndarray, meta: dict):
-        self._client.insert([vec.tolist(), meta])
+        self.insert_many(np.asarray(vec, dtype=np.float32).reshape(1, self.DIM), [meta])
+
+    def similar_many(self, vectors: np.ndarray, k: int = 10,
+                     symbols: Optional[Sequence[str]] = None,
+                     since=None, until=None) -> list[list[dict]]:
+        """질의 batch 별 상위 k 결과 (meta + id + score), TTL 이 지난 벡터는 제외"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.DIM)
+        floor = _epoch(datetime.now() - self.ttl)
+        since = max(_epoch(since), floor) if since is not None else floor
+        return self._client.similar_many(vectors, k, symbols, since,
+                                         _epoch(until) if until is not None else None)
+
+    def similar(self, vec: np.ndarray, k=10, symbols: Optional[Sequence[str]] = None,
+                since=None, until=None) -> list[dict]:
+        return self.similar_many(vec, k, symbols, since, until)[0]
+
+    def expire(self) -> int:
+        """TTL(기본 7일) 이 지난 벡터 삭제 (블로킹)"""
+        return self._client.delete_before(_epoch(datetime.now() - self.ttl))
 
-    def similar(self, vec: np.ndarray, k=10) -> list[dict]:
-        res = self._client.search([vec.tolist()], "vector", k=k)
-        # TODO: 결과 파싱
-        return res
+    def flush(self):
+        self._client.flush()
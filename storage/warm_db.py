@@ -4,19 +4,40 @@ Warm Storage: InfluxDB + OpenSearch (30일 보관)
 - 시계열 데이터 분석용
 - 트렌드 분석, 집계 쿼리 최적화
 """
+import asyncio
+import hashlib
+import json
 import logging
+import re
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+from typing import Deque, List, Dict, Optional, Iterator, Set, Tuple
+import numpy as np
+import pyarrow as pa
+from influxdb_client import InfluxDBClient, Point, WriteOptions
+from influxdb_client.client.write_api import SYNCHRONOUS, WriteType
 from opensearchpy import OpenSearch, helpers
 from config import settings
+from .range_query import PARTIAL_SCHEMA, floor_time
 
 class WarmDB:
     """
     InfluxDB: 시계열 감정 데이터, 주가 데이터
     OpenSearch: 전문 검색, 로그 분석
+    실시간 쓰기는 배치 버퍼에 적재 후 백그라운드에서 flush (이벤트 루프 비차단)
+    트렌드 조회는 1m/1h/1d 롤업 measurement 로 라우팅 + 짧은 TTL 결과 캐시
     """
+
+    # 롤업 해상도 → 초 (sentiment_{res} measurement 에 score/confidence 평균, count 저장)
+    ROLLUPS = {'1m': 60, '1h': 3600, '1d': 86400}
+    # 감정 로그: 기간별 인덱스 (문서는 자기 timestamp 의 기간 인덱스에 쓰고, 조회는 _log_read_indices 로 기간 인덱스만 지정)
+    LOG_INDEX_PREFIX = 'sentiment-logs'
+    LOG_INDEX_FORMATS = {'day': '%Y.%m.%d', 'week': '%G.w%V'}
+    # Flux 쿼리에 들어가는 종목 코드 허용 패턴 (인젝션 방지)
+    SYMBOL_PATTERN = re.compile(r'^[A-Za-z0-9.\-_^=:]{1,20}$')
+    # Flux 쿼리 하나의 종목 등치 조건 상한 (넘는 종목 목록은 청크로 나눠 병렬 쿼리)
+    FLUX_MAX_SYMBOLS = 100
     
     def __init__(self):
         # InfluxDB 설정
@@ -28,9 +49,42 @@ class WarmDB:
         # OpenSearch 설정
         self.opensearch_host = getattr(settings, 'OPENSEARCH_HOST', 'localhost')
         self.opensearch_port = getattr(settings, 'OPENSEARCH_PORT', 9200)
+        self.log_index_period = getattr(settings, 'WARM_LOG_INDEX_PERIOD', 'day')
+        if self.log_index_period not in self.LOG_INDEX_FORMATS:
+            raise ValueError(f"Unknown log index period: {self.log_index_period}")
+        self._current_log_index: Optional[str] = None
+
+        # 배치 쓰기 설정
+        self.batch_size = getattr(settings, 'WARM_BATCH_SIZE', 1000)
+        self.flush_interval = getattr(settings, 'WARM_FLUSH_INTERVAL', 1.0)
+        self.max_retries = getattr(settings, 'WARM_MAX_RETRIES', 3)
+        self.retry_interval = getattr(settings, 'WARM_RETRY_INTERVAL', 2.0)
+        self.max_buffer = getattr(settings, 'WARM_MAX_BUFFER', self.batch_size * 20)
+
+        # 롤업 / 조회 캐시 설정 ('task': Influx task 로 유지, 'agent': 에이전트 루프로 유지)
+        self.rollup_mode = getattr(settings, 'WARM_ROLLUP_MODE', 'task')
+        self.cache_ttl = getattr(settings, 'WARM_QUERY_CACHE_TTL', 5.0)
+        self.cache_max_entries = getattr(settings, 'WARM_QUERY_CACHE_SIZE', 1024)
+        self._query_cache: Dict[tuple, tuple] = {}
+
+        # 대규모 종목 비교 쿼리 분할 설정
+        self.compare_chunk_size = min(getattr(settings, 'WARM_COMPARE_CHUNK_SIZE', self.FLUX_MAX_SYMBOLS),
+                                      self.FLUX_MAX_SYMBOLS)
+        self.compare_parallelism = getattr(settings, 'WARM_COMPARE_PARALLELISM', 4)
         
         self._influx_client = None
         self._opensearch_client = None
+        # 상한 초과 시 가장 오래된 문서부터 자동 제거 (O(1))
+        self._log_buffer: Deque[Dict] = deque(maxlen=self.max_buffer)
+        self._flush_lock = asyncio.Lock()
+        self._log_flushes: Set[asyncio.Task] = set()   # 백그라운드 bulk (GC 방지용 참조)
+        self._flusher: Optional[asyncio.Task] = None
+        self._rollup_task: Optional[asyncio.Task] = None
+        self.metrics = {
+            'points_written': 0, 'point_errors': 0,
+            'logs_buffered': 0, 'logs_flushed': 0, 'log_flushes': 0,
+            'log_flush_errors': 0, 'logs_dropped': 0, 'last_flush_ms': 0.0
+        }
 
     async def startup(self):
         """초기화 및 연결 설정"""
@@ -41,7 +95,21 @@ class WarmDB:
                 token=self.influx_token,
                 org=self.influx_org
             )
-            self._write_api = self._influx_client.write_api(write_options=SYNCHRONOUS)
+            # 실시간 point: Influx 배치 writer (자체 백그라운드 스레드에서 flush/재시도)
+            self._write_api = self._influx_client.write_api(
+                write_options=WriteOptions(
+                    write_type=WriteType.batching,
+                    batch_size=self.batch_size,
+                    flush_interval=int(self.flush_interval * 1000),
+                    retry_interval=int(self.retry_interval * 1000),
+                    max_retries=self.max_retries
+                ),
+                success_callback=self._on_points_written,
+                error_callback=self._on_points_error,
+                retry_callback=self._on_points_retry
+            )
+            # 티어 이동 등 성공 여부가 필요한 bulk 쓰기용 (executor 에서 실행)
+            self._sync_write_api = self._influx_client.write_api(write_options=SYNCHRONOUS)
             self._query_api = self._influx_client.query_api()
             
             # OpenSearch 클라이언트 초기화
@@ -55,6 +123,13 @@ class WarmDB:
             
             # 인덱스 생성
             await self._setup_opensearch_indices()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+            # 다운샘플링 롤업
+            if self.rollup_mode == 'task':
+                self._setup_rollup_tasks()
+            else:
+                self._rollup_task = asyncio.create_task(self._rollup_loop())
             logging.info("WarmDB initialized successfully")
             
         except Exception as e:
@@ -62,22 +137,30 @@ class WarmDB:
             raise
 
     async def _setup_opensearch_indices(self):
-        """OpenSearch 인덱스 설정"""
-        indices = {
-            'sentiment-logs': {
-                'mappings': {
-                    'properties': {
-                        'symbol': {'type': 'keyword'},
-                        'timestamp': {'type': 'date'},
-                        'sentiment_score': {'type': 'float'},
-                        'sentiment_label': {'type': 'keyword'},
-                        'source_text': {'type': 'text', 'analyzer': 'standard'},
-                        'source_type': {'type': 'keyword'},  # twitter, reddit, news
-                        'confidence': {'type': 'float'},
-                        'key_factors': {'type': 'text'}
+        """OpenSearch 인덱스 설정 (감정 로그는 index template + 기간별 인덱스)"""
+        self._opensearch_client.indices.put_index_template(
+            name=f'{self.LOG_INDEX_PREFIX}-template',
+            body={
+                'index_patterns': [f'{self.LOG_INDEX_PREFIX}-*'],
+                'template': {
+                    'mappings': {
+                        'properties': {
+                            'symbol': {'type': 'keyword'},
+                            'timestamp': {'type': 'date'},
+                            'sentiment_score': {'type': 'float'},
+                            'sentiment_label': {'type': 'keyword'},
+                            'source_text': {'type': 'text', 'analyzer': 'standard'},
+                            'source_type': {'type': 'keyword'},  # twitter, reddit, news
+                            'confidence': {'type': 'float'},
+                            'key_factors': {'type': 'text'}
+                        }
                     }
                 }
-            },
+            }
+        )
+        self._rollover_log_index()
+
+        indices = {
             'market-events': {
                 'mappings': {
                     'properties': {
@@ -96,12 +179,261 @@ class WarmDB:
                 self._opensearch_client.indices.create(index_name, body=index_body)
                 logging.info(f"Created OpenSearch index: {index_name}")
 
+    # 감정 로그 인덱스 관련 메서드
+    def _log_index_name(self, ts: datetime) -> str:
+        return f"{self.LOG_INDEX_PREFIX}-{ts.strftime(self.LOG_INDEX_FORMATS[self.log_index_period])}"
+
+    def _log_index_start(self, name: str) -> Optional[datetime]:
+        """인덱스 이름 → 기간 시작 시각 (형식이 다르면 None)"""
+        suffix = name[len(self.LOG_INDEX_PREFIX) + 1:]
+        try:
+            if self.log_index_period == 'week':
+                return datetime.strptime(suffix + '.1', '%G.w%V.%u')
+            return datetime.strptime(suffix, self.LOG_INDEX_FORMATS['day'])
+        except ValueError:
+            return None
+
+    def _log_period(self) -> timedelta:
+        return timedelta(weeks=1) if self.log_index_period == 'week' else timedelta(days=1)
+
+    def _rollover_log_index(self):
+        """현재 기간 인덱스 미리 생성 (기간이 바뀐 경우만, 블로킹, 보관 정리에서 제외할 인덱스 기록)"""
+        name = self._log_index_name(datetime.utcnow())
+        if name == self._current_log_index:
+            return
+
+        indices = self._opensearch_client.indices
+        if not indices.exists(name):
+            # 매핑은 template 에서 적용 (동시 생성 경합은 400 무시)
+            indices.create(name, ignore=400)
+            logging.info(f"Created OpenSearch index: {name}")
+        self._current_log_index = name
+
+    def _log_read_indices(self, days: int) -> str:
+        """최근 days 일을 덮는 인덱스 목록 (검색 대상 최소화)"""
+        now = datetime.utcnow()
+        names = [self._log_index_name(now - timedelta(days=d)) for d in range(days, -1, -1)]
+        return ','.join(dict.fromkeys(names))
+
+    # 롤업 관련 메서드
+    def _rollup_flux(self, resolution: str, start: str, stop: str = 'now()') -> str:
+        """raw sentiment [start, stop) → sentiment_{resolution} 다운샘플링 Flux (종목 단위, label 무시)"""
+        measurement = f"sentiment_{resolution}"
+        return f'''
+        data = from(bucket: "{self.influx_bucket}")
+          |> range(start: {start}, stop: {stop})
+          |> filter(fn: (r) => r["_measurement"] == "sentiment")
+          |> filter(fn: (r) => r["_field"] == "score" or r["_field"] == "confidence")
+          |> group(columns: ["symbol", "_field"])
+
+        data
+          |> aggregateWindow(every: {resolution}, fn: mean, createEmpty: false)
+          |> set(key: "_measurement", value: "{measurement}")
+          |> to(bucket: "{self.influx_bucket}", org: "{self.influx_org}")
+
+        data
+          |> filter(fn: (r) => r["_field"] == "score")
+          |> aggregateWindow(every: {resolution}, fn: count, createEmpty: false)
+          |> toFloat()
+          |> set(key: "_field", value: "count")
+          |> set(key: "_measurement", value: "{measurement}")
+          |> to(bucket: "{self.influx_bucket}", org: "{self.influx_org}")
+        '''
+
+    def _setup_rollup_tasks(self):
+        """해상도별 Influx task 등록 (이미 있으면 유지)"""
+        try:
+            tasks_api = self._influx_client.tasks_api()
+            org = self._influx_client.organizations_api().find_organizations(org=self.influx_org)[0]
+            for resolution in self.ROLLUPS:
+                name = f"sentiment-rollup-{resolution}"
+                if tasks_api.find_tasks(name=name):
+                    continue
+                # 지연 도착 데이터를 위해 직전 2개 구간 재집계 (같은 시각 point 는 덮어씀)
+                tasks_api.create_task_every(name, self._rollup_flux(resolution, f"-{2 * self.ROLLUPS[resolution]}s"),
+                                            resolution, org)
+                logging.info(f"Created InfluxDB rollup task: {name}")
+        except Exception as e:
+            logging.warning(f"Rollup task setup failed, falling back to agent rollups: {e}")
+            self._rollup_task = asyncio.create_task(self._rollup_loop())
+
+    async def run_rollup(self, resolution: str):
+        """에이전트 측 롤업 1회 실행 (직전 2개 구간, 롤업 경계 정렬)"""
+        now = datetime.utcnow()
+        start = now - timedelta(seconds=2 * self.ROLLUPS[resolution])
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._rollup_range_sync, resolution, start, now)
+
+    def _rollup_range_sync(self, resolution: str, start: datetime, stop: datetime):
+        """[start, stop) 를 덮는 롤업 구간 전체를 재집계 (경계는 롤업 단위로 확장, 블로킹)"""
+        sec = self.ROLLUPS[resolution]
+        epoch = datetime(1970, 1, 1)
+        first = int((start - epoch).total_seconds()) // sec * sec
+        last = -(-int((stop - epoch).total_seconds()) // sec) * sec
+        fmt = '%Y-%m-%dT%H:%M:%SZ'
+        self._query_api.query(self._rollup_flux(
+            resolution,
+            (epoch + timedelta(seconds=first)).strftime(fmt),
+            (epoch + timedelta(seconds=max(last, first + sec))).strftime(fmt)))
+
+    def _rollup_late_rows(self, rows: List[Dict]):
+        """
+        다음 롤업 실행(직전 2개 구간)이 다시 보지 못할 만큼 오래된 행이 쓰인 경우 해당 구간만 재집계
+        (티어 이동은 hot_settle 이 지난 행을 쓰므로 1m/1h 롤업 task 에는 반영되지 않음)
+        """
+        now = datetime.utcnow()
+        stamps = [r['timestamp'].replace(tzinfo=None) for r in rows]
+        for resolution, sec in self.ROLLUPS.items():
+            late = [ts for ts in stamps if ts < now - timedelta(seconds=sec)]
+            if late:
+                self._rollup_range_sync(resolution, min(late), max(late) + timedelta(seconds=1))
+
+    async def backfill_rollups(self, start: datetime, end: datetime,
+                               resolutions: Optional[List[str]] = None) -> int:
+        """
+        [start, end) raw 데이터로 롤업 measurement 재생성 (배포 이전 이력 / 누락 구간 복구)
+        WARM_ROLLUP_BACKFILL_CHUNK_HOURS 단위로 나눠 순차 실행, 실행한 구간 수 반환
+        """
+        chunk = timedelta(hours=getattr(settings, 'WARM_ROLLUP_BACKFILL_CHUNK_HOURS', 24))
+        loop = asyncio.get_running_loop()
+        runs = 0
+        for resolution in resolutions or list(self.ROLLUPS):
+            if resolution not in self.ROLLUPS:
+                raise ValueError(f"Unknown rollup resolution: {resolution}")
+            t = start
+            while t < end:
+                stop = min(t + chunk, end)
+                await loop.run_in_executor(None, self._rollup_range_sync, resolution, t, stop)
+                runs += 1
+                t = stop
+            logging.info(f"Backfilled sentiment_{resolution} rollup for {start} ~ {end}")
+        return runs
+
+    async def _rollup_loop(self):
+        last_run = {res: 0.0 for res in self.ROLLUPS}
+        while True:
+            await asyncio.sleep(self.ROLLUPS['1m'])
+            now = time.time()
+            for resolution, seconds in self.ROLLUPS.items():
+                if now - last_run[resolution] < seconds:
+                    continue
+                try:
+                    await self.run_rollup(resolution)
+                    last_run[resolution] = now
+                except Exception as e:
+                    logging.error(f"Rollup {resolution} failed: {e}")
+
+    @classmethod
+    def _route_rollup(cls, resolution: str) -> Optional[str]:
+        """요청 해상도를 나눠떨어지게 만족하는 가장 굵은 롤업 (없으면 raw)"""
+        step = cls._duration_seconds(resolution)
+        candidates = [res for res, sec in cls.ROLLUPS.items() if sec <= step and step % sec == 0]
+        return max(candidates, key=cls.ROLLUPS.get) if candidates else None
+
+    @staticmethod
+    def _duration_seconds(duration: str) -> int:
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+        if len(duration) < 2 or duration[-1] not in units or not duration[:-1].isdigit():
+            raise ValueError(f"Invalid duration: {duration}")
+        return int(duration[:-1]) * units[duration[-1]]
+
+    # 조회 실행 / 캐시
+    async def _query(self, query: str):
+        """블로킹 Flux 쿼리를 executor 에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._query_api.query, query)
+
+    def _cache_get(self, key: tuple):
+        entry = self._query_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        self._query_cache.pop(key, None)
+        return None
+
+    def _cache_put(self, key: tuple, value):
+        if len(self._query_cache) >= self.cache_max_entries:
+            # 만료 항목 정리 후에도 가득 차면 가장 오래된 항목부터 제거
+            now = time.monotonic()
+            for k in [k for k, (exp, _) in self._query_cache.items() if exp <= now]:
+                del self._query_cache[k]
+            while len(self._query_cache) >= self.cache_max_entries:
+                del self._query_cache[next(iter(self._query_cache))]
+        self._query_cache[key] = (time.monotonic() + self.cache_ttl, value)
+
+    # 배치 쓰기 관련 메서드
+    def _on_points_written(self, conf, data: str):
+        self.metrics['points_written'] += len(data.splitlines()) if data else 0
+
+    def _on_points_error(self, conf, data: str, error: Exception):
+        self.metrics['point_errors'] += 1
+        logging.error(f"InfluxDB batch write failed: {error}")
+
+    def _on_points_retry(self, conf, data: str, error: Exception):
+        logging.warning(f"InfluxDB batch write retry: {error}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_logs()
+            except Exception as e:
+                logging.error(f"WarmDB flush loop error: {e}")
+
+    def _bulk(self, actions: List[Dict]):
+        """OpenSearch bulk (429 등 일시 오류는 지수 백오프로 재시도)"""
+        self._rollover_log_index()
+        return helpers.bulk(self._opensearch_client, actions,
+                            chunk_size=self.batch_size,
+                            max_retries=self.max_retries,
+                            initial_backoff=self.retry_interval)
+
+    async def flush_logs(self) -> int:
+        """버퍼링된 로그 문서를 bulk 한 번으로 색인 (executor 에서 실행)"""
+        async with self._flush_lock:
+            if not self._log_buffer:
+                return 0
+            actions = list(self._log_buffer)
+            self._log_buffer.clear()
+            started = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._bulk, actions)
+            except Exception as e:
+                # 실패 배치는 버퍼 앞에 되돌려 다음 주기 재시도 (상한 초과분은 폐기)
+                # 문서 _id 가 고정이라 부분 성공 후 재시도해도 중복 색인되지 않음
+                overflow = len(actions) + len(self._log_buffer) - self.max_buffer
+                if overflow > 0:
+                    self.metrics['logs_dropped'] += overflow
+                requeued = deque(actions, maxlen=self.max_buffer)
+                requeued.extend(self._log_buffer)
+                self._log_buffer = requeued
+                self.metrics['log_flush_errors'] += 1
+                logging.error(f"OpenSearch bulk failed, {len(actions)} docs requeued: {e}")
+                return 0
+            finally:
+                self.metrics['logs_buffered'] = len(self._log_buffer)
+
+            self.metrics['logs_flushed'] += len(actions)
+            self.metrics['log_flushes'] += 1
+            self.metrics['last_flush_ms'] = (time.perf_counter() - started) * 1000
+            return len(actions)
+
+    def _on_log_flush_done(self, task: asyncio.Task):
+        self._log_flushes.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.error(f"Background log flush failed: {task.exception()}")
+
+    async def flush(self):
+        """
+        OpenSearch 버퍼 강제 flush
+        Influx 배치 writer 는 flush_interval 마다, 그리고 shutdown 의 close() 에서 비워짐
+        """
+        await self.flush_logs()
+
     # InfluxDB 관련 메서드
     async def store_sentiment_timeseries(self, symbol: str, score: float, 
                                        label: str, confidence: float, 
                                        volume: Optional[int] = None,
                                        price: Optional[float] = None):
-        """감정 시계열 데이터 저장"""
+        """감정 시계열 데이터 저장 (배치 writer 에 적재만 하고 즉시 반환)"""
         try:
             point = Point("sentiment") \
                 .tag("symbol", symbol) \
@@ -121,64 +453,322 @@ class WarmDB:
         except Exception as e:
             logging.error(f"Failed to store sentiment timeseries: {e}")
 
-    async def get_sentiment_trend(self, symbol: str, hours: int = 24) -> List[Dict]:
-        """감정 트렌드 조회"""
+    async def store_sentiment_batch(self, rows: List[Dict]):
+        """
+        감정 데이터 일괄 저장 (티어 이동용)
+        InfluxDB point 일괄 write + OpenSearch bulk, 행 timestamp 기반 결정적 ID 로 재실행해도 중복 없음
+        실패 시 예외를 그대로 전파 (호출자가 checkpoint 를 진행하지 않도록)
+        """
+        if not rows:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self._write_batch_sync, rows)
+        logging.debug(f"Stored {len(rows)} sentiment rows in warm storage")
+
+    def _write_batch_sync(self, rows: List[Dict]):
+        points = [
+            Point("sentiment")
+            .tag("symbol", r['symbol'])
+            .tag("label", r['label'])
+            .field("score", float(r['score']))
+            .field("confidence", float(r['confidence']))
+            .time(r['timestamp'])
+            for r in rows
+        ]
+        self._sync_write_api.write(bucket=self.influx_bucket, record=points)
+        self._rollup_late_rows(rows)
+
+        actions = [{
+            '_index': self._log_index_name(r['timestamp']),
+            '_id': f"{r['symbol']}-{r['timestamp'].isoformat()}",
+            '_source': {
+                'symbol': r['symbol'],
+                'timestamp': r['timestamp'],
+                'sentiment_score': r['score'],
+                'sentiment_label': r['label'],
+                'source_type': r.get('source_type', 'hot-tier'),
+                'confidence': r['confidence']
+            }
+        } for r in rows]
+        self._bulk(actions)
+
+    def export_sentiment(self, start: datetime, stop: datetime) -> Iterator[Dict]:
+        """[start, stop) 구간 감정 시계열을 레코드 단위로 스트리밍 (콜드 아카이브용)"""
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: {start.strftime('%Y-%m-%dT%H:%M:%SZ')}, stop: {stop.strftime('%Y-%m-%dT%H:%M:%SZ')})
+          |> filter(fn: (r) => r["_measurement"] == "sentiment")
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+        for record in self._query_api.query_stream(query):
+            yield {
+                'symbol': record.values.get('symbol'),
+                'timestamp': record.get_time(),
+                'sentiment_score': record.values.get('score'),
+                'sentiment_label': record.values.get('label'),
+                'confidence': record.values.get('confidence')
+            }
+
+    async def get_sentiment_trend(self, symbol: str, hours: int = 24,
+                                  resolution: str = '1h') -> List[Dict]:
+        """감정 트렌드 조회 (롤업 라우팅 + count 가중 평균 + TTL 캐시)"""
+        key = ('trend', (symbol,), hours, resolution)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return list(cached)
+
         try:
-            query = f'''
-            from(bucket: "{self.influx_bucket}")
-              |> range(start: -{hours}h)
-              |> filter(fn: (r) => r["_measurement"] == "sentiment")
-              |> filter(fn: (r) => r["symbol"] == "{symbol}")
-              |> filter(fn: (r) => r["_field"] == "score")
-              |> aggregateWindow(every: 1h, fn: mean)
-              |> yield(name: "sentiment_trend")
-            '''
-            
-            result = self._query_api.query(query)
-            trend_data = []
-            
-            for table in result:
-                for record in table.records:
-                    trend_data.append({
-                        'time': record.get_time(),
-                        'symbol': record.values.get('symbol'),
-                        'score': record.get_value()
-                    })
-            
-            return sorted(trend_data, key=lambda x: x['time'])
+            end = datetime.utcnow()
+            rows = await asyncio.get_running_loop().run_in_executor(
+                None, self._window_rows, [symbol], end - timedelta(hours=hours), end,
+                resolution, self._route_rollup(resolution))
+            trend_data = [{
+                'time': row['stop'],
+                'symbol': row['symbol'],
+                'score': row['score_sum'] / row['count']
+            } for row in rows if row['count'] > 0]
+
+            trend_data.sort(key=lambda x: x['time'])
+            self._cache_put(key, trend_data)
+            return list(trend_data)
             
         except Exception as e:
             logging.error(f"Failed to get sentiment trend: {e}")
             return []
 
+    @classmethod
+    def _flux_symbol_filter(cls, symbols: List[str]) -> str:
+        """
+        종목 목록 → 검증된 Flux 태그 등치 조건 (r["symbol"] == ... or ...)
+        contains() 는 스토리지로 push down 되지 않아 청크마다 전체 스캔이 되므로 사용하지 않음
+        조건 수는 FLUX_MAX_SYMBOLS 이하 (호출부가 compare_chunk_size 로 나눠 전달)
+        """
+        invalid = [s for s in symbols if not cls.SYMBOL_PATTERN.match(s)]
+        if invalid:
+            raise ValueError(f"Invalid symbols: {invalid[:5]}")
+        if len(symbols) > cls.FLUX_MAX_SYMBOLS:
+            raise ValueError(f"{len(symbols)} symbols exceed the per-query limit of {cls.FLUX_MAX_SYMBOLS}")
+        return ' or '.join(f'r["symbol"] == {json.dumps(s)}' for s in symbols)
+
+    @staticmethod
+    def _floor_day(ts: datetime) -> datetime:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _compare_span(self, symbols: List[str], start: datetime, end: datetime,
+                      rollup: Optional[str]) -> Dict[str, Tuple[float, float]]:
+        """[start, end) 종목별 (score 합계, 건수), 롤업은 평균 × count 로 합계 복원 (블로킹)"""
+        shift = timedelta(seconds=self.ROLLUPS[rollup]) if rollup else timedelta(0)
+        fmt = '%Y-%m-%dT%H:%M:%SZ'
+        if rollup:
+            fields = 'r["_field"] == "score" or r["_field"] == "count"'
+            weigh = f'''|> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> map(fn: (r) => ({{symbol: r.symbol, s: r.score * r["count"], w: r["count"]}}))'''
+        else:
+            fields = 'r["_field"] == "score"'
+            weigh = '|> map(fn: (r) => ({symbol: r.symbol, s: r._value, w: 1.0}))'
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: {(start + shift).strftime(fmt)}, stop: {(end + shift).strftime(fmt)})
+          |> filter(fn: (r) => r["_measurement"] == "{f"sentiment_{rollup}" if rollup else "sentiment"}")
+          |> filter(fn: (r) => {fields})
+          |> filter(fn: (r) => {self._flux_symbol_filter(symbols)})
+          {weigh}
+          |> group(columns: ["symbol"])
+          |> reduce(identity: {{total: 0.0, count: 0.0}},
+                    fn: (r, accumulator) => ({{total: accumulator.total + r.s,
+                                               count: accumulator.count + r.w}}))
+        '''
+        return {record.values['symbol']: (record.values['total'], record.values['count'])
+                for record in self._query_api.query_stream(query)}
+
+    def _compare_chunk(self, symbols: List[str], days: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        종목 청크 하나의 최근 days 일 (합계, 건수) 집계 (executor 에서 실행)
+        온전한 날짜 구간은 sentiment_1d 롤업, 양 끝 부분 날짜와 롤업이 없는 종목은 raw 로 집계
+        """
+        end = datetime.utcnow()
+        start = end - timedelta(days=days)
+        first, last = self._floor_day(start) + timedelta(days=1), self._floor_day(end)
+        if first < last:
+            spans = [(start, first, None), (first, last, '1d'), (last, end, None)]
+        else:
+            spans = [(start, end, None)]
+
+        totals: Dict[str, List[float]] = {}
+        for span_start, span_end, rollup in spans:
+            part = self._compare_span(symbols, span_start, span_end, rollup)
+            if rollup:
+                missing = [s for s in symbols if s not in part]
+                if missing:
+                    part.update(self._compare_span(missing, span_start, span_end, None))
+            for symbol, (total, count) in part.items():
+                acc = totals.setdefault(symbol, [0.0, 0.0])
+                acc[0] += total
+                acc[1] += count
+        names = sorted(totals)
+        return (names, np.asarray([totals[s][0] for s in names], dtype=np.float64),
+                np.asarray([round(totals[s][1]) for s in names], dtype=np.int64))
+
+    async def get_comparative_table(self, symbols: List[str], days: int = 7) -> pa.Table:
+        """
+        여러 종목 비교 분석 (컬럼형 결과)
+        대규모 유니버스는 청크로 나눠 병렬 쿼리, 결과는 symbol/avg_sentiment/count Arrow 테이블
+        """
+        symbols = sorted(set(symbols))
+        key = ('compare', tuple(symbols), days, None)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        gate = asyncio.Semaphore(self.compare_parallelism)
+
+        async def run(chunk):
+            async with gate:
+                return await loop.run_in_executor(None, self._compare_chunk, chunk, days)
+
+        chunks = [symbols[i:i + self.compare_chunk_size]
+                  for i in range(0, len(symbols), self.compare_chunk_size)]
+        parts = await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+        names = [name for part in parts for name in part[0]]
+        totals = np.concatenate([part[1] for part in parts]) if parts else np.empty(0)
+        counts = np.concatenate([part[2] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+        avg = np.divide(totals, counts, out=np.full(len(totals), np.nan), where=counts > 0)
+
+        table = pa.table({
+            'symbol': pa.array(names, type=pa.string()),
+            'avg_sentiment': pa.array(avg, type=pa.float64()),
+            'count': pa.array(counts, type=pa.int64())
+        }).sort_by('symbol')
+        self._cache_put(key, table)
+        return table
+
+    def _window_rows(self, symbols: List[str], start: datetime, end: datetime,
+                     resolution: str, rollup: Optional[str]) -> List[Dict]:
+        """
+        종목별 [start, end) resolution 구간 (score 합계, confidence 합계, 건수) (블로킹)
+        롤업은 완료된 구간만 있으므로 롤업 경계 안쪽만 롤업에서 읽고, 양 끝 부분 구간(진행 중인 현재 구간 포함)과
+        롤업에 값이 없는 종목(롤업 배포 이전 구간, backfill 전)은 raw measurement 로 집계해 구간별로 합산
+        """
+        if not rollup:
+            return self._window_query(symbols, start, end, resolution, None)
+        step = self.ROLLUPS[rollup]
+        first, last = self._ceil_time(start, step), floor_time(end, step)
+        if first >= last:
+            return self._window_query(symbols, start, end, resolution, None)
+
+        rows = self._window_query(symbols, first, last, resolution, rollup)
+        found = {row['symbol'] for row in rows}
+        missing = [s for s in symbols if s not in found]
+        if missing:
+            rows += self._window_query(missing, first, last, resolution, None)
+        if start < first:
+            rows += self._window_query(symbols, start, first, resolution, None)
+        if last < end:
+            rows += self._window_query(symbols, last, end, resolution, None)
+        return self._merge_windows(rows, self._duration_seconds(resolution))
+
+    @staticmethod
+    def _ceil_time(ts: datetime, step: int) -> datetime:
+        floored = floor_time(ts, step)
+        return floored if floored == ts else floored + timedelta(seconds=step)
+
+    @staticmethod
+    def _merge_windows(rows: List[Dict], step: int) -> List[Dict]:
+        """같은 종목·resolution 구간(epoch 정렬)으로 잘려 나온 행의 합계·건수를 합침"""
+        merged: Dict[Tuple[str, datetime], Dict] = {}
+        for row in rows:
+            key = (row['symbol'], floor_time(row['start'], step))
+            acc = merged.get(key)
+            if acc is None:
+                merged[key] = dict(row)
+                continue
+            acc['start'], acc['stop'] = min(acc['start'], row['start']), max(acc['stop'], row['stop'])
+            for field in ('score_sum', 'confidence_sum', 'count'):
+                acc[field] += row[field]
+        return sorted(merged.values(), key=lambda r: (r['symbol'], r['start']))
+
+    def _window_query(self, symbols: List[str], start: datetime, end: datetime,
+                      resolution: str, rollup: Optional[str]) -> List[Dict]:
+        """
+        measurement 하나(raw 또는 sentiment_{rollup})의 구간 집계 Flux
+        롤업 measurement 는 평균 × count 로 합계 복원 (평균의 평균 방지), 기록 시각(구간 끝)을 구간 시작으로 이동
+        """
+        shift = timedelta(seconds=self.ROLLUPS[rollup]) if rollup else timedelta(0)
+        measurement = f"sentiment_{rollup}" if rollup else "sentiment"
+        weight = 'r["count"]' if rollup else '1.0'
+        time_shift = f'|> timeShift(duration: -{rollup})' if rollup else ''
+        fmt = '%Y-%m-%dT%H:%M:%SZ'
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: {(start + shift).strftime(fmt)}, stop: {(end + shift).strftime(fmt)})
+          |> filter(fn: (r) => r["_measurement"] == "{measurement}")
+          |> filter(fn: (r) => r["_field"] == "score" or r["_field"] == "confidence" or r["_field"] == "count")
+          |> filter(fn: (r) => {self._flux_symbol_filter(symbols)})
+          {time_shift}
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> map(fn: (r) => ({{symbol: r.symbol, _time: r._time, w: {weight},
+                               s: r.score * {weight}, c: r.confidence * {weight}}}))
+          |> group(columns: ["symbol"])
+          |> window(every: {resolution})
+          |> reduce(identity: {{score_sum: 0.0, confidence_sum: 0.0, count: 0.0}},
+                    fn: (r, accumulator) => ({{score_sum: accumulator.score_sum + r.s,
+                                               confidence_sum: accumulator.confidence_sum + r.c,
+                                               count: accumulator.count + r.w}}))
+        '''
+        return [{
+            'symbol': record.values['symbol'],
+            'start': record.values['_start'].replace(tzinfo=None),
+            'stop': record.values['_stop'].replace(tzinfo=None),
+            'score_sum': record.values['score_sum'],
+            'confidence_sum': record.values['confidence_sum'],
+            'count': record.values['count']
+        } for record in self._query_api.query_stream(query)]
+
+    def _aggregate_chunk(self, symbols: List[str], start: datetime, end: datetime,
+                         resolution: str) -> pa.Table:
+        """종목 청크 하나의 [start, end) 구간별 (합계, 건수) 부분 집계 (executor 에서 실행)"""
+        # 구간 양 끝이 롤업 경계와 맞는 가장 굵은 롤업만 사용 (티어 경계에서 롤업 구간이 잘리지 않도록)
+        step = self._duration_seconds(resolution)
+        edges = [int((t - datetime(1970, 1, 1)).total_seconds()) for t in (start, end)]
+        candidates = [res for res, sec in self.ROLLUPS.items()
+                      if step % sec == 0 and all(edge % sec == 0 for edge in edges)]
+        rollup = max(candidates, key=self.ROLLUPS.get) if candidates else None
+        rows = [{
+            'symbol': row['symbol'],
+            'time': row['start'],
+            'score_sum': row['score_sum'],
+            'confidence_sum': row['confidence_sum'],
+            'count': int(round(row['count']))
+        } for row in self._window_rows(symbols, start, end, resolution, rollup)]
+        return pa.Table.from_pylist(rows, schema=PARTIAL_SCHEMA)
+
+    async def aggregate_range(self, symbols: List[str], start: datetime, end: datetime,
+                              resolution: str) -> pa.Table:
+        """[start, end) 구간 resolution 단위 부분 집계 (롤업 라우팅, 종목 청크 병렬)"""
+        symbols = sorted(set(symbols))
+        loop = asyncio.get_running_loop()
+        gate = asyncio.Semaphore(self.compare_parallelism)
+
+        async def run(chunk):
+            async with gate:
+                return await loop.run_in_executor(None, self._aggregate_chunk,
+                                                  chunk, start, end, resolution)
+
+        chunks = [symbols[i:i + self.compare_chunk_size]
+                  for i in range(0, len(symbols), self.compare_chunk_size)]
+        parts = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        return pa.concat_tables(parts) if parts else PARTIAL_SCHEMA.empty_table()
+
     async def get_comparative_analysis(self, symbols: List[str], days: int = 7) -> Dict:
-        """여러 종목 비교 분석"""
+        """여러 종목 비교 분석 (get_comparative_table 의 dict 호환 뷰)"""
         try:
-            symbols_filter = ' or '.join([f'r["symbol"] == "{s}"' for s in symbols])
-            query = f'''
-            from(bucket: "{self.influx_bucket}")
-              |> range(start: -{days}d)
-              |> filter(fn: (r) => r["_measurement"] == "sentiment")
-              |> filter(fn: (r) => {symbols_filter})
-              |> filter(fn: (r) => r["_field"] == "score")
-              |> group(columns: ["symbol"])
-              |> mean()
-              |> yield(name: "comparative_sentiment")
-            '''
-            
-            result = self._query_api.query(query)
-            comparison = {}
-            
-            for table in result:
-                for record in table.records:
-                    symbol = record.values.get('symbol')
-                    avg_score = record.get_value()
-                    comparison[symbol] = {
-                        'avg_sentiment': avg_score,
-                        'period_days': days
-                    }
-            
-            return comparison
+            table = await self.get_comparative_table(symbols, days)
+            return {
+                symbol: {'avg_sentiment': avg, 'period_days': days}
+                for symbol, avg in zip(table.column('symbol').to_pylist(),
+                                       table.column('avg_sentiment').to_pylist())
+            }
             
         except Exception as e:
             logging.error(f"Failed to get comparative analysis: {e}")
@@ -188,7 +778,7 @@ class WarmDB:
     async def store_sentiment_log(self, symbol: str, score: float, label: str,
                                 source_text: str, source_type: str, 
                                 confidence: float, key_factors: List[str]):
-        """상세 감정 분석 로그 저장"""
+        """상세 감정 분석 로그 저장 (버퍼 적재, batch_size 도달 시 백그라운드 bulk)"""
         try:
             doc = {
                 'symbol': symbol,
@@ -201,11 +791,20 @@ class WarmDB:
                 'key_factors': ' '.join(key_factors) if key_factors else ''
             }
             
-            self._opensearch_client.index(
-                index='sentiment-logs',
-                body=doc
-            )
-            logging.debug(f"Stored sentiment log for {symbol}")
+            if len(self._log_buffer) >= self.max_buffer:
+                self.metrics['logs_dropped'] += 1
+            # 재시도 시 같은 문서를 덮어쓰도록 내용 기반 _id + 기간 인덱스 고정
+            doc_id = hashlib.sha1(
+                f"{symbol}|{doc['timestamp'].isoformat()}|{source_type}|{doc['source_text']}".encode()
+            ).hexdigest()
+            self._log_buffer.append({'_index': self._log_index_name(doc['timestamp']),
+                                     '_id': doc_id, '_source': doc})
+            self.metrics['logs_buffered'] = len(self._log_buffer)
+            if len(self._log_buffer) >= self.batch_size and not self._flush_lock.locked():
+                task = asyncio.create_task(self.flush_logs())
+                self._log_flushes.add(task)
+                task.add_done_callback(self._on_log_flush_done)
+            logging.debug(f"Buffered sentiment log for {symbol}")
             
         except Exception as e:
             logging.error(f"Failed to store sentiment log: {e}")
@@ -233,8 +832,9 @@ class WarmDB:
             }
             
             response = self._opensearch_client.search(
-                index='sentiment-logs',
-                body=search_body
+                index=self._log_read_indices(days),
+                body=search_body,
+                ignore_unavailable=True
             )
             
             return [hit['_source'] for hit in response['hits']['hits']]
@@ -276,8 +876,9 @@ class WarmDB:
             }
             
             response = self._opensearch_client.search(
-                index='sentiment-logs',
-                body=search_body
+                index=self._log_read_indices(days),
+                body=search_body,
+                ignore_unavailable=True
             )
             
             distribution = {}
@@ -300,7 +901,7 @@ class WarmDB:
             return {}
 
     async def cleanup_old_data(self, days: int = 30):
-        """30일 이상 된 데이터 정리"""
+        """30일 이상 된 데이터 정리 (감정 로그는 기간 인덱스 단위 삭제)"""
         try:
             # InfluxDB 데이터 삭제
             delete_query = f'''
@@ -308,32 +909,73 @@ class WarmDB:
               |> range(start: -365d, stop: -{days}d)
               |> drop()
             '''
-            # TODO: InfluxDB delete 쿼리 실행
-            
-            # OpenSearch 데이터 삭제
-            delete_body = {
-                'query': {
-                    'range': {
-                        'timestamp': {
-                            'lt': f'now-{days}d'
-                        }
-                    }
-                }
-            }
+            # TODO: InfluxDB delete 쿼리 실행 (버킷 retention 정책 권장)
             
-            self._opensearch_client.delete_by_query(
-                index='sentiment-logs',
-                body=delete_body
+            # OpenSearch: 기간 전체가 보관 기간을 벗어난 인덱스 DROP
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            loop = asyncio.get_running_loop()
+            indices = await loop.run_in_executor(
+                None, lambda: self._opensearch_client.indices.get(index=f'{self.LOG_INDEX_PREFIX}-*'))
+            expired = sorted(
+                name for name in indices
+                if name != self._current_log_index
+                and (start := self._log_index_start(name)) is not None
+                and start + self._log_period() <= cutoff
             )
+            if expired:
+                await loop.run_in_executor(
+                    None, lambda: self._opensearch_client.indices.delete(index=','.join(expired)))
             
-            logging.info(f"Cleaned up data older than {days} days")
+            logging.info(f"Cleaned up data older than {days} days "
+                         f"(dropped indices: {', '.join(expired) or 'none'})")
             
         except Exception as e:
             logging.error(f"Failed to cleanup old data: {e}")
 
     async def shutdown(self):
-        """연결 종료"""
+        """버퍼 flush 후 연결 종료"""
+        if self._rollup_task:
+            self._rollup_task.cancel()
+            self._rollup_task = None
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._log_flushes:
+            await asyncio.gather(*self._log_flushes, return_exceptions=True)
+        if self._opensearch_client:
+            await self.flush_logs()
+            if self._log_buffer:
+                logging.error(f"WarmDB shutdown with {len(self._log_buffer)} unflushed logs")
         if self._influx_client:
+            # 배치 writer close 시 대기 중인 point 까지 flush
+            await asyncio.get_running_loop().run_in_executor(None, self._write_api.close)
             self._influx_client.close()
         # OpenSearch 클라이언트는 자동으로 정리됨
         logging.info("WarmDB connections closed")
+
+
+async def _backfill_main(args):
+    warm = WarmDB()
+    await warm.startup()
+    try:
+        end = datetime.fromisoformat(args.end) if args.end else datetime.utcnow()
+        start = datetime.fromisoformat(args.start) if args.start else end - timedelta(days=args.days)
+        runs = await warm.backfill_rollups(start, end, args.resolution or None)
+        logging.info(f"Rollup backfill finished: {runs} chunks")
+    finally:
+        await warm.shutdown()
+
+if __name__ == "__main__":
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Rebuild sentiment rollups from raw Warm data")
+    parser.add_argument("--start", help="ISO datetime (UTC), default: --days before --end")
+    parser.add_argument("--end", help="ISO datetime (UTC), default: now")
+    parser.add_argument("--days", type=int, default=getattr(settings, 'WARM_RETENTION_DAYS', 30))
+    parser.add_argument("--resolution", action="append", choices=list(WarmDB.ROLLUPS),
+                        help="rollup to rebuild (repeatable, default: all)")
+    asyncio.run(_backfill_main(parser.parse_args()))
@@ -0,0 +1,15 @@
+# tests/conftest.py
+"""
+공통 pytest 설정
+- 저장소 루트를 import 경로에 추가 (storage, benchmarks 패키지)
+- config.Settings 필수 값은 테스트용 더미로 채움 (실제 외부 서비스는 호출하지 않음)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+for name in ('TWITTER_BEARER_TOKEN', 'ALPHA_VANTAGE_KEY', 'HYPERCLOVA_X_API_KEY'):
+    os.environ.setdefault(name, 'test')
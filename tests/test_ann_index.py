@@ -0,0 +1,114 @@
+# tests/test_ann_index.py
+"""IVFFlatIndex: add / search / delete / compact / reopen, 학습 후 리스트 연속 배치"""
+import numpy as np
+import pytest
+from storage.ann_index import IVFFlatIndex
+
+DIM = 32
+
+def clustered(n: int, seed: int = 0, clusters: int = 16) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    return centers[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, DIM)).astype(np.float32)
+
+def fill(index: IVFFlatIndex, vectors: np.ndarray, start: int = 0, ts: int = 1000) -> np.ndarray:
+    n = len(vectors)
+    symbols = ['AAPL' if i % 2 else 'TSLA' for i in range(start, start + n)]
+    return index.add(vectors, symbols, np.full(n, ts, dtype=np.int64),
+                     [{'row': i} for i in range(start, start + n)])
+
+def rows(index: IVFFlatIndex, hits) -> list:
+    return [m['row'] for m in index.metadata([i for i, _ in hits])]
+
+@pytest.fixture
+def index(tmp_path):
+    idx = IVFFlatIndex(str(tmp_path / 'ann'), dim=DIM, nlist=8, nprobe=8, train_min_points=400)
+    yield idx
+    idx.close()
+
+
+def test_brute_force_before_training(index):
+    data = clustered(100)
+    ids = fill(index, data)
+    assert index.centroids is None
+    assert len(index) == 100
+    hits = index.search(data[:5], k=3)
+    # 자기 자신이 가장 가까움 (cosine 1)
+    assert [h[0][0] for h in hits] == ids[:5].tolist()
+    assert hits[0][0][1] == pytest.approx(1.0, abs=1e-5)
+
+def test_filters(index):
+    data = clustered(100)
+    fill(index, data[:50], 0, ts=1000)
+    fill(index, data[50:], 50, ts=2000)
+    hits = index.search(data[:1], k=100, symbols=['AAPL'], since=1500)
+    found = rows(index, hits[0])
+    assert found and all(r % 2 == 1 and r >= 50 for r in found)
+
+def test_trained_search_matches_brute_force(index):
+    data = clustered(1000)
+    fill(index, data)
+    assert index.centroids is not None
+    # 학습 후 정렬 구간은 리스트 순서
+    assignments = np.asarray(index._list[:index._sorted])
+    assert (np.diff(assignments) >= 0).all()
+
+    hits = index.search(data[:20], k=5, nprobe=8)   # nprobe == nlist → 전수 검색과 동일
+    normalized = IVFFlatIndex._normalize(data)
+    truth = np.argsort(-(normalized[:20] @ normalized.T), axis=1)[:, :5]
+    for q, row in enumerate(hits):
+        assert set(rows(index, row)) == set(truth[q].tolist())
+
+def test_add_after_training_returns_current_ids(index):
+    data = clustered(1400)
+    fill(index, data[:1000])
+    # tail 이 REORDER_RATIO 를 넘으면 재배치되지만 반환 id 는 재배치 이후 기준
+    ids = fill(index, data[1000:], 1000)
+    assert index._sorted == index.count
+    assert [m['row'] for m in index.metadata(ids)] == list(range(1000, 1400))
+
+    more = fill(index, data[:10], 2000)
+    assert index.count - index._sorted == 10   # tail 에 남아 있어도 검색됨
+    hits = index.search(data[:10], k=2)
+    assert all(2000 + q in rows(index, row) for q, row in enumerate(hits))
+    assert [m['row'] for m in index.metadata(more)] == list(range(2000, 2010))
+
+def test_delete_and_compact(index):
+    data = clustered(1000)
+    fill(index, data[:500], 0, ts=1000)
+    fill(index, data[500:], 500, ts=2000)
+    assert index.delete_before(1500) == 500
+    assert len(index) == 500
+    assert index.count == 500     # 삭제 비율이 높아 compaction 됨
+    hits = index.search(data[:50], k=10)
+    assert all(r >= 500 for row in hits for r in rows(index, row))
+
+    before = index.search(data[500:510], k=3)
+    index.compact()
+    assert rows(index, index.search(data[500:510], k=3)[0]) == rows(index, before[0])
+
+def test_search_with_metadata(index):
+    data = clustered(500)
+    fill(index, data)
+    hits = index.search_with_metadata(data[:3], k=1, symbols=['TSLA', 'AAPL'])
+    assert [row[0][2]['row'] for row in hits] == [0, 1, 2]
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / 'ann')
+    data = clustered(1000)
+    index = IVFFlatIndex(path, dim=DIM, nlist=8, nprobe=8, train_min_points=400)
+    fill(index, data)
+    fill(index, data[:5], 1000)
+    expected = [rows(index, row) for row in index.search(data[:10], k=4)]
+    index.close()
+
+    reopened = IVFFlatIndex(path, dim=DIM, nlist=8, nprobe=8, train_min_points=400)
+    try:
+        assert len(reopened) == 1005
+        assert reopened.centroids is not None
+        assert [rows(reopened, row) for row in reopened.search(data[:10], k=4)] == expected
+    finally:
+        reopened.close()
+
+    with pytest.raises(ValueError):
+        IVFFlatIndex(path, dim=DIM * 2)
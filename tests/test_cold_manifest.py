@@ -0,0 +1,110 @@
+# tests/test_cold_manifest.py
+"""ColdManifest: bloom / symbol·시간 범위 pruning, 날짜만 준 end, 조건부 갱신"""
+from datetime import datetime
+import pyarrow as pa
+import pytest
+from benchmarks.fakes import Fault, FakeS3
+from storage.cold_manifest import ColdManifest, FileStats, SymbolBloom, inclusive_end
+
+def entry(key: str, day: datetime, symbols, hours, bucket=None) -> dict:
+    stats = FileStats('timestamp')
+    stats.add_batch(pa.RecordBatch.from_pydict({
+        'symbol': symbols,
+        'timestamp': pa.array([day.replace(hour=h) for h in hours], pa.timestamp('us', tz='UTC')),
+    }))
+    return stats.entry(key, day, bucket, size=100, etag='"x"')
+
+@pytest.fixture
+def manifest(tmp_path):
+    return ColdManifest(FakeS3(Fault('s3'), str(tmp_path)), 'bucket')
+
+
+def test_bloom_roundtrip():
+    bloom = SymbolBloom()
+    for symbol in ('AAPL', 'TSLA', '005930'):
+        bloom.add(symbol)
+    decoded = SymbolBloom.decode(bloom.encode())
+    assert all(s in decoded for s in ('AAPL', 'TSLA', '005930'))
+    assert 'MSFT' not in decoded
+
+def test_file_stats_entry():
+    e = entry('sentiment/year=2024/month=03/day=05/a.parquet', datetime(2024, 3, 5),
+              ['TSLA', 'AAPL'], [9, 15])
+    assert (e['rows'], e['symbol_min'], e['symbol_max']) == (2, 'AAPL', 'TSLA')
+    assert (e['t_min'], e['t_max']) == ('2024-03-05T09:00:00', '2024-03-05T15:00:00')
+
+def test_plan_prunes_by_symbol_time_and_bucket(manifest):
+    day = datetime(2024, 3, 5)
+    files = [
+        entry('sentiment/year=2024/month=03/day=05/a.parquet', day, ['AAPL', 'TSLA'], [1, 2], bucket=0),
+        entry('sentiment/year=2024/month=03/day=05/b.parquet', day, ['AMZN', 'TSLA'], [3, 4], bucket=1),
+        entry('sentiment/year=2024/month=03/day=05/c.parquet', day, ['NVDA', 'NVDA'], [20, 21], bucket=2),
+        entry('sentiment/year=2024/month=03/day=06/d.parquet', datetime(2024, 3, 6), ['AAPL'], [1], bucket=0),
+    ]
+    manifest.update('sentiment', files)
+
+    selected, unplanned = manifest.plan('sentiment', day, datetime(2024, 3, 5, 12), symbols=['AAPL'])
+    assert [e['key'][-9:] for e in selected] == ['a.parquet']
+    assert unplanned == []
+
+    # MSFT 는 a, b 의 symbol 범위 안이지만 bloom 에 없음
+    selected, _ = manifest.plan('sentiment', day, datetime(2024, 3, 5, 12), symbols=['MSFT'])
+    assert selected == []
+
+    selected, _ = manifest.plan('sentiment', day, datetime(2024, 3, 5, 12), buckets={1})
+    assert [e['key'][-9:] for e in selected] == ['b.parquet']
+
+    # 날짜만 준 end 는 그 날 전체 포함
+    selected, _ = manifest.plan('sentiment', day, day)
+    assert [e['key'][-9:] for e in selected] == ['a.parquet', 'b.parquet', 'c.parquet']
+
+def test_plan_reports_days_without_manifest(manifest):
+    manifest.update('sentiment', [entry('sentiment/year=2024/month=03/day=31/a.parquet',
+                                        datetime(2024, 3, 31), ['AAPL'], [1])])
+    selected, unplanned = manifest.plan('sentiment', datetime(2024, 3, 31), datetime(2024, 4, 1))
+    assert len(selected) == 1
+    assert unplanned == [datetime(2024, 4, 1)]
+
+def test_update_replaces_and_removes(manifest):
+    day = datetime(2024, 3, 5)
+    a = entry('sentiment/year=2024/month=03/day=05/a.parquet', day, ['AAPL'], [1])
+    b = entry('sentiment/year=2024/month=03/day=05/b.parquet', day, ['TSLA'], [2])
+    manifest.update('sentiment', [a, b])
+    merged = entry('sentiment/year=2024/month=03/day=05/m.parquet', day, ['AAPL', 'TSLA'], [1, 2])
+    manifest.update('sentiment', [merged], removed_keys=[a['key'], b['key']])
+    assert [e['key'] for e in manifest.load_month('sentiment', 2024, 3)] == [merged['key']]
+
+def test_update_retries_on_concurrent_write(manifest):
+    day = datetime(2024, 3, 5)
+    a = entry('sentiment/year=2024/month=03/day=05/a.parquet', day, ['AAPL'], [1])
+    b = entry('sentiment/year=2024/month=03/day=05/b.parquet', day, ['TSLA'], [2])
+    manifest.update('sentiment', [a])
+    read = manifest._read_month
+
+    def racing_read(*args):
+        # 첫 읽기 직후 다른 프로세스가 b 를 기록 → ETag 불일치로 재시도
+        result = read(*args)
+        manifest._read_month = read
+        manifest._save_month('sentiment', 2024, 3, result[0] + [b], result[1])
+        return result
+
+    manifest._read_month = racing_read
+    c = entry('sentiment/year=2024/month=03/day=05/c.parquet', day, ['NVDA'], [3])
+    manifest.update('sentiment', [c])
+    assert {e['key'][-9:] for e in manifest.load_month('sentiment', 2024, 3)} == {
+        'a.parquet', 'b.parquet', 'c.parquet'}
+
+def test_inclusive_end():
+    assert inclusive_end(datetime(2024, 3, 5)) == datetime(2024, 3, 5, 23, 59, 59, 999999)
+    assert inclusive_end(datetime(2024, 3, 5, 12)) == datetime(2024, 3, 5, 12)
+
+def test_plan_mixes_legacy_and_bucketed_entries(manifest):
+    day = datetime(2024, 3, 5)
+    legacy = entry('sentiment/year=2024/month=03/day=05/legacy.parquet', day, ['AAPL'], [1])
+    bucketed = entry('sentiment/year=2024/month=03/day=05/bucket=03/b.parquet', day, ['AAPL'], [2], bucket=3)
+    manifest.update('sentiment', [bucketed, legacy])
+    selected, _ = manifest.plan('sentiment', day, day)
+    # bucket 없는 entry 가 먼저 (정렬 시 None 비교 오류 없음)
+    assert [e['key'] for e in selected] == [legacy['key'], bucketed['key']]
+    selected, _ = manifest.plan('sentiment', day, day, buckets={3})
+    assert [e['key'] for e in selected] == [legacy['key'], bucketed['key']]
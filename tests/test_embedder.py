@@ -0,0 +1,83 @@
+# tests/test_embedder.py
+"""TextEmbedder 적재 버퍼 / dedup: 실패 재시도, flush 중 drain, TTL 만료 후 재적재"""
+import asyncio
+import time
+from datetime import datetime, timezone
+import numpy as np
+from embedder import TextEmbedder
+
+class FakeVectorStore:
+    def __init__(self):
+        self.fail = False
+        self.inserted = []
+
+    def insert_many(self, vectors, metas):
+        time.sleep(0.02)      # drain 이 버퍼에 쓰는 동안 insert 가 진행 중이도록
+        if self.fail:
+            raise RuntimeError("vector store down")
+        self.inserted += [(m["text"], vec.copy()) for vec, m in zip(vectors, metas)]
+
+def make_embedder(store) -> TextEmbedder:
+    embedder = TextEmbedder(store)
+    embedder.insert_batch = 4
+    embedder._pending = np.empty((4, embedder.DIM), dtype=np.float32)
+    embedder._encode_sync = lambda texts: np.stack(
+        [np.full(embedder.DIM, len(t), dtype=np.float32) for t in texts])
+    return embedder
+
+def tweets(*texts):
+    # 벡터 TTL 은 트윗 시각 기준이므로 현재 시각으로
+    now = datetime.now(timezone.utc).isoformat()
+    return [{"text": t, "created_at": now} for t in texts]
+
+
+def test_failed_insert_is_retried():
+    async def run():
+        store = FakeVectorStore()
+        embedder = make_embedder(store)
+        store.fail = True
+        embedder.submit("AAPL", tweets("a", "bb"))
+        await embedder._drain()
+        await embedder.flush()
+        store.fail = False
+        embedder.submit("AAPL", tweets("a", "bb"))
+        await embedder._drain()
+        await embedder.flush()
+        return store, embedder
+    store, embedder = asyncio.run(run())
+    assert [t for t, _ in store.inserted] == ["a", "bb"]
+    assert len(embedder._stored) == 2 and not embedder._inflight
+
+def test_flush_concurrent_with_drain_keeps_rows():
+    async def run():
+        store = FakeVectorStore()
+        embedder = make_embedder(store)
+        embedder.submit("AAPL", tweets("a", "bb", "ccc"))
+        await embedder._drain()
+        pending = asyncio.create_task(embedder.flush())
+        await asyncio.sleep(0)
+        embedder.submit("AAPL", tweets("dddd", "eeeee"))
+        await embedder._drain()
+        await pending
+        await embedder.flush()
+        return store
+    store = asyncio.run(run())
+    assert [t for t, _ in store.inserted] == ["a", "bb", "ccc", "dddd", "eeeee"]
+    assert all(vec[0] == len(t) for t, vec in store.inserted)
+
+def test_dedup_until_vector_ttl():
+    async def run():
+        store = FakeVectorStore()
+        embedder = make_embedder(store)
+        embedder.submit("AAPL", tweets("a"))
+        await embedder._drain()
+        await embedder.flush()
+        embedder.submit("AAPL", tweets("a"))
+        await embedder._drain()
+        skipped = len(embedder._pending_meta)
+        for key in embedder._stored:
+            embedder._stored[key] = time.time() - 1    # 벡터 TTL 경과
+        embedder.submit("AAPL", tweets("a"))
+        await embedder._drain()
+        return skipped, len(embedder._pending_meta)
+    assert asyncio.run(run()) == (0, 1)
@@ -0,0 +1,105 @@
+# tests/test_fanout.py
+"""TierSink 큐 상한·drop 정책·재시도·종료 시 drain, 아카이브 트윗 id 중복 제거"""
+import asyncio
+from datetime import datetime
+import pytest
+from storage import StorageManager
+from storage.fanout import TierSink
+
+class RecordingWriter:
+    """받은 batch 를 기록, 앞쪽 fail_times 번은 실패"""
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.batches = []
+
+    async def __call__(self, events):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError('tier unavailable')
+        self.batches.append([e.get('n') for e in events])
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        TierSink('hot', RecordingWriter(), policy='block')
+
+def test_drop_oldest_keeps_latest_events():
+    async def run():
+        writer = RecordingWriter()
+        sink = TierSink('hot', writer, batch_size=10, max_queue=3)
+        accepted = [sink.offer({'n': i}) for i in range(5)]
+        await sink.flush()
+        return sink, writer, accepted
+    sink, writer, accepted = asyncio.run(run())
+    assert accepted == [True] * 5
+    assert writer.batches == [[2, 3, 4]]
+    assert sink.get_metrics()['dropped'] == 2
+
+def test_drop_newest_rejects_when_full():
+    async def run():
+        writer = RecordingWriter()
+        sink = TierSink('warm', writer, batch_size=10, max_queue=3, policy='drop_newest')
+        accepted = [sink.offer({'n': i}) for i in range(5)]
+        await sink.flush()
+        return sink, writer, accepted
+    sink, writer, accepted = asyncio.run(run())
+    assert accepted == [True, True, True, False, False]
+    assert writer.batches == [[0, 1, 2]]
+    assert sink.get_metrics()['dropped'] == 2
+
+def test_stop_drains_queue_in_batches():
+    async def run():
+        writer = RecordingWriter()
+        sink = TierSink('kafka', writer, batch_size=4, flush_interval=60)
+        await sink.start()
+        for i in range(10):
+            sink.offer({'n': i})
+        await sink.stop()      # flush_interval 을 기다리지 않고 남은 이벤트를 모두 기록
+        return sink, writer
+    sink, writer = asyncio.run(run())
+    assert writer.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    metrics = sink.get_metrics()
+    assert metrics['written'] == 10 and metrics['queued'] == 0 and metrics['batches'] == 3
+
+def test_write_retries_then_gives_up():
+    async def run():
+        flaky, dead = RecordingWriter(fail_times=2), RecordingWriter(fail_times=99)
+        ok = TierSink('hot', flaky, max_retries=3, retry_backoff=0)
+        lost = TierSink('warm', dead, max_retries=1, retry_backoff=0)
+        for sink in (ok, lost):
+            sink.offer({'n': 0})
+            sink.offer({'n': 1})
+            await sink.flush()
+        return ok, lost, flaky
+    ok, lost, flaky = asyncio.run(run())
+    assert flaky.batches == [[0, 1]]
+    assert ok.metrics['retries'] == 2 and ok.metrics['written'] == 2
+    assert lost.metrics['failed'] == 2 and lost.metrics['written'] == 0
+
+
+def make_archive_manager(max_queue: int) -> StorageManager:
+    manager = StorageManager(sinks=['archive'], mover=False)
+    manager.sinks['archive'] = TierSink('archive', RecordingWriter(), max_queue=max_queue,
+                                        policy='drop_newest')
+    return manager
+
+def test_archive_dedups_tweet_ids():
+    manager = make_archive_manager(max_queue=10)
+    tweets = [{'id': '1', 'text': 'a'}, {'id': '2', 'text': 'b'}]
+    ts = datetime(2024, 3, 5, 9)
+    assert manager.write_event('AAPL', 0.1, 'neutral', 0.5, ts=ts, tweets=tweets) == {'archive': True}
+    manager.write_event('AAPL', 0.1, 'neutral', 0.5, ts=ts, tweets=tweets[1:] + [{'id': '3'}])
+    rows = [e['row']['id'] for _, e in manager.sinks['archive']._queue]
+    assert rows == ['1', '2', '3']
+
+def test_archive_rejected_tweet_is_offered_again():
+    manager = make_archive_manager(max_queue=1)
+    ts = datetime(2024, 3, 5, 9)
+    accepted = manager.write_event('AAPL', 0.1, 'neutral', 0.5, ts=ts,
+                                   tweets=[{'id': '1'}, {'id': '2'}])
+    assert accepted == {'archive': False}
+    assert '2' not in manager._archived_id_set       # 큐가 거부한 id 는 기억하지 않음
+    asyncio.run(manager.sinks['archive'].flush())
+    manager.write_event('AAPL', 0.1, 'neutral', 0.5, ts=ts, tweets=[{'id': '1'}, {'id': '2'}])
+    assert [e['row']['id'] for _, e in manager.sinks['archive']._queue] == ['2']
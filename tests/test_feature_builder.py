@@ -0,0 +1,59 @@
+# tests/test_feature_builder.py
+"""DailyAggregator 부분 집계 병합 / 일 특성 스트림 join"""
+import numpy as np
+import pyarrow as pa
+import pytest
+from storage.feature_builder import DailyAggregator, daily_features, join_daily_features
+
+def batch(symbols, scores) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict({'symbol': symbols, 'sentiment_score': pa.array(scores, pa.float64())})
+
+
+def test_merge_matches_single_pass():
+    rng = np.random.default_rng(0)
+    symbols = rng.choice(['AAPL', 'TSLA', 'NVDA'], 500).tolist()
+    scores = rng.standard_normal(500)
+    agg = DailyAggregator('sentiment', ['sentiment_score'])
+    agg.COMPACT_EVERY = 4      # 중간 병합 경로도 거치도록
+    for i in range(0, 500, 37):
+        agg.add(batch(symbols[i:i + 37], scores[i:i + 37].tolist()))
+    table = agg.finish()
+    assert table.schema == agg.schema
+
+    for row in table.to_pylist():
+        values = scores[np.asarray(symbols) == row['symbol']]
+        assert row['sentiment_count'] == len(values)
+        assert row['sentiment_score_sum'] == pytest.approx(values.sum())
+        assert row['sentiment_score_mean'] == pytest.approx(values.mean())
+        assert row['sentiment_score_std'] == pytest.approx(values.std())
+        assert row['sentiment_score_min'] == pytest.approx(values.min())
+        assert row['sentiment_score_max'] == pytest.approx(values.max())
+    # finish 후 상태 초기화
+    assert agg.finish().num_rows == 0
+
+def test_nulls_and_missing_columns():
+    agg = DailyAggregator('market', ['close', 'volume'])
+    agg.add(pa.RecordBatch.from_pydict({'symbol': ['AAPL', 'AAPL'], 'close': [1.0, None]}))
+    row = agg.finish().to_pylist()[0]
+    assert row['market_count'] == 2
+    assert row['market_close_mean'] == pytest.approx(1.0)
+    # 값이 하나도 없는 컬럼은 null
+    assert row['market_volume_mean'] is None and row['market_volume_sum'] is None
+
+def test_daily_stream_and_join():
+    sentiment = DailyAggregator('sentiment', ['sentiment_score'])
+    market = DailyAggregator('market', ['close'])
+    s_stream = daily_features(iter([('2024-03-05', batch(['AAPL', 'TSLA'], [0.5, -0.5])),
+                                    ('2024-03-06', batch(['AAPL'], [0.1]))]), sentiment)
+    m_stream = daily_features(iter([
+        ('2024-03-04', pa.RecordBatch.from_pydict({'symbol': ['AAPL'], 'close': [9.0]})),
+        ('2024-03-05', pa.RecordBatch.from_pydict({'symbol': ['AAPL', 'MSFT'], 'close': [10.0, 20.0]}))]),
+        market)
+    out = dict(join_daily_features({'sentiment': s_stream, 'market': m_stream},
+                                   {'sentiment': sentiment.schema, 'market': market.schema},
+                                   ['2024-03-05', '2024-03-06'], primary=('sentiment',)))
+    day = out['2024-03-05'].to_pylist()
+    # primary 에 없는 MSFT 는 left join 으로 빠지고, 시장 데이터가 없는 TSLA 는 0
+    assert [r['symbol'] for r in day] == ['AAPL', 'TSLA']
+    assert day[0]['market_close_mean'] == 10.0 and day[1]['market_close_mean'] == 0.0
+    assert out['2024-03-06'].column('market_count').to_pylist() == [0]
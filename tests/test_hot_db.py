@@ -0,0 +1,150 @@
+# tests/test_hot_db.py
+"""HotDB: write-behind 버퍼, get_latest_many, 파티션 생성·보관 DROP, 비파티션 테이블 이관"""
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+import pytest
+from benchmarks.fakes import Fault, FakePostgres, FakeRedis
+from storage.hot_db import HotDB
+
+def make_hot(write_behind=True, batch_size=3, pg_fault=None) -> HotDB:
+    hot = HotDB(write_behind=write_behind, batch_size=batch_size, flush_interval=60)
+    hot.pg = FakePostgres(pg_fault or Fault('postgres'))
+    hot.cache = FakeRedis(Fault('redis'))
+    # 파티션은 이미 있는 것으로 (파티션 관리는 아래 별도 테스트)
+    hot._ensure_partitions_for = lambda timestamps: asyncio.sleep(0)
+    return hot
+
+class RecordingConnection:
+    """실행 SQL 과 트랜잭션 경계를 기록하는 asyncpg 연결 대체"""
+
+    def __init__(self, relkinds=None, fail_on=None):
+        self.relkinds = relkinds or {}
+        self.fail_on = fail_on
+        self.log = []
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def transaction(self):
+        conn = self
+
+        class Transaction:
+            async def __aenter__(self):
+                conn.log.append('BEGIN')
+
+            async def __aexit__(self, exc_type, *exc):
+                conn.log.append('ROLLBACK' if exc_type else 'COMMIT')
+        return Transaction()
+
+    async def fetchval(self, sql, name):
+        return self.relkinds.get(name)
+
+    async def fetch(self, sql, *args):
+        return []
+
+    async def execute(self, sql, *args):
+        self.log.append(' '.join(sql.split()))
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError('boom')
+
+
+def test_partitions_created_ahead_and_dropped_after_retention():
+    async def run():
+        hot = HotDB(write_behind=False)
+        hot.pg = RecordingConnection()
+        now = datetime.utcnow()
+        created = await hot.ensure_partitions(since=now - timedelta(hours=30))
+        assert created[-1] == hot._partition_name(now + timedelta(hours=hot.partitions_ahead))
+        assert await hot.ensure_partitions() == []          # 이미 만든 파티션은 다시 만들지 않음
+
+        keep_after = now - timedelta(hours=27)
+        dropped = await hot.drop_expired_partitions(keep_after=keep_after)
+        return hot, now, created, dropped
+    hot, now, created, dropped = asyncio.run(run())
+    # keep_after(watermark) 이후 데이터가 있는 파티션은 보관 기간이 지나도 유지
+    assert dropped and all(hot._partition_end(name) <= now - timedelta(hours=27) for name in dropped)
+    assert hot._partition_name(now - timedelta(hours=26)) in hot._partitions
+    assert hot.pg.log.count(f"DROP TABLE {dropped[0]}") == 1
+
+def test_partition_name_roundtrip():
+    hot = HotDB(write_behind=False)
+    ts = datetime(2024, 3, 5, 9, 30)
+    assert hot._partition_name(ts) == 'sentiment_p2024030509'
+    assert hot._partition_end('sentiment_p2024030509') == datetime(2024, 3, 5, 10)
+    assert hot._partition_end('sentiment_p20240305') == datetime(2024, 3, 6)
+    assert hot._partition_end('sentiment_legacy') is None
+
+def test_legacy_migration_runs_in_one_transaction():
+    hot = HotDB(write_behind=False)
+    hot.pg = RecordingConnection(relkinds={'sentiment': 'r'})
+    asyncio.run(hot._init_table())
+    log = hot.pg.log
+    assert log[0] == 'BEGIN' and log[-1] == 'COMMIT'
+    assert log[1] == 'ALTER TABLE sentiment RENAME TO sentiment_legacy'
+    assert any(s.startswith('INSERT INTO sentiment(') for s in log[1:-1])
+
+def test_legacy_migration_appends_to_existing_legacy_table():
+    hot = HotDB(write_behind=False)
+    hot.pg = RecordingConnection(relkinds={'sentiment': 'r', 'sentiment_legacy': 'r'})
+    asyncio.run(hot._init_table())
+    log = hot.pg.log
+    assert not any('RENAME' in s for s in log)
+    assert log[1].startswith('INSERT INTO sentiment_legacy(') and log[2] == 'DROP TABLE sentiment'
+
+def test_failed_migration_rolls_back():
+    hot = HotDB(write_behind=False)
+    hot.pg = RecordingConnection(relkinds={'sentiment': 'r'}, fail_on='FROM sentiment_legacy')
+    with pytest.raises(RuntimeError):
+        asyncio.run(hot._init_table())
+    assert hot.pg.log[-1] == 'ROLLBACK'
+    assert hot._partitions == set()
+
+
+def test_write_behind_batches_and_publishes_latest():
+    async def run():
+        hot = make_hot()
+        await hot.put('AAPL', 0.1, 'neutral', 0.5)
+        await hot.put('AAPL', 0.4, 'positive', 0.8)
+        assert hot.pg.rows_written == 0 and hot.buffer_stats()['buffered'] == 2
+        await hot.put('TSLA', -0.3, 'negative', 0.7)     # batch_size 도달 → flush
+        return hot
+    hot = asyncio.run(run())
+    assert hot.pg.rows_written == 3
+    assert hot.buffer_stats()['rows_per_flush'] == 3
+    assert hot.cache.data['sent:AAPL'] == b'0.4|positive|0.8'
+
+
+def test_write_behind_bounded_and_requeued_on_failure():
+    async def run():
+        hot = make_hot(batch_size=100, pg_fault=Fault('postgres', failure_rate=1.0))
+        hot.max_buffer = 4
+        hot._buffer = deque(maxlen=4)
+        for i in range(6):
+            await hot.put(f"S{i}", 0.0, 'neutral', 0.5)
+        assert hot.metrics['dropped_rows'] == 2
+        assert [r[0] for r in hot._buffer] == ['S2', 'S3', 'S4', 'S5']
+        assert await hot.flush() == 0
+        return hot
+    hot = asyncio.run(run())
+    # 실패 배치는 순서대로 버퍼에 되돌아감
+    assert [r[0] for r in hot._buffer] == ['S2', 'S3', 'S4', 'S5']
+    assert hot.metrics['flush_errors'] == 1
+
+
+def test_get_latest_many_reads_cache_then_backfills():
+    async def run():
+        hot = make_hot(write_behind=False)
+        hot.pg._insert([('TSLA', -0.2, 'negative', 0.6, datetime.utcnow())])
+        await hot.cache.setex('sent:AAPL', 300, '0.5|positive|0.9')
+        result = await hot.get_latest_many(['AAPL', 'TSLA', 'NVDA', 'AAPL'])
+        return hot, result
+    hot, result = asyncio.run(run())
+    assert result == {'AAPL': (0.5, 'positive', 0.9), 'TSLA': (-0.2, 'negative', 0.6)}
+    assert hot.cache.data['sent:TSLA'] == b'-0.2|negative|0.6'    # 미스는 캐시에 채움
@@ -0,0 +1,52 @@
+# tests/test_range_query.py
+"""티어 부분 집계 병합: combine_partials / finalize / bucket_batch"""
+from datetime import datetime
+import pyarrow as pa
+import pytest
+from storage.range_query import PARTIAL_SCHEMA, bucket_batch, combine_partials, finalize, floor_time
+
+T0 = datetime(2024, 3, 5, 9)
+T1 = datetime(2024, 3, 5, 10)
+
+def partial(rows) -> pa.Table:
+    return pa.Table.from_pylist([dict(zip(PARTIAL_SCHEMA.names, r)) for r in rows], schema=PARTIAL_SCHEMA)
+
+
+def test_combine_sums_across_tiers():
+    # 같은 구간이 hot / warm 경계에 걸쳐 나뉘어 온 경우
+    hot = partial([('AAPL', T0, 1.5, 2.0, 3), ('AAPL', T1, 0.5, 0.5, 1)])
+    warm = partial([('AAPL', T0, -0.5, 1.0, 2), ('TSLA', T0, 0.2, 0.4, 2)])
+    combined = combine_partials([hot, warm, PARTIAL_SCHEMA.empty_table()])
+    rows = {(r['symbol'], r['time']): r for r in combined.to_pylist()}
+    assert rows[('AAPL', T0)]['score_sum'] == pytest.approx(1.0)
+    assert rows[('AAPL', T0)]['count'] == 5
+    assert len(rows) == 3
+
+def test_combine_empty():
+    assert combine_partials([]).schema == PARTIAL_SCHEMA
+    assert combine_partials([PARTIAL_SCHEMA.empty_table()]).num_rows == 0
+
+def test_finalize_weights_by_count():
+    combined = combine_partials([partial([('TSLA', T1, 1.0, 1.0, 4), ('AAPL', T1, 0.0, 0.0, 0)]),
+                                 partial([('TSLA', T0, 0.6, 0.9, 2), ('TSLA', T1, -1.0, 1.0, 1)])])
+    result = finalize(combined).to_pylist()
+    # symbol, time 정렬 / count 0 구간은 평균이 null
+    assert [(r['symbol'], r['time']) for r in result] == [('AAPL', T1), ('TSLA', T0), ('TSLA', T1)]
+    assert result[0]['score'] is None
+    assert result[1]['score'] == pytest.approx(0.3)
+    assert result[2]['score'] == pytest.approx(0.0)
+    assert result[2]['confidence'] == pytest.approx(0.4)
+    assert result[2]['count'] == 5
+
+def test_bucket_batch_matches_floor_time():
+    times = [datetime(2024, 3, 5, 9, 0, 30), datetime(2024, 3, 5, 9, 59), datetime(2024, 3, 5, 10, 1)]
+    batch = pa.RecordBatch.from_pydict({
+        'symbol': ['AAPL'] * 3,
+        'timestamp': pa.array(times, pa.timestamp('us', tz='UTC')),
+        'sentiment_score': [0.1, 0.3, None],
+        'confidence': [0.5, 0.7, 0.9],
+    })
+    result = finalize(bucket_batch(batch, 'timestamp', 'sentiment_score', 'confidence', 3600)).to_pylist()
+    assert [r['time'] for r in result] == [floor_time(times[0], 3600)]
+    assert result[0]['count'] == 2     # score 가 null 인 행은 제외
+    assert result[0]['score'] == pytest.approx(0.2)
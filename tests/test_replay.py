@@ -0,0 +1,98 @@
+# tests/test_replay.py
+"""replay: HyperCLOVA X 응답 녹화 → 재생 왕복, 창 단위 이벤트 시각 순 collect"""
+import asyncio
+from datetime import datetime, timedelta
+import pyarrow as pa
+from replay import ClovaRecorder, RecordedClova, ReplayEngine, ReplayMCP, ReplayStorage
+
+DAY = datetime(2024, 3, 5)
+
+def test_recorder_output_replays(tmp_path):
+    async def live(texts, meta):
+        return {'sentiment_score': 0.8, 'sentiment_label': 'positive', 'confidence': 0.9} if texts else {}
+
+    async def run(path):
+        recorder = ClovaRecorder(live, path)
+        await recorder(['good earnings', 'beat'], {})
+        await recorder(['good earnings', 'beat'], {})    # 같은 프롬프트는 한 번만
+        await recorder([], {})                            # 빈 응답은 기록하지 않음
+        clova = RecordedClova(path)
+        return recorder, clova, await clova(['good earnings', 'beat'], {}), await clova(['other'], {})
+    path = tmp_path / 'clova.jsonl'
+    recorder, clova, hit, miss = asyncio.run(run(str(path)))
+    assert len(path.read_text().splitlines()) == 1
+    assert recorder.recorded == 1
+    assert hit['sentiment_label'] == 'positive' and miss == {}
+    assert (clova.hits, clova.misses) == (1, 1)
+
+
+class FakeCold:
+    """iter_partition_batches 대체: 일자별 tweets / market 행 (파일 순서 = 입력 순서)"""
+
+    TIME_COLUMNS = {'tweets': 'created_at', 'market': 'timestamp'}
+
+    def __init__(self, tweets, market):
+        self.rows = {'tweets': tweets, 'market': market}
+
+    def iter_partition_batches(self, data_type, start, end, symbols):
+        rows = [r for r in self.rows[data_type]
+                if start <= r[self.TIME_COLUMNS[data_type]] <= end and r['symbol'] in symbols]
+        if rows:
+            yield start.strftime('%Y-%m-%d'), pa.RecordBatch.from_pylist(rows)
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.mcp = ReplayMCP()
+        self.calls = []
+
+    async def collect(self, symbol, ts=None):
+        tweets = await self.mcp.call('twitter', 'search_tweets', {'query': symbol})
+        quote = await self.mcp.call('alpha_vantage', 'get_quote', {'symbol': symbol})
+        self.calls.append((ts, symbol, [t['text'] for t in tweets['tweets']], quote.get('price')))
+
+
+def at(day, seconds):
+    return day + timedelta(seconds=seconds)
+
+def test_replay_collects_windows_in_event_order():
+    next_day = DAY + timedelta(days=1)
+    tweets = [   # 아카이브 파일 순서는 이벤트 시각 순이 아님
+        {'symbol': 'TSLA', 'created_at': at(DAY, 130), 'text': 't3'},
+        {'symbol': 'AAPL', 'created_at': at(DAY, 10), 'text': 'a1'},
+        {'symbol': 'TSLA', 'created_at': at(DAY, 5), 'text': 't1'},
+        {'symbol': 'AAPL', 'created_at': at(DAY, 50), 'text': 'a2'},
+        {'symbol': 'AAPL', 'created_at': at(next_day, 20), 'text': 'a4'},
+        {'symbol': 'MSFT', 'created_at': at(DAY, 30), 'text': 'excluded'},
+    ]
+    market = [
+        {'symbol': 'AAPL', 'timestamp': at(DAY, 40), 'price': 101.0},
+        {'symbol': 'AAPL', 'timestamp': at(DAY, 20), 'price': 100.0},
+    ]
+    agent = RecordingAgent()
+    engine = ReplayEngine(agent, FakeCold(tweets, market), ['AAPL', 'TSLA'], window=60, speed=0)
+    report = asyncio.run(engine.run(DAY, next_day + timedelta(hours=1)))
+
+    assert agent.calls == [
+        (at(DAY, 60), 'AAPL', ['a1', 'a2'], 101.0),     # 창 내 마지막 시세
+        (at(DAY, 60), 'TSLA', ['t1'], None),
+        (at(DAY, 180), 'TSLA', ['t3'], None),
+        (at(next_day, 60), 'AAPL', ['a4'], 101.0),      # 시세 없는 창은 직전 시세 유지
+    ]
+    assert report['windows'] == 3 and report['collects'] == 4 and report['tweets'] == 5
+
+def test_replay_skips_windows_outside_range():
+    tweets = [{'symbol': 'AAPL', 'created_at': at(DAY, s), 'text': str(s)} for s in (10, 70, 130)]
+    agent = RecordingAgent()
+    engine = ReplayEngine(agent, FakeCold(tweets, []), ['AAPL'], window=60, speed=0)
+    asyncio.run(engine.run(at(DAY, 60), at(DAY, 119)))
+    assert [c[2] for c in agent.calls] == [['70']]
+
+def test_replay_storage_sorts_by_event_time():
+    storage = ReplayStorage()
+    storage.write_event('TSLA', 0.2, 'neutral', 0.5, ts=at(DAY, 60))
+    storage.write_event('AAPL', 0.1, 'neutral', 0.5, ts=at(DAY, 60))
+    storage.write_event('AAPL', 0.3, 'positive', 0.7, ts=at(DAY, 0))
+    rows = storage.table().to_pylist()
+    assert [(r['timestamp'], r['symbol']) for r in rows] == [
+        (at(DAY, 0), 'AAPL'), (at(DAY, 60), 'AAPL'), (at(DAY, 60), 'TSLA')]
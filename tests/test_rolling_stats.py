@@ -0,0 +1,59 @@
+# tests/test_rolling_stats.py
+"""RollingStats: ring buffer 롤링 평균·표준편차, 스파이크 감지, 용량 확장"""
+import numpy as np
+import pytest
+from storage.rolling_stats import RollingStats
+
+def test_window_moments_match_numpy():
+    stats = RollingStats(window=5)
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(23, 3))
+    for score, conf, volume in values:
+        snap = stats.update('AAPL', score, conf, volume, ts=1.0)
+    recent = values[-5:]
+    assert snap['samples'] == 5
+    for f, name in enumerate(RollingStats.FIELDS):
+        assert snap[f'{name}_mean'] == pytest.approx(recent[:, f].mean())
+        assert snap[f'{name}_std'] == pytest.approx(recent[:, f].std())
+        assert snap[f'{name}_last'] == pytest.approx(recent[-1, f])
+
+def test_ewma_uses_alpha():
+    stats = RollingStats(window=10, alpha=0.5)
+    stats.update('TSLA', 1.0, 0.0, 0.0)
+    snap = stats.update('TSLA', 3.0, 0.0, 0.0)
+    assert snap['score_ewma'] == pytest.approx(2.0)
+
+def test_spike_needs_min_periods_and_threshold():
+    stats = RollingStats(window=20, z_threshold=3.0, min_periods=5)
+    for i in range(4):
+        stats.update('NVDA', 0.1 * (i % 2), 0.5, 10)
+    assert not stats.update('NVDA', 5.0, 0.5, 10)['score_spike']    # 표본 부족
+    for i in range(10):
+        snap = stats.update('NVDA', 0.1 * (i % 2), 0.5, 10 + i % 2)
+    assert not snap['score_spike'] and not snap['volume_spike']
+    snap = stats.update('NVDA', 0.05, 0.5, 500)
+    assert snap['volume_spike'] and not snap['score_spike']
+    assert stats.spikes() == ['NVDA']
+
+def test_volume_drop_is_not_a_spike():
+    stats = RollingStats(window=20, min_periods=5)
+    for i in range(10):
+        stats.update('AMD', 0.0, 0.5, 100 + i % 2)
+    assert not stats.update('AMD', 0.0, 0.5, 0)['volume_spike']
+
+def test_grows_past_capacity_and_ranks_movers():
+    stats = RollingStats(window=8, min_periods=2, capacity=2)
+    for k, symbol in enumerate(['A', 'B', 'C', 'D', 'E']):
+        for i in range(6):
+            stats.update(symbol, 0.1 * (i % 2), 0.5, 1)
+        stats.update(symbol, 0.1 * k, 0.5, 1)
+    assert len(stats) == 5
+    assert stats.get('A')['samples'] == 7 and stats.get('Z') is None
+    movers = [row['symbol'] for row in stats.top_movers(n=2)]
+    assert movers == ['E', 'D']
+    snap = stats.snapshot()
+    assert list(snap['symbol']) == ['A', 'B', 'C', 'D', 'E']
+    assert snap['score_last'][4] == pytest.approx(0.4)
+
+def test_top_movers_empty():
+    assert RollingStats().top_movers() == []
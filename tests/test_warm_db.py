@@ -0,0 +1,124 @@
+# tests/test_warm_db.py
+"""WarmDB 트렌드 조회: 롤업 라우팅 + 롤업에 없는 양 끝(진행 중인 현재 구간 포함) raw 합산"""
+import asyncio
+import re
+import types
+from datetime import datetime, timedelta
+import pytest
+from storage.range_query import floor_time
+from storage.warm_db import WarmDB
+
+FMT = '%Y-%m-%dT%H:%M:%SZ'
+
+class FakeFluxWindows:
+    """
+    _window_query 가 만드는 Flux 만 해석하는 최소 query_api
+    raw 점에서 롤업(완료된 구간만, 기록 시각 = 구간 끝)을 만들어 sentiment_{res} 로 제공
+    """
+
+    def __init__(self, points, now: datetime):
+        self.points = points      # (symbol, time, score, confidence)
+        self.now = now
+
+    def _rollup(self, step: int):
+        groups = {}
+        for symbol, t, score, conf in self.points:
+            start = floor_time(t, step)
+            if start + timedelta(seconds=step) <= floor_time(self.now, step):
+                groups.setdefault((symbol, start), []).append((score, conf))
+        return [(symbol, start + timedelta(seconds=step), sum(s for s, _ in v) / len(v),
+                 sum(c for _, c in v) / len(v), float(len(v)))
+                for (symbol, start), v in groups.items()]
+
+    def query_stream(self, query: str):
+        lo, hi = (datetime.strptime(v, FMT) for v in
+                  re.search(r'range\(start: (\S+), stop: (\S+)\)', query).groups())
+        measurement = re.search(r'"_measurement"\] == "(\w+)"', query).group(1)
+        symbols = set(re.findall(r'r\["symbol"\] == "([^"]+)"', query))
+        step = WarmDB._duration_seconds(re.search(r'window\(every: (\w+)\)', query).group(1))
+        if measurement == 'sentiment':
+            shift, rows = 0, [(s, t, sc, c, 1.0) for s, t, sc, c in self.points]
+        else:
+            shift = WarmDB.ROLLUPS[measurement.split('_')[1]]
+            rows = self._rollup(shift)
+        lo, hi = lo - timedelta(seconds=shift), hi - timedelta(seconds=shift)
+
+        windows = {}
+        for symbol, t, score, conf, weight in rows:
+            t = t - timedelta(seconds=shift)
+            if symbol not in symbols or not lo <= t < hi:
+                continue
+            start = floor_time(t, step)
+            acc = windows.setdefault((symbol, start), [0.0, 0.0, 0.0])
+            acc[0] += score * weight
+            acc[1] += conf * weight
+            acc[2] += weight
+        for (symbol, start), (s, c, w) in windows.items():
+            yield types.SimpleNamespace(values={
+                'symbol': symbol, '_start': max(start, lo),
+                '_stop': min(start + timedelta(seconds=step), hi),
+                'score_sum': s, 'confidence_sum': c, 'count': w})
+
+
+@pytest.mark.parametrize('hours,resolution', [(24, '1h'), (72, '1d'), (6, '30m')])
+def test_trend_includes_partial_edges(hours, resolution):
+    now = datetime.utcnow()
+    points = [('AAPL', now - timedelta(minutes=7 * i + 1), (i % 5 - 2) / 2, 0.5 + (i % 3) / 10)
+              for i in range(900)]
+    warm = WarmDB()
+    warm._query_api = FakeFluxWindows(points, now)
+    trend = asyncio.run(warm.get_sentiment_trend('AAPL', hours=hours, resolution=resolution))
+
+    # raw 로 직접 계산한 구간 평균과 같아야 함 (Flux range 는 초 단위)
+    step = WarmDB._duration_seconds(resolution)
+    start = (now - timedelta(hours=hours)).replace(microsecond=0)
+    expected = {}
+    for _, t, score, _ in points:
+        if t >= start:
+            expected.setdefault(floor_time(t, step), []).append(score)
+    got = {floor_time(row['time'] - timedelta(microseconds=1), step): row['score'] for row in trend}
+    newest = max(expected)
+    assert newest in got and newest == floor_time(now, step)   # 진행 중인 현재 구간
+    for window, scores in expected.items():
+        assert got[window] == pytest.approx(sum(scores) / len(scores))
+
+def test_trend_falls_back_to_raw_for_symbols_missing_from_rollup():
+    now = datetime.utcnow()
+    warm = WarmDB()
+    fake = FakeFluxWindows([('TSLA', now - timedelta(hours=3), 0.4, 0.9)], now)
+    fake._rollup = lambda step: []      # 롤업 backfill 전
+    warm._query_api = fake
+    trend = asyncio.run(warm.get_sentiment_trend('TSLA', hours=24, resolution='1h'))
+    assert [row['score'] for row in trend] == [pytest.approx(0.4)]
+
+def test_symbol_filter_validates_and_caps():
+    assert WarmDB._flux_symbol_filter(['AAPL', 'BRK.B']) == 'r["symbol"] == "AAPL" or r["symbol"] == "BRK.B"'
+    with pytest.raises(ValueError):
+        WarmDB._flux_symbol_filter(['AAPL") or true or ("'])
+    with pytest.raises(ValueError):
+        WarmDB._flux_symbol_filter([f"S{i}" for i in range(WarmDB.FLUX_MAX_SYMBOLS + 1)])
+
+def test_comparative_table_chunks_symbols():
+    queries = []
+    warm = WarmDB()
+    warm._query_api = types.SimpleNamespace(query_stream=lambda q: queries.append(q) or iter(()))
+    table = asyncio.run(warm.get_comparative_table([f"S{i:03d}" for i in range(250)], days=1))
+    assert table.num_rows == 0
+    assert queries and all(q.count('r["symbol"] ==') <= WarmDB.FLUX_MAX_SYMBOLS for q in queries)
+    assert sum(q.count('r["symbol"] ==') for q in queries) == 250
+
+def test_log_docs_go_to_their_period_index():
+    warm = WarmDB()
+    created = []
+    # alias API 가 없는 indices: rollover 가 alias 를 건드리면 AttributeError
+    warm._opensearch_client = types.SimpleNamespace(indices=types.SimpleNamespace(
+        exists=lambda name: False, create=lambda name, **kw: created.append(name)))
+    warm._rollover_log_index()
+    warm._rollover_log_index()
+    assert created == [warm._log_index_name(datetime.utcnow())]
+
+    asyncio.run(warm.store_sentiment_log('AAPL', 0.5, 'positive', 'text', 'twitter', 0.9, []))
+    action = warm._log_buffer[-1]
+    assert action['_index'] == warm._log_index_name(action['_source']['timestamp'])
+    assert warm._log_index_name(datetime(2024, 3, 5)) == 'sentiment-logs-2024.03.05'
+    assert warm._log_read_indices(1).split(',')[-1] == created[0]
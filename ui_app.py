@@ -1,25 +1,31 @@
-import streamlit as st, asyncio, nest_asyncio
-from agent import StockSentimentAgent
+import streamlit as st
+from ui_backend import UIBackend
 
-nest_asyncio.apply()   # Streamlit + asyncio
+@st.cache_resource
+def get_backend() -> UIBackend:
+    # 모든 세션이 공유하는 단일 백엔드 (영속 event loop + 읽기 전용 연결 + pub/sub 구독)
+    return UIBackend().start()
 
 st.set_page_config(page_title="Stock Sentiment", layout="wide")
 st.title("📈 Stock Sentiment Agent")
 
+backend = get_backend()
+
 symbol = st.text_input("Symbol", "AAPL").upper()
 run_btn = st.button("Analyze")
 
-if "agent" not in st.session_state:
-    st.session_state.agent = StockSentimentAgent()
-    asyncio.run(st.session_state.agent.start())
-
 if run_btn:
     with st.spinner("Collecting & analyzing…"):
-        asyncio.run(st.session_state.agent.collect(symbol))
+        backend.analyze(symbol)
     st.success("Done!")
 
-score_data = asyncio.run(st.session_state.agent.db.get_latest(symbol))
-if score_data:
-    s, lbl, conf = score_data
-    st.metric("Sentiment Score", f"{s:.2f}")
-    st.write("Label:", lbl, "Confidence:", conf)
\ No newline at end of file
+@st.fragment(run_every=1)
+def score_panel():
+    # 구독으로 갱신되는 메모리 값만 읽음 (DB 재조회 없음)
+    score_data = backend.get_latest(symbol)
+    if score_data:
+        s, lbl, conf, _ = score_data
+        st.metric("Sentiment Score", f"{s:.2f}")
+        st.write("Label:", lbl, "Confidence:", conf)
+
+score_panel()
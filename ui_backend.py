@@ -0,0 +1,97 @@
+"""
+Streamlit UI 공용 백엔드 (프로세스당 1개, st.cache_resource 로 공유)
+- 전용 스레드의 영속 event loop 하나에서 모든 async 작업 실행 (rerun 마다 asyncio.run 없음)
+- 읽기 전용 HotDB 연결 1개 (pool 공유, 테이블 관리 없음)
+- Redis pub/sub 구독으로 최신 점수를 메모리에 유지 → rerun 시 DB 재조회 불필요
+  (데이터가 없는 종목도 잠시 캐시, 이후 값은 pub/sub 로 도착)
+- 수집용 에이전트(MCP·Kafka)는 Analyze 요청 시에만 1개 생성해 공유
+"""
+import asyncio, logging, threading, time
+from config import settings
+from storage.hot_db import HotDB
+
+class UIBackend:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ui-backend", daemon=True)
+        self.db = HotDB()
+        self.latest: dict[str, tuple] = {}      # symbol → (score, label, confidence, ts)
+        self.version = 0                        # 갱신 시 증가 (UI 가 변경 여부 판단)
+        self.miss_ttl = getattr(settings, 'UI_LATEST_MISS_TTL', 30)
+        self._missing: dict[str, float] = {}     # 조회 결과가 없던 종목 → 재조회 가능 시각 (monotonic)
+        self._agent = None
+        self._agent_lock: asyncio.Lock | None = None
+        self._sub_task: asyncio.Task | None = None
+
+    def start(self) -> "UIBackend":
+        self._thread.start()
+        self.run(self._startup())
+        return self
+
+    def run(self, coro, timeout: float | None = None):
+        """UI 스레드에서 호출: 공용 loop 에 coroutine 제출 후 결과 대기"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def _startup(self):
+        await self.db.connect()
+        self._agent_lock = asyncio.Lock()
+        self._sub_task = asyncio.create_task(self._subscribe_loop())
+        logging.info("UI backend up")
+
+    async def _subscribe_loop(self):
+        while True:
+            try:
+                async for msg in self.db.subscribe():
+                    self.latest[msg["symbol"]] = (msg["score"], msg["label"],
+                                                  msg["confidence"], msg["ts"])
+                    self.version += 1
+            except Exception as e:
+                logging.error(f"UI subscription error: {e}")
+            await asyncio.sleep(1)
+
+    # ---------------------------------------------------------- #
+    #                  PUBLIC  METHODS                           #
+    # ---------------------------------------------------------- #
+    def get_latest(self, symbol: str) -> tuple | None:
+        """
+        구독 캐시 우선, 처음 보는 종목만 HotDB(Redis→PG) 조회 후 캐시
+        행이 없으면 miss_ttl 초 동안 재조회하지 않음 (run_every=1 fragment 가 세션마다 DB 를 치지 않도록)
+        """
+        if symbol in self.latest:
+            return self.latest[symbol]
+        if self._missing.get(symbol, 0.0) > time.monotonic():
+            return None
+        row = self.run(self.db.get_latest(symbol))
+        if row is None:
+            self._missing[symbol] = time.monotonic() + self.miss_ttl
+            return None
+        self._missing.pop(symbol, None)
+        return self.latest.setdefault(symbol, (*row, None))
+
+    def analyze(self, symbol: str):
+        self.run(self._analyze(symbol))
+        # 수집 직후 결과가 바로 보이도록 (pub/sub 이 먼저 도착하지 않은 경우 재조회)
+        self._missing.pop(symbol, None)
+
+    async def _analyze(self, symbol: str):
+        async with self._agent_lock:
+            if self._agent is None:
+                from agent import StockSentimentAgent
+                from storage import StorageManager
+                # 수집 결과 반영만 필요 (티어 이동은 main 프로세스 담당)
+                agent = StockSentimentAgent(StorageManager(sinks=('hot', 'kafka'), mover=False))
+                await agent.start()
+                self._agent = agent
+        await self._agent.collect(symbol)
+        # 큐·write-behind 버퍼에 남지 않고 결과가 즉시 보이도록
+        await self._agent.storage.flush()
+
+    def close(self):
+        async def _close():
+            if self._sub_task:
+                self._sub_task.cancel()
+            if self._agent:
+                await self._agent.stop()
+            await self.db.shutdown()
+        self.run(_close())
+        self.loop.call_soon_threadsafe(self.loop.stop)